@@ -2,17 +2,67 @@
 Servicio de generación de preguntas de trivia
 Usa Open Trivia Database API con traducción automática al español
 """
+import os
 import requests
 import html
 import random
 import time
-import threading
+from concurrent.futures import ThreadPoolExecutor
 from deep_translator import GoogleTranslator
+from question_pack import load_question_pack
+from rate_limit import TokenBucket
+from calibration import calibration
 
 print("✓ Servicio de trivia: Open Trivia Database + Traducción al español")
 
+# Pack de preguntas pre-traducido (ver question_pack.py). Si está cargado,
+# las preguntas salen de él y no se consulta la API ni el traductor.
+question_pack = load_question_pack(os.getenv("QUESTION_PACK_PATH", ""))
+
+# Endpoints externos (configurables para poder apuntar a fake_upstream.py)
+TRIVIA_API_URL = os.getenv("TRIVIA_API_URL", "https://mi-api-preguntas.onrender.com/preguntas")
+# Si se define, se usa un servicio compatible con LibreTranslate en vez de Google
+TRANSLATE_API_URL = os.getenv("TRANSLATE_API_URL", "")
+
+
+class LibreTranslateClient:
+    """Cliente mínimo para APIs compatibles con LibreTranslate (POST /translate)"""
+
+    def __init__(self, url, source='en', target='es', timeout=10):
+        self.url = url
+        self.source = source
+        self.target = target
+        self.timeout = timeout
+
+    def translate(self, text):
+        response = requests.post(self.url, json={
+            'q': text,
+            'source': self.source,
+            'target': self.target,
+            'format': 'text'
+        }, timeout=self.timeout)
+        if response.status_code != 200:
+            raise Exception(f"Error en traductor: {response.status_code}")
+        return response.json()['translatedText']
+
+
 # Traductor de inglés a español
-translator = GoogleTranslator(source='en', target='es')
+if TRANSLATE_API_URL:
+    translator = LibreTranslateClient(TRANSLATE_API_URL)
+else:
+    translator = GoogleTranslator(source='en', target='es')
+
+# Límite de tasa compartido por TODAS las llamadas salientes (API de trivia y
+# traductor) de cualquier thread del proceso. Por defecto 1 request cada 2s,
+# que es lo que antes se forzaba con esperas escalonadas.
+UPSTREAM_RATE_PER_SEC = float(os.getenv("UPSTREAM_RATE_PER_SEC", "0.5"))
+UPSTREAM_BURST = float(os.getenv("UPSTREAM_BURST", "2"))
+UPSTREAM_MAX_WORKERS = int(os.getenv("UPSTREAM_MAX_WORKERS", "4"))
+
+upstream_limiter = TokenBucket(UPSTREAM_RATE_PER_SEC, UPSTREAM_BURST)
+
+# Pool acotado para las generaciones en paralelo (generate_round_questions)
+_upstream_pool = ThreadPoolExecutor(max_workers=UPSTREAM_MAX_WORKERS, thread_name_prefix='trivia')
 
 # Palabras que NO deben traducirse (nombres propios, marcas, etc.)
 NO_TRANSLATE_WORDS = {
@@ -29,6 +79,31 @@ NO_TRANSLATE_WORDS = {
     'facebook', 'twitter', 'youtube', 'netflix',
 }
 
+# Mapeo de dificultad interna -> dificultad de la API personalizada
+DIFICULTAD_API_MAP = {
+    'easy': ['Fácil'],
+    'medium': ['Medio'],
+    'hard': ['Difícil', 'Legendario']
+}
+
+
+def difficulty_key(dificultad):
+    """Convierte una etiqueta de la API ('Fácil', 'Legendario', ...) en easy/medium/hard"""
+    for key, labels in DIFICULTAD_API_MAP.items():
+        if dificultad in labels:
+            return key
+    return 'medium'
+
+
+def matches_difficulty(question_text, dificultad, difficulty):
+    """
+    Indica si una pregunta sirve para la dificultad pedida
+
+    Usa la dificultad empírica (calibration.py) cuando hay suficientes
+    respuestas registradas y, si no, la etiqueta de origen.
+    """
+    return calibration.difficulty_for(question_text, difficulty_key(dificultad)) == difficulty
+
 def translate_text(text):
     """
     Traduce texto de inglés a español con manejo mejorado
@@ -83,6 +158,7 @@ def translate_text(text):
         needs_period = not text_stripped.endswith(('.', '!', '?', ','))
         text_to_translate = text_stripped + '.' if needs_period else text_stripped
         
+        upstream_limiter.acquire()
         translated = translator.translate(text_to_translate)
         
         # Remover el punto agregado si fue necesario
@@ -111,9 +187,8 @@ def get_question_from_opentdb(difficulty='medium', retry=0):
         dict con la pregunta en español en el formato interno del juego
     """
     try:
-        url = 'https://mi-api-preguntas.onrender.com/preguntas'
-
-        response = requests.get(url, timeout=10)
+        upstream_limiter.acquire()
+        response = requests.get(TRIVIA_API_URL, timeout=10)
 
         if response.status_code != 200:
             raise Exception(f"Error en API personalizada: {response.status_code}")
@@ -123,17 +198,13 @@ def get_question_from_opentdb(difficulty='medium', retry=0):
         if not isinstance(data, list) or len(data) == 0:
             raise Exception("La API personalizada no devolvió una lista de preguntas")
 
-        # Mapeo simple de dificultad interna -> dificultad de la API
-        dificultad_map = {
-            'easy': ['Fácil'],
-            'medium': ['Medio'],
-            'hard': ['Difícil', 'Legendario']
-        }
-
-        target_dificultades = dificultad_map.get(difficulty, [])
+        target_dificultades = DIFICULTAD_API_MAP.get(difficulty, [])
 
         if target_dificultades:
-            candidates = [q for q in data if q.get('dificultad') in target_dificultades]
+            candidates = [
+                q for q in data
+                if matches_difficulty(q.get('pregunta', ''), q.get('dificultad', ''), difficulty)
+            ]
         else:
             candidates = []
 
@@ -185,6 +256,32 @@ def get_question_from_opentdb(difficulty='medium', retry=0):
         return None
 
 
+# Sorteos del pack antes de aceptar una pregunta aunque no coincida la dificultad
+PACK_PICK_ATTEMPTS = 8
+
+
+def pick_from_pack(difficulty):
+    """
+    Elige una pregunta del pack respetando la dificultad calibrada
+
+    Alterna sorteos del índice de la etiqueta con sorteos de todo el pack, para
+    que una pregunta etiquetada 'hard' que resultó fácil también pueda salir
+    como 'easy'. Si ninguna coincide se devuelve el último sorteo del índice de
+    la dificultad pedida (nunca uno de todo el pack).
+    """
+    fallback = None
+    for attempt in range(PACK_PICK_ATTEMPTS):
+        from_index = attempt % 2 == 0
+        question = question_pack.random_question(difficulty if from_index else None)
+        if question is None:
+            return None
+        if matches_difficulty(question['question'], question['difficulty'], difficulty):
+            return question
+        if from_index:
+            fallback = question
+    return fallback
+
+
 def generate_single_question_sync(difficulty='medium'):
     """
     Genera una sola pregunta de forma síncrona (sin threading)
@@ -199,6 +296,11 @@ def generate_single_question_sync(difficulty='medium'):
     # Variar dificultad aleatoriamente
     difficulties = ['easy', 'easy', 'medium', 'medium', 'hard']
     actual_difficulty = random.choice(difficulties)
+
+    if question_pack is not None:
+        question = pick_from_pack(actual_difficulty)
+        if question:
+            return question
     
     # Hacer varios intentos contra la API antes de rendirse
     max_attempts = 5
@@ -230,13 +332,8 @@ def generate_round_questions(num_questions=5, difficulty='medium'):
     print(f"Generando {num_questions} preguntas de trivia...")
     print(f"{'='*60}")
     
-    questions = [None] * num_questions
-    
     def generate_single_question(index):
-        """Genera una pregunta individual en un thread separado"""
-        # Delay escalonado para evitar rate limit (2 segundos entre requests)
-        time.sleep(index * 2.0)
-        
+        """Genera una pregunta individual en el pool compartido"""
         # Variar la dificultad progresivamente
         if index < 2:
             current_difficulty = 'easy'
@@ -247,24 +344,23 @@ def generate_round_questions(num_questions=5, difficulty='medium'):
         
         print(f"\n{index + 1}. Obteniendo pregunta ({current_difficulty})...")
         
-        # Obtener pregunta de OpenTDB
+        # Obtener pregunta de OpenTDB (el rate limit lo aplica upstream_limiter)
         question = get_question_from_opentdb(current_difficulty)
         
-        if question:
-            questions[index] = question
-        else:
+        if not question:
             print(f"  ⚠️ No se pudo obtener pregunta {index + 1}")
+        return question
     
-    # Crear y ejecutar threads para generar preguntas en paralelo
-    threads = []
-    for i in range(num_questions):
-        thread = threading.Thread(target=generate_single_question, args=(i,))
-        thread.start()
-        threads.append(thread)
-    
-    # Esperar a que todos los threads terminen
-    for thread in threads:
-        thread.join()
+    # El pool acota la concurrencia y el token bucket marca el ritmo real,
+    # en lugar de dormir index * 2s en cada thread
+    futures = [_upstream_pool.submit(generate_single_question, i) for i in range(num_questions)]
+    questions = []
+    for future in futures:
+        try:
+            questions.append(future.result())
+        except Exception as e:
+            print(f"  ⚠️ Error generando pregunta: {e}")
+            questions.append(None)
     
     # Filtrar None en caso de errores
     questions = [q for q in questions if q is not None]
@@ -1,18 +1,33 @@
-from flask import request, jsonify, current_app
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import request, jsonify, current_app, Response
 import jwt
 import datetime
+import math
 import uuid
 from functools import wraps
 
+from leaderboard import LEADERBOARD_MAX_LIMIT, LEADERBOARD_MAX_RADIUS, leaderboard
+from login_throttle import client_ip, login_throttle
+from match_history import MATCH_HISTORY_DEFAULT_LIMIT, match_history
+from password_pool import PasswordPoolBusy, password_pool
+from ranking import RANKING_DEFAULT_LIMIT, RankingCache, ranking_not_modified_total
+from token_cache import USER_IDENTITY_PROJECTION, token_cache
+from write_behind import write_behind
+
 # Initialize app and db
 app = None
 db = None
+ranking_cache = None
 
 def init_auth(app_instance, db_instance):
-    global app, db
+    global app, db, ranking_cache
     app = app_instance
     db = db_instance
+    ranking_cache = RankingCache(db.users)
+    # El ranking de MongoDB cambia cuando se escriben las victorias en lote
+    write_behind.on_wins_written.append(ranking_cache.invalidate)
+    leaderboard.start_warm(db.users)
+    match_history.start(db)
+    login_throttle.start(db)
 
 def token_required(f):
     @wraps(f)
@@ -23,30 +38,83 @@ def token_required(f):
         if not token:
             return jsonify({'message': 'Token is missing!'}), 401
         
-        try:
-            data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
-            current_user = db.users.find_one({'public_id': data['public_id']})
-            if not current_user:
-                return jsonify({'message': 'User not found!'}), 401
-        except Exception as e:
-            return jsonify({'message': 'Token is invalid!', 'error': str(e)}), 401
+        current_user, error = verificar_token(token)
+        if error:
+            return jsonify(error), 401
 
         return f(current_user, *args, **kwargs)
     return decorated
 
+def verificar_token(token):
+    """
+    Identidad del usuario de un token JWT (rutas protegidas y conexión de sockets)
+
+    Un token ya verificado se resuelve desde la caché, sin firma ni consulta
+    a MongoDB.
+
+    Returns:
+        (usuario, None) si el token es válido, o (None, cuerpo del error)
+    """
+    current_user = token_cache.get(token)
+    if current_user is not None:
+        return current_user, None
+    if token_cache.is_revoked(token):
+        return None, {'message': 'Token has been revoked!'}
+    try:
+        data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
+        current_user = db.users.find_one({'public_id': data['public_id']}, USER_IDENTITY_PROJECTION)
+        if not current_user:
+            return None, {'message': 'User not found!'}
+    except Exception as e:
+        return None, {'message': 'Token is invalid!', 'error': str(e)}
+    token_cache.put(token, current_user, data.get('exp'))
+    return current_user, None
+
+def _pool_ocupado(error):
+    """503 con Retry-After cuando el pool de hash de contraseñas está saturado"""
+    response = jsonify({'message': 'Servidor ocupado, inténtalo de nuevo en unos segundos', 'error': str(error)})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+def _limite_de_intentos(data):
+    """
+    Cuenta el intento de login/registro por IP y por email
+
+    Returns:
+        None si se permite; si no, la respuesta 429 con Retry-After
+    """
+    email = data.get('email') if isinstance(data, dict) else None
+    ip = client_ip(request.remote_addr, request.headers.get('X-Forwarded-For'))
+    wait = login_throttle.check(ip, email if isinstance(email, str) else None)
+    if not wait:
+        return None
+    retry_after = max(1, math.ceil(wait))
+    response = jsonify({'message': 'Demasiados intentos, inténtalo de nuevo más tarde', 'retry_after': retry_after})
+    response.headers['Retry-After'] = str(retry_after)
+    return response, 429
+
 def register():
     data = request.get_json()
     
+    # Antes de cualquier consulta o hash
+    limitado = _limite_de_intentos(data)
+    if limitado:
+        return limitado
+    
     # Validate input
     if not data or not data.get('email') or not data.get('password') or not data.get('name'):
         return jsonify({'message': 'Missing required fields'}), 400
         
-    hashed_password = generate_password_hash(data['password'], method='pbkdf2:sha256')
-    
     # Check if user already exists
     if db.users.find_one({'email': data['email']}):
         return jsonify({'message': 'User already exists!'}), 400
         
+    # El hash se calcula en el pool de procesos (no bloquea las partidas)
+    try:
+        hashed_password = password_pool.hash(data['password'])
+    except PasswordPoolBusy as e:
+        return _pool_ocupado(e)
+    
     # Create new user
     user = {
         'public_id': str(uuid.uuid4()),
@@ -58,6 +126,7 @@ def register():
     }
     
     db.users.insert_one(user)
+    leaderboard.set(user['public_id'], 0, user['name'])
     
     # Generate token for immediate login
     token = jwt.encode(
@@ -78,13 +147,23 @@ def register():
 def login():
     auth = request.get_json()
     
+    # Antes de cualquier consulta o hash
+    limitado = _limite_de_intentos(auth)
+    if limitado:
+        return limitado
+    
     if not auth or not auth.get('email') or not auth.get('password'):
         return jsonify({'message': 'Email and password are required!'}), 400
     
     user = db.users.find_one({'email': auth['email']})
     
-    if not user or not check_password_hash(user['password'], auth['password']):
+    try:
+        valid = bool(user) and password_pool.check(user['password'], auth['password'])
+    except PasswordPoolBusy as e:
+        return _pool_ocupado(e)
+    if not valid:
         return jsonify({'message': 'Invalid email or password!'}), 401
+    login_throttle.succeeded(auth['email'])
     
     token = jwt.encode(
         {'public_id': user['public_id'], 'exp': datetime.datetime.utcnow() + datetime.timedelta(days=1)},
@@ -100,6 +179,14 @@ def login():
         }
     }), 200
 
+@token_required
+def logout(current_user):
+    """Revoca el token de la sesión (deja de aceptarse hasta que expire)"""
+    token = request.headers['x-access-token']
+    exp = jwt.decode(token, options={'verify_signature': False}).get('exp')
+    token_cache.revoke(token, exp or 0)
+    return jsonify({'message': 'Logged out'}), 200
+
 def obtener_usuarios():
     """Obtiene lista de usuarios con sus partidas ganadas ordenadas por ranking"""
     try:
@@ -125,14 +212,105 @@ def obtener_usuarios():
     except Exception as e:
         return jsonify({'message': 'Error al obtener usuarios', 'error': str(e)}), 500
 
-def incrementar_partidas_ganadas(public_id):
-    """Incrementa el contador de partidas ganadas de un usuario"""
+def obtener_ranking():
+    """Página del ranking global (?limit=&cursor=) con ETag / If-None-Match"""
+    try:
+        limit = int(request.args.get('limit', RANKING_DEFAULT_LIMIT))
+        body, etag = ranking_cache.page(limit, request.args.get('cursor') or None)
+    except ValueError:
+        return jsonify({'message': 'Parámetros de ranking inválidos'}), 400
+    except Exception as e:
+        return jsonify({'message': 'Error al obtener ranking', 'error': str(e)}), 500
+
+    if request.if_none_match.contains(etag):
+        ranking_not_modified_total.inc()
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    # El navegador puede guardar la página pero debe revalidarla siempre
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def _leaderboard_no_listo():
+    return jsonify({'message': 'El ranking se está cargando, intenta de nuevo'}), 503
+
+def obtener_top():
+    """Primeros jugadores del leaderboard en memoria (?limit=)"""
+    if not leaderboard.ready:
+        return _leaderboard_no_listo()
+    try:
+        limit = max(1, min(int(request.args.get('limit', 10)), LEADERBOARD_MAX_LIMIT))
+    except ValueError:
+        return jsonify({'message': 'limit inválido'}), 400
+    return jsonify({'usuarios': leaderboard.top(limit), 'total': len(leaderboard)}), 200
+
+def obtener_posicion(public_id):
+    """Posición de un jugador en el ranking global"""
+    if not leaderboard.ready:
+        return _leaderboard_no_listo()
+    posicion = leaderboard.rank(public_id)
+    if posicion is None:
+        return jsonify({'message': 'Usuario no encontrado'}), 404
+    return jsonify(posicion), 200
+
+def obtener_vecinos(public_id):
+    """Jugadores alrededor de uno en el ranking (?radius=)"""
+    if not leaderboard.ready:
+        return _leaderboard_no_listo()
+    try:
+        radius = max(0, min(int(request.args.get('radius', 5)), LEADERBOARD_MAX_RADIUS))
+    except ValueError:
+        return jsonify({'message': 'radius inválido'}), 400
+    vecinos = leaderboard.around(public_id, radius)
+    if vecinos is None:
+        return jsonify({'message': 'Usuario no encontrado'}), 404
+    return jsonify(vecinos), 200
+
+def obtener_historial(public_id):
+    """Partidas recientes de un jugador (?limit=&before=)"""
     try:
-        db.users.update_one(
-            {'public_id': public_id},
-            {'$inc': {'games_won': 1}}
-        )
+        limit = int(request.args.get('limit', MATCH_HISTORY_DEFAULT_LIMIT))
+    except ValueError:
+        return jsonify({'message': 'limit inválido'}), 400
+    try:
+        historial = match_history.recent(public_id, limit, request.args.get('before') or None)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    return jsonify(historial), 200
+
+def obtener_estadisticas(public_id):
+    """Estadísticas acumuladas de un jugador (partidas, aciertos, tiempos)"""
+    return jsonify(match_history.stats(public_id)), 200
+
+def obtener_partida(match_id):
+    """Partida completa con las respuestas de cada jugador"""
+    try:
+        partida = match_history.match(match_id)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    if partida is None:
+        return jsonify({'message': 'Partida no encontrada'}), 404
+    return jsonify(partida), 200
+
+def incrementar_partidas_ganadas(public_id, name=None):
+    """
+    Incrementa el contador de partidas ganadas de un usuario
+
+    El $inc se escribe en lote con la cola de write_behind (no espera a
+    MongoDB); el leaderboard en memoria se actualiza en el momento.
+    """
+    try:
+        write_behind.increment_wins(public_id)
+        leaderboard.increment(public_id, name=name)
         return True
     except Exception as e:
         print(f"Error al incrementar partidas ganadas: {e}")
-        return False
\ No newline at end of file
+        return False
+
+def obtener_partidas_ganadas(public_id):
+    """Partidas ganadas de un usuario (None si no existe)"""
+    user = db.users.find_one({'public_id': public_id}, {'games_won': 1, '_id': 0})
+    if not user:
+        return None
+    return user.get('games_won', 0)
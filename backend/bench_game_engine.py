@@ -0,0 +1,90 @@
+"""
+Benchmark del motor de juego sin transporte
+
+Juega partidas completas en memoria (sin Socket.IO, red ni esperas, con el
+reloj virtual de simulation.py) y mide cuántos eventos por segundo procesa
+GameEngine.
+
+Uso:
+    python bench_game_engine.py [--lobbies 100] [--players 4] [--questions 20]
+"""
+import argparse
+import random
+import time
+
+from game_engine import GameEngine, QuestionListFeed
+from simulation import VirtualClock, VirtualScheduler
+
+QUESTIONS = [
+    {
+        'question': f'Pregunta {i}',
+        'options': ['A', 'B', 'C', 'D'],
+        'correct_answer': i % 4,
+        'difficulty': 'medium',
+        'category': 'Bench',
+        'explanation': ''
+    }
+    for i in range(50)
+]
+
+
+def run(lobbies, players, questions, seed=0):
+    rng = random.Random(seed)
+    clock = VirtualClock()
+    scheduler = VirtualScheduler(clock)
+    engine = GameEngine(
+        feed=QuestionListFeed(QUESTIONS, rng=rng, per_game=questions),
+        clock=clock,
+        scheduler=scheduler,
+        rng=rng,
+        on_messages=lambda messages: None,
+        log=None
+    )
+    events = 0
+
+    lobby_players = []
+    for lobby_index in range(lobbies):
+        sids = [f'l{lobby_index}p{i}' for i in range(players)]
+        engine.create_lobby(sids[0], {'player_name': sids[0]})
+        lobby_id = engine.user_lobbies[sids[0]]
+        for sid in sids[1:]:
+            engine.join_lobby(sid, {'lobby_id': lobby_id, 'player_name': sid})
+            engine.toggle_ready(sid)
+        engine.start_game(sids[0])
+        events += 2 * players
+        lobby_players.append(sids)
+
+    dispatch = engine.dispatch
+    started = time.perf_counter()
+    # Las pausas entre fases duran como mucho 3s virtuales; el temporizador
+    # de la pregunta (45s) queda pendiente hasta que todos responden
+    scheduler.run_for(5)
+    while engine.active_questions:
+        for sids in lobby_players:
+            for sid in sids:
+                if rng.random() < 0.2:
+                    dispatch('use_power', sid, {'power_type': 'double_points'})
+                    events += 1
+                dispatch('submit_answer', sid, {'answer_index': rng.randrange(4)})
+                events += 1
+        scheduler.run_for(5)
+    elapsed = time.perf_counter() - started
+    return events, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark del motor de juego')
+    parser.add_argument('--lobbies', type=int, default=100)
+    parser.add_argument('--players', type=int, default=4)
+    parser.add_argument('--questions', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    events, elapsed = run(args.lobbies, args.players, args.questions, args.seed)
+    print(f"✓ {events} eventos en {elapsed:.3f}s -> {events / elapsed:,.0f} eventos/s "
+          f"({args.lobbies} lobbys x {args.players} jugadores, hasta {args.questions} preguntas)")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
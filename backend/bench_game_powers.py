@@ -0,0 +1,268 @@
+"""
+Benchmark de GamePowersManager (arrays por lobby) contra el diseño original
+(un PlayerPowersManager por jugador con objetos Power, dicts e if/elif)
+
+El diseño original es una copia congelada de powers.py anterior a los cambios
+de rendimiento, así la comparación no depende del código actual.
+
+Uso:
+    python bench_game_powers.py [--sizes 10 100 1000] [--repeat 5]
+"""
+import argparse
+import timeit
+from enum import Enum
+from typing import Dict, List, Tuple
+
+from powers import GamePowersManager
+
+
+# ----------------------------------------------------------------------
+# Copia congelada del diseño original (no modificar)
+# ----------------------------------------------------------------------
+
+class PowerType(Enum):
+    """Tipos de poderes disponibles"""
+    FIFTY_FIFTY = "fifty_fifty"           # Elimina 2 respuestas incorrectas
+    DOUBLE_POINTS = "double_points"       # Duplica puntos si acierta
+    TIME_BOOST = "time_boost"             # Añade 10 segundos más
+
+
+class PowerCost(Enum):
+    """Costes de cada poder en puntos"""
+    FIFTY_FIFTY = 700          # Costo ajustado - elimina 2 opciones
+    DOUBLE_POINTS = 900        # Costo ajustado - duplica puntos
+    TIME_BOOST = 400           # Costo ajustado - más tiempo
+
+
+class Power:
+    """Clase que representa un poder individual"""
+    
+    def __init__(self, power_type: PowerType, cost: int, description: str, effect: str):
+        self.power_type = power_type
+        self.cost = cost
+        self.description = description
+        self.effect = effect
+        self.is_used = False
+    
+    def to_dict(self):
+        """Convierte el poder a diccionario para enviar al cliente"""
+        return {
+            "power_type": self.power_type.value,
+            "cost": self.cost,
+            "description": self.description,
+            "effect": self.effect,
+            "is_used": self.is_used
+        }
+
+
+LEGACY_POWERS_CONFIG = {
+    PowerType.FIFTY_FIFTY: {
+        "cost": PowerCost.FIFTY_FIFTY.value,
+        "name": "50/50",
+        "description": "Elimina 2 respuestas incorrectas",
+        "effect": "Reduce las opciones a solo 2 (1 correcta y 1 incorrecta)",
+        "emoji": "🎯"
+    },
+    PowerType.DOUBLE_POINTS: {
+        "cost": PowerCost.DOUBLE_POINTS.value,
+        "name": "Doble Puntos",
+        "description": "Duplica los puntos de esta pregunta",
+        "effect": "Si aciertas, ganas el doble de puntos",
+        "emoji": "⭐"
+    },
+    PowerType.TIME_BOOST: {
+        "cost": PowerCost.TIME_BOOST.value,
+        "name": "Tiempo Extra",
+        "description": "Añade 10 segundos más para responder",
+        "effect": "Amplía el temporizador de la pregunta",
+        "emoji": "⏱️"
+    }
+}
+
+
+class LegacyPlayerPowersManager:
+    """Gestor de poderes por jugador (persistencia por partida para ese jugador)"""
+
+    def __init__(self):
+        self.available_powers: List[Power] = []
+        self.used_powers: List[Power] = []
+        self.used_power_types_this_game = set()
+        self.points_surcharge_multiplier = 1.0
+        self.double_points_active = False
+
+    def generate_question_powers(self, player_used_powers: List[str] = None) -> List[Dict]:
+        self.available_powers = []
+        self.used_powers = []
+        for power_type, config in LEGACY_POWERS_CONFIG.items():
+            power = Power(
+                power_type=power_type,
+                cost=config["cost"],
+                description=config["description"],
+                effect=config["effect"]
+            )
+            if power_type.value in self.used_power_types_this_game:
+                power.is_used = True
+            self.available_powers.append(power)
+        return [p.to_dict() for p in self.available_powers]
+
+    def get_used_powers(self) -> List[str]:
+        return list(self.used_power_types_this_game)
+
+    def can_use_power(self, power_type: str, current_points: int) -> Tuple[bool, str]:
+        try:
+            p_type = PowerType(power_type)
+        except ValueError:
+            return False, "Poder no válido"
+        power = next((p for p in self.available_powers if p.power_type == p_type), None)
+        if not power:
+            return False, "Poder no disponible"
+        if p_type.value in self.used_power_types_this_game:
+            return False, "Este poder ya lo usaste en esta partida"
+        if current_points < power.cost:
+            return False, f"No tienes suficientes puntos. Necesitas {power.cost}, tienes {current_points}"
+        return True, "Poder disponible"
+
+    def use_power(self, power_type: str, current_points: int) -> Tuple[bool, Dict]:
+        can_use, msg = self.can_use_power(power_type, current_points)
+        if not can_use:
+            return False, {"error": msg}
+        p_type = PowerType(power_type)
+        power = next((p for p in self.available_powers if p.power_type == p_type), None)
+        if not power:
+            return False, {"error": "Poder no disponible"}
+        effective_cost = int(round(power.cost * self.points_surcharge_multiplier))
+        if current_points < effective_cost:
+            return False, {"error": f"No tienes suficientes puntos. Necesitas {effective_cost}, tienes {current_points}"}
+        self.used_power_types_this_game.add(p_type.value)
+        effect_data = self._apply_power_effect(p_type)
+        power.is_used = True
+        self.used_powers.append(power)
+        return True, {
+            "success": True,
+            "power_type": power_type,
+            "cost": effective_cost,
+            "new_points": current_points - effective_cost,
+            "effect": effect_data
+        }
+
+    def _apply_power_effect(self, power_type: PowerType) -> Dict:
+        if power_type == PowerType.FIFTY_FIFTY:
+            return {
+                "type": "fifty_fifty",
+                "message": "Se han eliminado 2 opciones incorrectas",
+                "remaining_options": 2
+            }
+        elif power_type == PowerType.DOUBLE_POINTS:
+            self.double_points_active = True
+            return {
+                "type": "double_points",
+                "message": "¡Ganarás el doble de puntos en esta pregunta!",
+                "multiplier": 2
+            }
+        elif power_type == PowerType.TIME_BOOST:
+            return {
+                "type": "time_boost",
+                "message": "Se añadieron 10 segundos al temporizador",
+                "added_time": 10
+            }
+        return {"type": "unknown"}
+
+    def has_double_points_active(self) -> bool:
+        return self.double_points_active
+
+    def clear_double_points(self):
+        self.double_points_active = False
+
+    def reset_for_new_question(self):
+        self.available_powers = []
+        self.used_powers = []
+        # Doble puntos solo dura una pregunta
+        self.double_points_active = False
+
+    def reset_for_new_game(self):
+        self.available_powers = []
+        self.used_powers = []
+        self.used_power_types_this_game = set()
+        self.double_points_active = False
+
+
+class LegacyGamePowersManager:
+    """Gestor de poderes del lobby: crea y mantiene gestores por jugador"""
+
+    def __init__(self):
+        self.player_managers: Dict[str, LegacyPlayerPowersManager] = {}
+
+    def get_or_create_manager(self, socket_id: str) -> LegacyPlayerPowersManager:
+        if socket_id not in self.player_managers:
+            self.player_managers[socket_id] = LegacyPlayerPowersManager()
+        return self.player_managers[socket_id]
+
+    def remove_player(self, socket_id: str):
+        if socket_id in self.player_managers:
+            del self.player_managers[socket_id]
+
+    def reset_all_for_new_question(self):
+        for mgr in self.player_managers.values():
+            mgr.reset_for_new_question()
+
+    def reset_all_for_new_game(self):
+        for mgr in self.player_managers.values():
+            mgr.reset_for_new_game()
+
+
+    # Llamadas que hacía sockets.py en cada pregunta
+    def question_powers(self, socket_id: str):
+        manager = self.get_or_create_manager(socket_id)
+        return manager.generate_question_powers(player_used_powers=manager.get_used_powers())
+
+    def players_with_double_points(self):
+        return [sid for sid, mgr in self.player_managers.items() if mgr.has_double_points_active()]
+
+
+def build(manager_cls, size):
+    manager = manager_cls()
+    socket_ids = [f'sid-{i}' for i in range(size)]
+    for i, sid in enumerate(socket_ids):
+        manager.question_powers(sid)
+        if i % 3 == 0:
+            manager.get_or_create_manager(sid).use_power('double_points', 5000)
+    return manager, socket_ids
+
+
+def question_setup(manager, socket_ids):
+    """Lo que hace send_next_question por cada pregunta"""
+    manager.reset_all_for_new_question()
+    for sid in socket_ids:
+        manager.question_powers(sid)
+
+
+def run(sizes, repeat):
+    cases = [
+        ('reset_all_for_new_question', lambda m, s: m.reset_all_for_new_question()),
+        ('reset_all_for_new_game', lambda m, s: m.reset_all_for_new_game()),
+        ('players_with_double_points', lambda m, s: m.players_with_double_points()),
+        ('question_setup', question_setup),
+    ]
+    print(f"{'operación':<28} {'jugadores':>9} {'original (µs)':>14} {'arrays (µs)':>12} {'speedup':>8}")
+    for name, fn in cases:
+        for size in sizes:
+            timings = []
+            for cls in (LegacyGamePowersManager, GamePowersManager):
+                manager, socket_ids = build(cls, size)
+                number = max(1, 20000 // size)
+                best = min(timeit.repeat(lambda: fn(manager, socket_ids), number=number, repeat=repeat))
+                timings.append(best / number * 1e6)
+            print(f"{name:<28} {size:>9} {timings[0]:>14.2f} {timings[1]:>12.2f} {timings[0] / timings[1]:>7.1f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+    run(args.sizes, args.repeat)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
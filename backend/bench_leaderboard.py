@@ -0,0 +1,62 @@
+"""
+Benchmark del leaderboard en memoria
+
+Carga N usuarios con partidas ganadas al azar y mide la carga inicial y el
+coste por operación de victoria, posición, top-10 y vecinos. Compara la
+posición con lo que costaría contar usuarios con más victorias (lo que haría
+una consulta count sin leaderboard), sobre una muestra.
+
+Uso:
+    python bench_leaderboard.py --users 1000000
+"""
+import argparse
+import random
+import time
+
+from leaderboard import Leaderboard
+
+
+def per_op(fn, ops):
+    started = time.perf_counter()
+    for _ in range(ops):
+        fn()
+    return (time.perf_counter() - started) / ops
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark del leaderboard')
+    parser.add_argument('--users', type=int, default=1000000)
+    parser.add_argument('--ops', type=int, default=50000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    ids = [f'{rng.getrandbits(128):032x}' for _ in range(args.users)]
+    users = [{'public_id': p, 'name': f'J{i}', 'games_won': int(rng.paretovariate(1.2)) - 1}
+             for i, p in enumerate(ids)]
+
+    board = Leaderboard()
+    started = time.perf_counter()
+    board.load(users)
+    print(f"✓ Carga de {args.users:,} usuarios: {time.perf_counter() - started:.2f}s")
+
+    results = {
+        'victoria': per_op(lambda: board.increment(rng.choice(ids)), args.ops),
+        'posición': per_op(lambda: board.rank(rng.choice(ids)), args.ops),
+        'top 10': per_op(lambda: board.top(10), args.ops),
+        'vecinos (±5)': per_op(lambda: board.around(rng.choice(ids), 5), args.ops),
+    }
+    for name, seconds in results.items():
+        print(f"  {name:<14} {seconds * 1e6:8.2f} µs/op  ({1 / seconds:,.0f} ops/s)")
+
+    # Contar usuarios con más victorias recorriendo todos (como un count sin índice)
+    wins = [u['games_won'] for u in users]
+    target = wins[0]
+    started = time.perf_counter()
+    sum(1 for w in wins if w > target)
+    print(f"  contar a mano   {(time.perf_counter() - started) * 1e6:8.0f} µs/op  (O(n), referencia)")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,97 @@
+"""
+Benchmark de partida rápida
+
+Envía miles de pedidos `quick_play` simultáneos al motor (reloj virtual, sin
+red) y mide pedidos por segundo, lobbys formados y cuántos empezaron llenos.
+También mide el Matchmaker solo (add / find / update).
+
+Uso:
+    python bench_matchmaking.py [--requests 10000] [--tiers 4]
+"""
+import argparse
+import random
+import time
+
+from game_engine import GameEngine, QuestionListFeed
+from matchmaking import Matchmaker
+from simulation import SIM_QUESTIONS, VirtualClock, VirtualScheduler
+
+
+def run_engine(requests, tiers, seed=0):
+    rng = random.Random(seed)
+    clock = VirtualClock()
+    scheduler = VirtualScheduler(clock)
+    # Partidas ganadas repartidas entre los niveles por defecto (0-4, 5-19, 20-49, 50+)
+    wins = {f'user{i}': rng.choice((0, 7, 30, 80)[:tiers]) for i in range(requests)}
+    engine = GameEngine(
+        feed=QuestionListFeed(SIM_QUESTIONS, rng=rng, per_game=1),
+        clock=clock,
+        scheduler=scheduler,
+        rng=rng,
+        on_messages=lambda messages: None,
+        skill_lookup=wins.get,
+        authenticate=lambda auth: {'public_id': auth['token'], 'name': auth['token']},
+        id_factory=lambda: f'{rng.getrandbits(32):08x}',
+        log=None
+    )
+
+    for i in range(requests):
+        engine.connect(f'sid{i}', {'token': f'user{i}'})
+    started = time.perf_counter()
+    for i in range(requests):
+        engine.quick_play(f'sid{i}', {})
+    elapsed = time.perf_counter() - started
+
+    full = sum(1 for lobby in engine.lobbies.values()
+               if lobby['status'] == 'playing' and len(lobby['players']) == lobby['max_players'])
+    waiting = len(engine.matchmaker)
+    # Los que quedaron esperando empiezan al agotarse la espera
+    scheduler.run_until(clock.now + 60)
+    return {
+        'elapsed': elapsed,
+        'lobbies': len(engine.lobbies),
+        'full': full,
+        'waiting': waiting,
+        'started_after_wait': sum(1 for lobby in engine.lobbies.values()
+                                  if lobby['status'] != 'waiting') - full
+    }
+
+
+def run_matchmaker(operations, max_players=4, seed=0):
+    rng = random.Random(seed)
+    matchmaker = Matchmaker(max_players=max_players)
+    free = {}
+    started = time.perf_counter()
+    for i in range(operations):
+        lobby_id = matchmaker.find(rng.randrange(4))
+        if lobby_id is None:
+            lobby_id = f'l{i}'
+            free[lobby_id] = max_players - 1
+            matchmaker.add(lobby_id, rng.randrange(4), free[lobby_id])
+        else:
+            free[lobby_id] -= 1
+            matchmaker.update(lobby_id, free[lobby_id])
+    return time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de partida rápida')
+    parser.add_argument('--requests', type=int, default=10000)
+    parser.add_argument('--tiers', type=int, default=4, help='Niveles de habilidad usados (1-4)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    result = run_engine(args.requests, max(1, min(4, args.tiers)), args.seed)
+    print(f"✓ {args.requests} quick_play en {result['elapsed']:.3f}s -> "
+          f"{args.requests / result['elapsed']:,.0f} pedidos/s")
+    print(f"  {result['lobbies']} lobbys: {result['full']} llenos al instante, "
+          f"{result['waiting']} esperando ({result['started_after_wait']} empezaron tras la espera)")
+
+    elapsed = run_matchmaker(args.requests * 10, seed=args.seed)
+    print(f"✓ Matchmaker: {args.requests * 10} operaciones en {elapsed:.3f}s -> "
+          f"{args.requests * 10 / elapsed:,.0f} ops/s")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
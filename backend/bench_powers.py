@@ -0,0 +1,149 @@
+"""
+Micro-benchmarks de poderes y puntuación
+
+Mide el coste por operación de lo que se ejecuta en cada pregunta y compara
+con una base: la local (bench_results.json, fuera del repo) si existe, o la de
+referencia versionada (bench_powers_baseline.json). Termina con código 1
+cuando alguna operación empeora más que el umbral. La referencia se midió en
+otra máquina: para comparaciones finas conviene guardar una base local.
+
+Uso:
+    python bench_powers.py            # mide y compara con la base
+    python bench_powers.py --save     # guarda los resultados como base local
+"""
+import argparse
+import json
+import os
+import platform
+import timeit
+
+from powers import GamePowersManager, PlayerPowersManager
+from scoring import calculate_answer_points
+
+RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_results.json')
+REFERENCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_powers_baseline.json')
+# Empeoramiento tolerado antes de marcar una regresión
+DEFAULT_THRESHOLD = 1.3
+
+
+def _use_power_case():
+    manager = PlayerPowersManager()
+
+    def run():
+        manager.reset_for_new_game()
+        manager.generate_question_powers()
+        manager.use_power('double_points', 5000)
+    return run
+
+
+def _use_power_rejected_case():
+    manager = PlayerPowersManager()
+    manager.generate_question_powers()
+    manager.use_power('fifty_fifty', 5000)
+
+    def run():
+        manager.use_power('fifty_fifty', 5000)
+    return run
+
+
+def _generate_question_powers_case():
+    manager = PlayerPowersManager()
+
+    def run():
+        manager.generate_question_powers()
+    return run
+
+
+def _reset_all_case(players):
+    def factory():
+        game = GamePowersManager()
+        for i in range(players):
+            game.question_powers(f'sid-{i}')
+
+        def run():
+            game.reset_all_for_new_question()
+        return run
+    return factory
+
+
+def _scoring_case():
+    def run():
+        calculate_answer_points(True, 7.3)
+        calculate_answer_points(True, 3.1, True)
+        calculate_answer_points(False, 12.0)
+    return run
+
+
+CASES = {
+    'use_power': _use_power_case,
+    'use_power_rejected': _use_power_rejected_case,
+    'generate_question_powers': _generate_question_powers_case,
+    'reset_all_for_new_question[10]': _reset_all_case(10),
+    'reset_all_for_new_question[1000]': _reset_all_case(1000),
+    'scoring_x3': _scoring_case,
+}
+
+
+def measure(number=20000, repeat=5):
+    """Devuelve nanosegundos por operación (mejor de `repeat`) para cada caso"""
+    results = {}
+    for name, factory in CASES.items():
+        run = factory()
+        best = min(timeit.repeat(run, number=number, repeat=repeat))
+        results[name] = best / number * 1e9
+    return results
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    print(f"{'operación':<36} {'ns/op':>10} {'base':>10} {'ratio':>7}")
+    for name, value in results.items():
+        base = baseline.get(name)
+        if base:
+            ratio = value / base
+            flag = '  ⚠️' if ratio > threshold else ''
+            print(f"{name:<36} {value:>10.0f} {base:>10.0f} {ratio:>7.2f}{flag}")
+            if ratio > threshold:
+                regressions.append(name)
+        else:
+            print(f"{name:<36} {value:>10.0f} {'-':>10} {'-':>7}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Micro-benchmarks de poderes y puntuación')
+    parser.add_argument('--save', action='store_true', help='Guardar como nueva base')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--number', type=int, default=20000)
+    parser.add_argument('--results', default=RESULTS_PATH)
+    args = parser.parse_args(argv)
+
+    results = measure(number=args.number)
+
+    baseline = {}
+    for path in (args.results, REFERENCE_PATH):
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                baseline = json.load(f).get('results', {})
+            print(f"Base: {path}")
+            break
+
+    regressions = compare(results, baseline, args.threshold)
+
+    if args.save:
+        with open(args.results, 'w', encoding='utf-8') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'results': results
+            }, f, indent=2)
+        print(f"✓ Resultados guardados en {args.results}")
+
+    if regressions:
+        print(f"⚠️ Regresiones (> {args.threshold}x): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
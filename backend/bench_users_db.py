@@ -0,0 +1,103 @@
+"""
+Benchmark de las consultas de usuarios en MongoDB
+
+Llena una base de datos de prueba con N usuarios y mide la latencia de las
+consultas de login (por email), token (por public_id) y ranking (top-10 por
+games_won) con los índices de indexes.py y sin ellos (muestra más chica, es
+un recorrido completo por consulta). La base de datos se borra al terminar.
+
+Uso:
+    python bench_users_db.py --users 100000 1000000
+    python bench_users_db.py --uri mongodb://localhost:27017/ --ops 2000
+    python bench_users_db.py --memory --users 100000   # sin servidor (base en memoria)
+"""
+import argparse
+import os
+import random
+import time
+import uuid
+
+from indexes import INDEXES, bootstrap_indexes, unindexed_queries
+from ranking import RANKING_PROJECTION, RANKING_SORT
+
+BATCH = 10000
+
+
+def populate(collection, users: int, rng: random.Random):
+    """Inserta `users` usuarios en lotes y devuelve (emails, public_ids) de muestra"""
+    emails, public_ids = [], []
+    for start in range(0, users, BATCH):
+        docs = []
+        for i in range(start, min(start + BATCH, users)):
+            public_id = str(uuid.UUID(int=rng.getrandbits(128)))
+            docs.append({
+                'public_id': public_id,
+                'name': f'Jugador {i}',
+                'email': f'jugador{i}@example.com',
+                'password': 'pbkdf2:sha256:600000$bench$' + '0' * 64,
+                'games_won': int(rng.paretovariate(1.2)) - 1
+            })
+            if rng.random() < 0.01:
+                emails.append(docs[-1]['email'])
+                public_ids.append(public_id)
+        collection.insert_many(docs, ordered=False)
+    return emails, public_ids
+
+
+def latencies(fn, samples, ops):
+    times = []
+    for i in range(ops):
+        started = time.perf_counter()
+        fn(samples[i % len(samples)])
+        times.append(time.perf_counter() - started)
+    times.sort()
+    return times[len(times) // 2], times[int(len(times) * 0.99)]
+
+
+def measure(collection, emails, public_ids, ops):
+    queries = {
+        'login (email)': (lambda email: collection.find_one({'email': email}), emails),
+        'token (public_id)': (lambda pid: collection.find_one({'public_id': pid}, {'_id': 0, 'name': 1}), public_ids),
+        'ranking top-10': (lambda _: list(collection.find({}, RANKING_PROJECTION).sort(RANKING_SORT).limit(10)), [0]),
+    }
+    for name, (fn, samples) in queries.items():
+        p50, p99 = latencies(fn, samples, ops)
+        print(f"    {name:<18} p50 {p50 * 1000:8.3f} ms   p99 {p99 * 1000:8.3f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de consultas de usuarios')
+    parser.add_argument('--users', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--ops', type=int, default=2000)
+    parser.add_argument('--unindexed-ops', type=int, default=20)
+    parser.add_argument('--uri', default=os.getenv('MONGODB_URI', 'mongodb://localhost:27017/'))
+    parser.add_argument('--db', default='bench_users_db')
+    parser.add_argument('--memory', action='store_true', help='usar la base en memoria de memory_db.py')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    from db import new_client
+    client = new_client(args.uri, 'memory' if args.memory else 'mongo')
+    for users in args.users:
+        client.drop_database(args.db)
+        db = client[args.db]
+        rng = random.Random(args.seed)
+        started = time.perf_counter()
+        emails, public_ids = populate(db.users, users, rng)
+        print(f"✓ {users:,} usuarios insertados en {time.perf_counter() - started:.1f}s")
+
+        print("  sin índices:")
+        measure(db.users, emails, public_ids, args.unindexed_ops)
+
+        bootstrap_indexes(db)
+        missing = unindexed_queries(db)
+        if missing:
+            print(f"⚠️ Consultas sin índice: {missing}")
+        print(f"  con índices ({', '.join(options['name'] for _, options in INDEXES['users'])}):")
+        measure(db.users, emails, public_ids, args.ops)
+    client.drop_database(args.db)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,318 @@
+"""
+Calibración de dificultad a partir de las respuestas reales
+Registra aciertos y tiempos de respuesta por pregunta en columnas compactas
+(arrays), las guarda periódicamente en disco y calcula una dificultad empírica
+que usa el selector de preguntas.
+
+Archivos (en CALIBRATION_DIR):
+    answers.log       respuestas crudas, registros de 9 bytes (clave, ms, acierto)
+    counters.bin      contadores por pregunta en columnas (claves, intentos,
+                      aciertos, suma de tiempos)
+
+Uso:
+    python calibration.py recompute   # recalcula counters.bin desde answers.log
+    python calibration.py show
+"""
+import argparse
+import os
+import struct
+import threading
+import time
+import zlib
+from array import array
+from typing import Dict, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Relativo al backend (no al directorio desde el que se arranca)
+CALIBRATION_DIR = os.getenv(
+    "CALIBRATION_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "calibration_data")
+)
+CALIBRATION_FLUSH_SECONDS = float(os.getenv("CALIBRATION_FLUSH_SECONDS", "30"))
+# Respuestas mínimas antes de confiar en la dificultad empírica
+CALIBRATION_MIN_SAMPLES = int(os.getenv("CALIBRATION_MIN_SAMPLES", "20"))
+
+# Tasa de acierto esperada según la etiqueta de origen (prior bayesiano)
+PRIOR_ACCURACY = {'easy': 0.75, 'medium': 0.55, 'hard': 0.35}
+PRIOR_STRENGTH = 10
+# Tiempo límite de pregunta, para normalizar el tiempo de respuesta
+QUESTION_TIME_LIMIT = 30.0
+# Peso del tiempo de respuesta frente a la tasa de error en la puntuación
+TIME_WEIGHT = 0.2
+# Cortes de la puntuación de dificultad (0 = trivial, 1 = imposible)
+EASY_BELOW = 0.35
+HARD_ABOVE = 0.55
+
+DIFFICULTY_CODES = ('easy', 'medium', 'hard')
+
+COUNTERS_MAGIC = b'GOQC'
+COUNTERS_HEADER = struct.Struct('<4sI')
+LOG_RECORD = struct.Struct('<IIB')
+
+
+def question_key(text: str) -> int:
+    """Clave estable de 32 bits para el texto de una pregunta"""
+    return zlib.crc32(text.encode('utf-8'))
+
+
+def difficulty_score(attempts, correct, time_sum, prior_accuracy):
+    """
+    Puntuación de dificultad entre 0 y 1
+
+    Mezcla la tasa de error (suavizada hacia el prior de la etiqueta) con el
+    tiempo medio de respuesta. Acepta escalares o arrays de numpy.
+    """
+    accuracy = (correct + PRIOR_STRENGTH * prior_accuracy) / (attempts + PRIOR_STRENGTH)
+    if np is not None and isinstance(attempts, np.ndarray):
+        avg_time = np.where(attempts > 0, time_sum / np.maximum(attempts, 1), QUESTION_TIME_LIMIT / 2)
+        time_factor = np.minimum(avg_time / QUESTION_TIME_LIMIT, 1.0)
+    else:
+        avg_time = time_sum / attempts if attempts else QUESTION_TIME_LIMIT / 2
+        time_factor = min(avg_time / QUESTION_TIME_LIMIT, 1.0)
+    return (1 - TIME_WEIGHT) * (1 - accuracy) + TIME_WEIGHT * time_factor
+
+
+def classify(score: float) -> str:
+    if score < EASY_BELOW:
+        return 'easy'
+    if score > HARD_ABOVE:
+        return 'hard'
+    return 'medium'
+
+
+class QuestionCalibration:
+    """Contadores por pregunta en formato columnar"""
+
+    def __init__(self, directory: str = CALIBRATION_DIR,
+                 flush_seconds: float = CALIBRATION_FLUSH_SECONDS,
+                 min_samples: int = CALIBRATION_MIN_SAMPLES):
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+        # Columnas de contadores (una fila por pregunta)
+        self._rows: Dict[int, int] = {}
+        self.keys = array('I')
+        self.attempts = array('I')
+        self.correct = array('I')
+        self.time_sum = array('d')
+
+        # Respuestas aún no escritas en answers.log
+        self._pending = bytearray()
+
+        if directory:
+            self.load()
+
+    @property
+    def counters_path(self):
+        return os.path.join(self.directory, 'counters.bin')
+
+    @property
+    def log_path(self):
+        return os.path.join(self.directory, 'answers.log')
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _row(self, key: int) -> int:
+        row = self._rows.get(key)
+        if row is None:
+            row = len(self.keys)
+            self._rows[key] = row
+            self.keys.append(key)
+            self.attempts.append(0)
+            self.correct.append(0)
+            self.time_sum.append(0.0)
+        return row
+
+    def record(self, question_text: str, is_correct: bool, response_time: float):
+        """Registra una respuesta a una pregunta"""
+        key = question_key(question_text)
+        response_time = min(max(float(response_time), 0.0), QUESTION_TIME_LIMIT)
+        with self._lock:
+            row = self._row(key)
+            self.attempts[row] += 1
+            self.time_sum[row] += response_time
+            if is_correct:
+                self.correct[row] += 1
+            self._pending += LOG_RECORD.pack(key, int(response_time * 1000), 1 if is_correct else 0)
+
+    def record_answers(self, question_text: str, answers: Dict):
+        """
+        Registra todas las respuestas de una pregunta (formato de player_answers)
+
+        Solo se registran las respuestas recibidas: si los que no respondieron
+        cuentan como fallo con el tiempo máximo es porque GameEngine los completa
+        así al agotarse el tiempo (_on_question_timeout) antes de llamar aquí.
+        """
+        for answer in answers.values():
+            self.record(question_text, answer.get('is_correct', False), answer.get('response_time', QUESTION_TIME_LIMIT))
+        self.flush_if_due()
+
+    def difficulty_for(self, question_text: str, default: Optional[str] = None) -> Optional[str]:
+        """
+        Dificultad empírica de una pregunta
+
+        Args:
+            question_text: texto de la pregunta
+            default: dificultad de la etiqueta de origen (también se usa como prior)
+
+        Returns:
+            'easy' | 'medium' | 'hard', o `default` si aún no hay suficientes respuestas
+        """
+        row = self._rows.get(question_key(question_text))
+        if row is None or self.attempts[row] < self.min_samples:
+            return default
+        prior = PRIOR_ACCURACY.get(default, PRIOR_ACCURACY['medium'])
+        return classify(difficulty_score(self.attempts[row], self.correct[row], self.time_sum[row], prior))
+
+    def flush_if_due(self):
+        if time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        """Añade las respuestas pendientes al log y reescribe los contadores"""
+        self._last_flush = time.monotonic()
+        if not self.directory:
+            self._pending = bytearray()
+            return
+        with self._lock:
+            pending, self._pending = bytes(self._pending), bytearray()
+            keys = array('I', self.keys)
+            attempts = array('I', self.attempts)
+            correct = array('I', self.correct)
+            time_sum = array('d', self.time_sum)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            if pending:
+                with open(self.log_path, 'ab') as f:
+                    f.write(pending)
+            self._write_counters(keys, attempts, correct, time_sum)
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar la calibración: {e}")
+
+    def _write_counters(self, keys, attempts, correct, time_sum):
+        tmp_path = self.counters_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(COUNTERS_HEADER.pack(COUNTERS_MAGIC, len(keys)))
+            for column in (keys, attempts, correct, time_sum):
+                f.write(column.tobytes())
+        os.replace(tmp_path, self.counters_path)
+
+    def load(self):
+        """Carga counters.bin si existe"""
+        try:
+            with open(self.counters_path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return
+        if len(data) < COUNTERS_HEADER.size:
+            return
+        magic, count = COUNTERS_HEADER.unpack_from(data, 0)
+        if magic != COUNTERS_MAGIC:
+            print("⚠️ Archivo de calibración inválido, se ignora")
+            return
+        columns = [array('I'), array('I'), array('I'), array('d')]
+        offset = COUNTERS_HEADER.size
+        for column in columns:
+            size = count * column.itemsize
+            column.frombytes(data[offset:offset + size])
+            offset += size
+        with self._lock:
+            self.keys, self.attempts, self.correct, self.time_sum = columns
+            self._rows = {key: row for row, key in enumerate(self.keys)}
+
+    def recompute(self) -> int:
+        """
+        Recalcula todos los contadores desde answers.log en lote
+
+        Con numpy se agrega con bincount (millones de respuestas en segundos);
+        sin numpy se recorre el log en Python.
+
+        Returns:
+            cantidad de respuestas procesadas
+        """
+        self.flush()
+        if not os.path.exists(self.log_path):
+            return 0
+
+        if np is not None:
+            dtype = np.dtype([('key', '<u4'), ('ms', '<u4'), ('correct', 'u1')])
+            log = np.fromfile(self.log_path, dtype=dtype)
+            keys, inverse = np.unique(log['key'], return_inverse=True)
+            attempts = np.bincount(inverse, minlength=len(keys))
+            correct = np.bincount(inverse, weights=log['correct'], minlength=len(keys))
+            time_sum = np.bincount(inverse, weights=log['ms'] / 1000.0, minlength=len(keys))
+            columns = (
+                array('I', keys.astype('<u4').tobytes()),
+                array('I', attempts.astype('<u4').tobytes()),
+                array('I', correct.astype('<u4').tobytes()),
+                array('d', time_sum.astype('<f8').tobytes()),
+            )
+            total = len(log)
+        else:
+            totals: Dict[int, list] = {}
+            total = 0
+            with open(self.log_path, 'rb') as f:
+                data = f.read()
+            for key, ms, ok in LOG_RECORD.iter_unpack(data[:len(data) - len(data) % LOG_RECORD.size]):
+                entry = totals.setdefault(key, [0, 0, 0.0])
+                entry[0] += 1
+                entry[1] += ok
+                entry[2] += ms / 1000.0
+                total += 1
+            ordered = sorted(totals.items())
+            columns = (
+                array('I', [k for k, _ in ordered]),
+                array('I', [v[0] for _, v in ordered]),
+                array('I', [v[1] for _, v in ordered]),
+                array('d', [v[2] for _, v in ordered]),
+            )
+
+        with self._lock:
+            self.keys, self.attempts, self.correct, self.time_sum = columns
+            self._rows = {key: row for row, key in enumerate(self.keys)}
+        self._write_counters(*columns)
+        return total
+
+    def summary(self) -> Dict[str, int]:
+        """Cantidad de preguntas calibradas por dificultad (prior 'medium')"""
+        result = {code: 0 for code in DIFFICULTY_CODES}
+        result['uncalibrated'] = 0
+        for row in range(len(self.keys)):
+            if self.attempts[row] < self.min_samples:
+                result['uncalibrated'] += 1
+                continue
+            score = difficulty_score(self.attempts[row], self.correct[row], self.time_sum[row],
+                                     PRIOR_ACCURACY['medium'])
+            result[classify(score)] += 1
+        return result
+
+
+# Instancia compartida por el servidor
+calibration = QuestionCalibration()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Calibración de dificultad de preguntas')
+    parser.add_argument('command', choices=['recompute', 'show'])
+    parser.add_argument('--dir', default=CALIBRATION_DIR)
+    args = parser.parse_args(argv)
+
+    cal = QuestionCalibration(directory=args.dir)
+    if args.command == 'recompute':
+        started = time.perf_counter()
+        total = cal.recompute()
+        print(f"✓ {total} respuestas procesadas, {len(cal)} preguntas "
+              f"en {time.perf_counter() - started:.2f}s")
+    print(cal.summary())
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
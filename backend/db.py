@@ -0,0 +1,185 @@
+"""
+Acceso a MongoDB
+Un solo cliente por proceso, creado la primera vez que se pide (get_db) y con
+connect=False: no abre conexiones hasta la primera operación. El pool está
+dimensionado para el worker único de eventlet: cientos de greenlets comparten
+MONGO_MAX_POOL_SIZE conexiones y, si están todas ocupadas, esperan como mucho
+MONGO_WAIT_QUEUE_TIMEOUT_MS en lugar de abrir una conexión por greenlet. Los
+timeouts de conexión y de selección de servidor son cortos para que un
+MongoDB caído falle rápido en vez de retener greenlets 30 segundos.
+
+Con DB_BACKEND=memory se usa la base en memoria de memory_db.py: la app, los
+tests y los benchmarks funcionan sin servidor (los datos no se guardan).
+
+Métricas: latencia y fallos de cada comando, conexiones en uso, esperas de
+pool fallidas y estado del servidor según los heartbeats del driver
+(`mongo_up`, que también devuelve GET /health).
+"""
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from pymongo import MongoClient, monitoring
+
+import metrics
+from memory_db import MemoryClient
+
+# 'mongo' o 'memory' (sin servidor, para desarrollo y benchmarks)
+DB_BACKEND = os.getenv("DB_BACKEND", "mongo").lower()
+MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
+MONGODB_DB = os.getenv("MONGODB_DB", "game_on_db")
+# Conexiones máximas / mínimas del pool (compartidas por todos los greenlets)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "20"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+# Espera máxima por una conexión libre del pool
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "2000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_MAX_IDLE_TIME_MS = 60000
+
+mongo_up_gauge = metrics.gauge('mongo_up', '1 si el último heartbeat a MongoDB respondió, 0 si falló')
+mongo_heartbeat_gauge = metrics.gauge('mongo_heartbeat_seconds', 'Duración del último heartbeat a MongoDB')
+mongo_commands_total = metrics.counter('mongo_commands_total', 'Comandos enviados a MongoDB')
+mongo_command_failures_total = metrics.counter('mongo_command_failures_total', 'Comandos de MongoDB que fallaron')
+mongo_command_histogram = metrics.histogram(
+    'mongo_command_seconds', [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1],
+    'Latencia de cada comando de MongoDB'
+)
+mongo_pool_checked_out_gauge = metrics.gauge('mongo_pool_checked_out', 'Conexiones del pool en uso')
+mongo_pool_checkout_failures_total = metrics.counter(
+    'mongo_pool_checkout_failures_total', 'Esperas por una conexión del pool que fallaron (timeout o error)'
+)
+
+
+class _CommandMetrics(monitoring.CommandListener):
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        mongo_commands_total.inc()
+        mongo_command_histogram.observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        mongo_commands_total.inc()
+        mongo_command_failures_total.inc()
+        mongo_command_histogram.observe(event.duration_micros / 1e6)
+
+
+class _PoolMetrics(monitoring.ConnectionPoolListener):
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        mongo_pool_checkout_failures_total.inc()
+
+    def connection_checked_out(self, event):
+        mongo_pool_checked_out_gauge.inc()
+
+    def connection_checked_in(self, event):
+        mongo_pool_checked_out_gauge.dec()
+
+
+class _HeartbeatMetrics(monitoring.ServerHeartbeatListener):
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        _health.update(up=True, latency=event.duration, checked_at=time.time())
+        mongo_up_gauge.set(1)
+        mongo_heartbeat_gauge.set(round(event.duration, 4))
+
+    def failed(self, event):
+        _health.update(up=False, latency=None, checked_at=time.time(), error=str(event.reply))
+        mongo_up_gauge.set(0)
+
+
+# Estado según el último heartbeat (up None = todavía sin heartbeat)
+_health: Dict = {'up': None, 'latency': None, 'checked_at': None}
+_client = None
+_lock = threading.Lock()
+
+
+def new_client(uri: str = None, backend: str = None):
+    """
+    Cliente nuevo con el pool y las métricas del backend
+
+    Args:
+        uri: MongoDB (por defecto MONGODB_URI)
+        backend: 'mongo' o 'memory' (por defecto DB_BACKEND)
+    """
+    backend = (backend or DB_BACKEND).lower()
+    if backend == 'memory':
+        return MemoryClient()
+    return MongoClient(
+        uri or MONGODB_URI,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+        maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+        connect=False,
+        event_listeners=[_CommandMetrics(), _PoolMetrics(), _HeartbeatMetrics()]
+    )
+
+
+def get_client():
+    """Cliente del proceso (se crea la primera vez)"""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = new_client()
+                if DB_BACKEND == 'memory':
+                    _health.update(up=True, latency=0.0, checked_at=time.time())
+                    mongo_up_gauge.set(1)
+                    print("⚠️ Usando la base de datos en memoria (DB_BACKEND=memory): los datos no se guardan")
+    return _client
+
+
+def get_db(name: str = None):
+    """Base de datos de la app (MONGODB_DB)"""
+    return get_client()[name or MONGODB_DB]
+
+
+def health() -> Dict:
+    """Estado de la base de datos según el último heartbeat (sin bloquear)"""
+    latency: Optional[float] = _health.get('latency')
+    return {
+        'backend': DB_BACKEND,
+        'up': _health.get('up'),
+        'latency_ms': round(latency * 1000, 2) if latency is not None else None,
+        'checked_at': _health.get('checked_at'),
+        'error': _health.get('error') if _health.get('up') is False else None
+    }
+
+
+def close():
+    """Cierra el cliente del proceso (el próximo get_db crea otro)"""
+    global _client
+    with _lock:
+        client, _client = _client, None
+    if client is not None:
+        client.close()
@@ -0,0 +1,194 @@
+"""
+Servidor local que imita la API de preguntas y el traductor
+Sirve un corpus fijo con latencia, tasa de errores y rate limit configurables,
+para medir pre-carga, reintentos y límites de tasa sin red.
+
+Uso:
+    python fake_upstream.py --port 8765 --latency-ms 300 --error-rate 0.1 --rate 2
+
+y luego arrancar el backend con:
+    TRIVIA_API_URL=http://127.0.0.1:8765/preguntas
+    TRANSLATE_API_URL=http://127.0.0.1:8765/translate
+
+Endpoints:
+    GET  /preguntas   lista de preguntas en el formato de la API personalizada
+    POST /translate   compatible con LibreTranslate ({"q": ...} -> {"translatedText": ...})
+    GET  /stats       contadores de requests, errores y rechazos por rate limit
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from rate_limit import TokenBucket
+
+# Corpus por defecto (mismo formato que mi-api-preguntas)
+DEFAULT_CORPUS = [
+    {'pregunta': '¿Cuál es la capital de Francia?', 'opciones': ['Madrid', 'París', 'Roma', 'Berlín'],
+     'respuesta': 'París', 'dificultad': 'Fácil', 'categoria': 'Geografía'},
+    {'pregunta': '¿Cuántos lados tiene un hexágono?', 'opciones': ['5', '6', '7', '8'],
+     'respuesta': '6', 'dificultad': 'Fácil', 'categoria': 'Matemáticas'},
+    {'pregunta': '¿Qué planeta es conocido como el planeta rojo?', 'opciones': ['Venus', 'Júpiter', 'Marte', 'Saturno'],
+     'respuesta': 'Marte', 'dificultad': 'Fácil', 'categoria': 'Ciencia'},
+    {'pregunta': '¿En qué año llegó el hombre a la Luna?', 'opciones': ['1965', '1969', '1972', '1975'],
+     'respuesta': '1969', 'dificultad': 'Medio', 'categoria': 'Historia'},
+    {'pregunta': '¿Cuál es el símbolo químico del oro?', 'opciones': ['Ag', 'Au', 'Fe', 'Or'],
+     'respuesta': 'Au', 'dificultad': 'Medio', 'categoria': 'Ciencia'},
+    {'pregunta': '¿Quién pintó La última cena?', 'opciones': ['Miguel Ángel', 'Rafael', 'Leonardo da Vinci', 'Donatello'],
+     'respuesta': 'Leonardo da Vinci', 'dificultad': 'Medio', 'categoria': 'Arte'},
+    {'pregunta': '¿Qué consola lanzó Nintendo en 2001?', 'opciones': ['Wii', 'GameCube', 'N64', 'Switch'],
+     'respuesta': 'GameCube', 'dificultad': 'Medio', 'categoria': 'Videojuegos'},
+    {'pregunta': '¿Cuál es el río más largo de Sudamérica?', 'opciones': ['Paraná', 'Orinoco', 'Amazonas', 'Magdalena'],
+     'respuesta': 'Amazonas', 'dificultad': 'Medio', 'categoria': 'Geografía'},
+    {'pregunta': '¿Cuál es el número atómico del carbono?', 'opciones': ['4', '6', '8', '12'],
+     'respuesta': '6', 'dificultad': 'Difícil', 'categoria': 'Ciencia'},
+    {'pregunta': '¿En qué año cayó el Imperio romano de Occidente?', 'opciones': ['395', '410', '476', '527'],
+     'respuesta': '476', 'dificultad': 'Difícil', 'categoria': 'Historia'},
+    {'pregunta': '¿Qué matemático formuló el último teorema demostrado por Wiles?', 'opciones': ['Euler', 'Fermat', 'Gauss', 'Riemann'],
+     'respuesta': 'Fermat', 'dificultad': 'Legendario', 'categoria': 'Matemáticas'},
+    {'pregunta': '¿Cuál es la capital de Bután?', 'opciones': ['Katmandú', 'Timbu', 'Daca', 'Lhasa'],
+     'respuesta': 'Timbu', 'dificultad': 'Legendario', 'categoria': 'Geografía'},
+]
+
+
+class FakeUpstream:
+    """Configuración y contadores compartidos por los handlers"""
+
+    def __init__(self, corpus=None, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0,
+                 rate=0.0, burst=1.0, seed=0):
+        self.corpus = corpus if corpus is not None else DEFAULT_CORPUS
+        self.corpus_body = json.dumps(self.corpus, ensure_ascii=False).encode('utf-8')
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.limiter = TokenBucket(rate, burst)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'errors': 0, 'throttled': 0, 'translations': 0}
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def admit(self):
+        """
+        Decide qué responder a un request
+
+        Returns:
+            (código HTTP, segundos de latencia a simular)
+        """
+        self._count('requests')
+        if not self.limiter.try_acquire():
+            self._count('throttled')
+            return 429, 0.0
+        with self._lock:
+            fail = self._rng.random() < self.error_rate
+            delay = max(0.0, self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000.0
+        if fail:
+            self._count('errors')
+            return 500, delay
+        return 200, delay
+
+
+def _make_handler(upstream: FakeUpstream):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body=b'', content_type='application/json'):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _admit(self):
+            status, delay = upstream.admit()
+            if delay:
+                time.sleep(delay)
+            if status != 200:
+                self._send(status, json.dumps({'error': 'fake upstream'}).encode('utf-8'))
+                return False
+            return True
+
+        def do_GET(self):
+            if self.path == '/stats':
+                self._send(200, json.dumps(upstream.stats).encode('utf-8'))
+                return
+            if self.path.split('?')[0] != '/preguntas':
+                self._send(404)
+                return
+            if self._admit():
+                self._send(200, upstream.corpus_body)
+
+        def do_POST(self):
+            if self.path != '/translate':
+                self._send(404)
+                return
+            length = int(self.headers.get('Content-Length', 0))
+            try:
+                payload = json.loads(self.rfile.read(length) or b'{}')
+            except ValueError:
+                self._send(400)
+                return
+            if not self._admit():
+                return
+            upstream._count('translations')
+            # Traducción determinista: se marca el texto para poder reconocerlo
+            translated = f"[{payload.get('target', 'es')}] {payload.get('q', '')}"
+            self._send(200, json.dumps({'translatedText': translated}, ensure_ascii=False).encode('utf-8'))
+
+    return Handler
+
+
+def start_fake_upstream(host='127.0.0.1', port=0, **config):
+    """
+    Arranca el servidor en un thread daemon
+
+    Returns:
+        (server, upstream); la URL base es f"http://{host}:{server.server_port}"
+    """
+    upstream = FakeUpstream(**config)
+    server = ThreadingHTTPServer((host, port), _make_handler(upstream))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, upstream
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='API de preguntas y traductor falsos para benchmarks')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--corpus', help='JSON con preguntas en formato de la API personalizada')
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Probabilidad de responder 500')
+    parser.add_argument('--rate', type=float, default=0.0, help='Requests por segundo (0 = sin límite)')
+    parser.add_argument('--burst', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    corpus = None
+    if args.corpus:
+        with open(args.corpus, encoding='utf-8') as f:
+            corpus = json.load(f)
+
+    upstream = FakeUpstream(corpus=corpus, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                            error_rate=args.error_rate, rate=args.rate, burst=args.burst, seed=args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), _make_handler(upstream))
+    server.daemon_threads = True
+    print(f"✓ Fake upstream en http://{args.host}:{args.port} ({len(upstream.corpus)} preguntas)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,1221 @@
+"""
+Motor de juego independiente del transporte
+Contiene todas las reglas de lobbys y partidas (listos, puntuación, poderes,
+victoria, cambio de host, rondas). Cada evento recibe el socket_id de quien lo
+envía y devuelve la lista de mensajes a enviar; sockets.py solo traduce esos
+mensajes a Socket.IO.
+
+Reloj, temporizadores, fuente de preguntas y aleatoriedad se inyectan, así que
+el motor se puede usar en tests, simulaciones y benchmarks sin red ni esperas.
+"""
+import os
+import random
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import metrics
+from matchmaking import (QUICK_PLAY_MIN_PLAYERS, QUICK_PLAY_WAIT_SECONDS, Matchmaker,
+                         quick_play_matched_total, quick_play_requests_total)
+from powers import GamePowersManager, registry as powers_registry
+from scoring import calculate_answer_points
+
+# Puntos para ganar la partida
+WIN_SCORE = 10000
+# Segundos que tiene el jugador para responder (y tiempo de una no respuesta)
+QUESTION_TIME_LIMIT = 30
+# Margen sobre el tiempo de la pregunta más el mayor tiempo extra configurado
+QUESTION_TIMEOUT_MARGIN = 5.0
+# Pausas entre fases (segundos)
+START_DELAY = 2.0            # antes de la primera pregunta
+TIMEOUT_REVEAL_DELAY = 2.0   # tras agotarse el tiempo
+ANSWER_REVEAL_DELAY = 3.0    # tras responder todos
+WIN_DELAY = 2.0              # antes de mostrar resultados al ganar
+# Las respuestas se acumulan por lobby y se puntúan juntas cada tick (0 = al recibirlas)
+ANSWER_TICK_SECONDS = float(os.getenv("ANSWER_TICK_SECONDS", "0.05"))
+
+answer_batch_histogram = metrics.histogram(
+    'answer_batch_size', [1, 2, 4, 8, 16, 32, 64], 'Respuestas puntuadas en cada tick'
+)
+answers_deduplicated_total = metrics.counter(
+    'answers_deduplicated_total', 'Reintentos de respuesta descartados por answer_id'
+)
+
+FALLBACK_QUESTION = {
+    'question': '¿Cuánto es 2 + 2?',
+    'options': ['1', '2', '3', '4'],
+    'correct_answer': 3,
+    'difficulty': 'easy',
+    'category': 'General',
+    'explanation': '2 + 2 = 4'
+}
+
+# Eventos que acepta el motor (mismo nombre que en Socket.IO)
+EVENTS = (
+    'connect', 'disconnect', 'create_lobby', 'join_lobby', 'leave_lobby',
+    'get_lobbies', 'toggle_ready', 'start_game', 'submit_answer', 'time_up',
+    'request_new_round', 'ready_for_new_round', 'back_to_lobby', 'use_power',
+    'send_chat_message', 'get_lobby_update', 'latency_pong', 'quick_play',
+)
+
+
+class Message(NamedTuple):
+    """Mensaje saliente: evento, datos y destino (socket_id o lobby_id)"""
+    event: str
+    data: Any
+    to: str
+    skip_sid: Optional[str] = None
+
+
+class RoomChange(NamedTuple):
+    """Entrada (join=True) o salida de un socket de la sala de un lobby"""
+    sid: str
+    room: str
+    join: bool
+
+
+class ThreadingScheduler:
+    """Temporizadores reales con threading.Timer"""
+
+    def call_later(self, delay: float, callback: Callable[[], None]):
+        timer = threading.Timer(delay, callback)
+        timer.daemon = True
+        timer.start()
+        return timer
+
+
+class QuestionListFeed:
+    """
+    Fuente de preguntas en memoria para tests, simulaciones y benchmarks
+
+    Args:
+        questions: preguntas a repartir (se eligen al azar)
+        rng: generador aleatorio (para resultados reproducibles)
+        per_game: preguntas por partida; al agotarse la partida termina
+    """
+
+    def __init__(self, questions: List[Dict], rng: random.Random = None, per_game: int = None):
+        self.questions = questions
+        self.rng = rng if rng is not None else random.Random()
+        self.per_game = per_game
+        self.served: Dict[str, int] = {}
+
+    def start(self, lobby_id: str, is_active: Callable[[], bool] = None):
+        self.served[lobby_id] = 0
+
+    def first_question(self, lobby_id: str) -> Optional[Dict]:
+        return self.next_question(lobby_id)
+
+    def next_question(self, lobby_id: str) -> Optional[Dict]:
+        served = self.served.get(lobby_id, 0)
+        if self.per_game is not None and served >= self.per_game:
+            return None
+        self.served[lobby_id] = served + 1
+        return self.questions[self.rng.randrange(len(self.questions))]
+
+    def stop(self, lobby_id: str):
+        self.served.pop(lobby_id, None)
+
+
+def _no_log(*args, **kwargs):
+    pass
+
+
+def question_timeout() -> float:
+    """
+    Segundos hasta cerrar la pregunta: el tiempo límite más el mayor tiempo
+    extra de los poderes configurados (con 10s de TIME_BOOST, 45s), así un
+    poder de tiempo nunca deja al cliente contestando una pregunta cerrada
+    """
+    return QUESTION_TIME_LIMIT + powers_registry.table.max_added_time + QUESTION_TIMEOUT_MARGIN
+
+
+class GameEngine:
+    """
+    Estado y reglas de todos los lobbys
+
+    Cada método de evento recibe (sid, data) y devuelve una lista de Message y
+    RoomChange. Lo que ocurre más tarde (temporizador de la pregunta, pausas
+    entre fases) se programa en el scheduler y sus mensajes se entregan a
+    `on_messages`, o se acumulan en `outbox` si no se indicó.
+
+    Args:
+        feed: fuente de preguntas (start, first_question, next_question, stop)
+        clock: reloj monotónico en segundos para medir el tiempo de respuesta
+        scheduler: objeto con call_later(delay, callback) -> handle.cancel()
+        rng: aleatoriedad del 50/50 y de los ids de lobby si no hay id_factory
+        on_messages: callback para los mensajes de pasos programados
+        record_answers: callback(texto_pregunta, respuestas) al cerrar cada pregunta
+        record_win: callback(jugador) al terminar una partida con ganador autenticado
+        record_game: callback(resumen) con el resultado y las respuestas de cada partida terminada
+        latency: LatencyTracker para descontar el RTT de cada jugador (opcional)
+        answer_tick: segundos entre lotes de respuestas (0 = puntuar al recibir)
+        matchmaker: Matchmaker de partida rápida (uno nuevo por defecto)
+        skill_lookup: callback(public_id) -> partidas ganadas, para el nivel en partida rápida
+        authenticate: callback(datos de conexión) -> {'public_id', 'name'} o None (invitado)
+        id_factory: genera ids de lobby
+        now_iso: fecha actual en ISO (created_at y chat)
+        log: función de log (print por defecto; `None` lo desactiva)
+    """
+
+    def __init__(self, feed=None, clock: Callable[[], float] = time.monotonic, scheduler=None,
+                 rng: random.Random = None, on_messages: Callable[[List], None] = None,
+                 record_answers: Callable[[str, Dict], None] = None,
+                 record_win: Callable[[Dict], None] = None,
+                 record_game: Callable[[Dict], None] = None, latency=None,
+                 answer_tick: float = None, matchmaker: Matchmaker = None,
+                 skill_lookup: Callable[[str], Optional[int]] = None,
+                 authenticate: Callable[[Any], Optional[Dict]] = None,
+                 id_factory: Callable[[], str] = None,
+                 now_iso: Callable[[], str] = None, log: Callable = print):
+        self.feed = feed if feed is not None else QuestionListFeed([FALLBACK_QUESTION])
+        self.clock = clock
+        self.scheduler = scheduler if scheduler is not None else ThreadingScheduler()
+        self.rng = rng if rng is not None else random.Random()
+        self.outbox: List = []
+        self.on_messages = on_messages or self.outbox.extend
+        self.record_answers = record_answers
+        self.record_win = record_win
+        self.record_game = record_game
+        self.latency = latency
+        self.answer_tick = ANSWER_TICK_SECONDS if answer_tick is None else answer_tick
+        self.matchmaker = matchmaker if matchmaker is not None else Matchmaker()
+        self.skill_lookup = skill_lookup
+        self.authenticate = authenticate
+        self.id_factory = id_factory or (lambda: str(uuid.uuid4())[:8])
+        self.now_iso = now_iso or (lambda: datetime.now().isoformat())
+        self.log = log or _no_log
+
+        # Lobbys por id
+        self.lobbies: Dict[str, Dict] = {}
+        # Mapeo de socket_id a lobby_id
+        self.user_lobbies: Dict[str, str] = {}
+        # Identidad verificada al conectar por socket_id (solo usuarios autenticados)
+        self.sessions: Dict[str, Dict] = {}
+        # Conexiones en lobbys por usuario autenticado (public_id -> cantidad)
+        self.public_ids: Dict[str, int] = {}
+        # Pregunta activa por lobby
+        self.active_questions: Dict[str, Dict] = {}
+        # Respuestas de la pregunta activa por lobby
+        self.player_answers: Dict[str, Dict] = {}
+        # Respuestas de las preguntas ya cerradas de la partida (para record_game)
+        self.game_rounds: Dict[str, List[Dict]] = {}
+        # Paso programado por lobby (temporizador de pregunta o pausa entre fases)
+        self.question_timers: Dict[str, Any] = {}
+        # Gestor de poderes por lobby
+        self.game_powers_managers: Dict[str, GamePowersManager] = {}
+
+    # ------------------------------------------------------------------
+    # Infraestructura
+    # ------------------------------------------------------------------
+
+    def dispatch(self, event: str, sid: str, data: Dict = None) -> List:
+        """Procesa un evento por nombre (ver EVENTS)"""
+        if event not in EVENTS:
+            return [Message('error', {'message': f'Evento desconocido: {event}'}, sid)]
+        return getattr(self, event)(sid, data)
+
+    def _deliver(self, messages: List):
+        if messages:
+            self.on_messages(messages)
+
+    def _cancel_timer(self, lobby_id: str):
+        timer = self.question_timers.pop(lobby_id, None)
+        if timer:
+            try:
+                timer.cancel()
+            except Exception:
+                pass
+
+    def _schedule(self, lobby_id: str, delay: float, step: Callable[[str], List]):
+        """
+        Programa `step(lobby_id)` como próximo paso del lobby
+
+        Solo hay un paso pendiente por lobby: programar otro (o terminar la
+        partida) cancela el anterior.
+        """
+        self._cancel_timer(lobby_id)
+
+        def run():
+            self._deliver(step(lobby_id))
+
+        self.question_timers[lobby_id] = self.scheduler.call_later(delay, run)
+
+    def _powers(self, lobby_id: str) -> GamePowersManager:
+        if lobby_id not in self.game_powers_managers:
+            self.game_powers_managers[lobby_id] = GamePowersManager()
+        return self.game_powers_managers[lobby_id]
+
+    @staticmethod
+    def _find_player(lobby: Dict, sid: str) -> Optional[Dict]:
+        for player in lobby['players']:
+            if player['socket_id'] == sid:
+                return player
+        return None
+
+    def _lobby_of(self, sid: str, out: List) -> Optional[str]:
+        """lobby_id del jugador, o None (y mensaje de error) si no está en ninguno"""
+        lobby_id = self.user_lobbies.get(sid)
+        if lobby_id is None:
+            out.append(Message('error', {'message': 'No estás en ningún lobby'}, sid))
+        return lobby_id
+
+    def _drop_answers(self, lobby_id: str):
+        """Descarta las respuestas de la pregunta activa (y su tick pendiente)"""
+        answers = self.player_answers.pop(lobby_id, None)
+        if answers is not None and answers['tick'] is not None:
+            answers['tick'].cancel()
+
+    def _delete_lobby(self, lobby_id: str):
+        """Elimina un lobby vacío y todo su estado asociado"""
+        self.lobbies.pop(lobby_id, None)
+        self.game_powers_managers.pop(lobby_id, None)
+        self.active_questions.pop(lobby_id, None)
+        self._drop_answers(lobby_id)
+        self.game_rounds.pop(lobby_id, None)
+        self._cancel_timer(lobby_id)
+        self.matchmaker.remove(lobby_id)
+        self.feed.stop(lobby_id)
+
+    def _count_public_id(self, player: Optional[Dict], delta: int):
+        public_id = player.get('public_id') if player else None
+        if not public_id:
+            return
+        count = self.public_ids.get(public_id, 0) + delta
+        if count > 0:
+            self.public_ids[public_id] = count
+        else:
+            self.public_ids.pop(public_id, None)
+
+    @staticmethod
+    def _promote_host(lobby: Dict, new_host: Dict):
+        lobby['host'] = new_host['socket_id']
+        for player in lobby['players']:
+            player['is_host'] = player is new_host
+
+    def _quick_play_slots_changed(self, lobby_id: str, lobby: Dict) -> List:
+        """Actualiza las plazas libres de un lobby de partida rápida; si se llenó, empieza"""
+        if lobby_id not in self.matchmaker:
+            return []
+        free = lobby['max_players'] - len(lobby['players'])
+        self.matchmaker.update(lobby_id, free)
+        if free <= 0:
+            return self._begin_game(lobby_id)
+        return []
+
+    def prepare_question(self, question: Optional[Dict]) -> Optional[Dict]:
+        """
+        Pre-calcula una vez por pregunta las opciones que elimina el 50/50
+
+        Se eliminan opciones incorrectas hasta dejar 2 (la correcta y una
+        incorrecta). El resultado se guarda en una copia de la pregunta (la de
+        la fuente no se modifica: puede volver a servirse en otra partida) y es
+        el mismo para todos los jugadores que usen el poder.
+        """
+        if question and 'fifty_fifty_eliminated' not in question:
+            question = dict(question)
+            correct = question.get('correct_answer', 0)
+            wrong = [i for i in range(len(question.get('options', []))) if i != correct]
+            question['fifty_fifty_eliminated'] = sorted(self.rng.sample(wrong, max(0, len(wrong) - 1)))
+        return question
+
+    def _record_question_telemetry(self, lobby_id: str):
+        """Registra aciertos y tiempos de la pregunta actual (una sola vez)"""
+        answers = self.player_answers.get(lobby_id)
+        question = self.active_questions.get(lobby_id, {}).get('current_question')
+        if not answers or not question or answers.get('recorded'):
+            return
+        answers['recorded'] = True
+        rounds = self.game_rounds.get(lobby_id)
+        if rounds is not None:
+            rounds.append({
+                'question': question['question'],
+                'correct_answer': answers['correct_answer'],
+                'answers': answers['answers']
+            })
+        if self.record_answers:
+            try:
+                self.record_answers(question['question'], answers['answers'])
+            except Exception as e:
+                self.log(f'⚠️ Error registrando calibración: {e}')
+
+    def _start_round(self, lobby_id: str, label: str = '') -> None:
+        """Prepara la primera pregunta y la fuente de preguntas de una partida"""
+        lobbies = self.lobbies
+        self.feed.start(lobby_id, lambda: lobby_id in lobbies and lobbies[lobby_id]['status'] == 'playing')
+
+        first_question = self.feed.first_question(lobby_id)
+        if not first_question:
+            self.log(f'⚠️ {label}Usando pregunta de fallback')
+            first_question = dict(FALLBACK_QUESTION)
+
+        self.active_questions[lobby_id] = {
+            'current_question': self.prepare_question(first_question),
+            'question_number': 1
+        }
+        if self.record_game is not None:
+            self.game_rounds[lobby_id] = []
+
+    # ------------------------------------------------------------------
+    # Conexión y lobbys
+    # ------------------------------------------------------------------
+
+    def connect(self, sid: str, data: Dict = None) -> List:
+        """Nueva conexión; `data` son los datos de autenticación del cliente (token)"""
+        self.log(f'Cliente conectado: {sid}')
+        identity = None
+        if data and self.authenticate is not None:
+            try:
+                identity = self.authenticate(data)
+            except Exception as e:
+                self.log(f'⚠️ Error autenticando conexión: {e}')
+        if identity:
+            self.sessions[sid] = identity
+        out = [Message('connected', {
+            'message': 'Conectado al servidor',
+            'authenticated': identity is not None
+        }, sid)]
+        if self.latency is not None:
+            # Primera medición de RTT antes de que llegue una pregunta
+            self.latency.track(sid)
+            out.append(Message('latency_ping', self.latency.ping(sid), sid))
+        return out
+
+    def latency_pong(self, sid: str, data: Dict = None) -> List:
+        if self.latency is not None:
+            self.latency.pong(sid, data)
+        return []
+
+    def latency_pings(self) -> List:
+        """Pings periódicos para todas las conexiones medidas"""
+        if self.latency is None:
+            return []
+        return [Message('latency_ping', self.latency.ping(sid), sid) for sid in self.latency.sids()]
+
+    def disconnect(self, sid: str, data: Any = None) -> List:
+        self.log(f'Cliente desconectado: {sid}')
+        self.sessions.pop(sid, None)
+        if self.latency is not None:
+            self.latency.forget(sid)
+        out = []
+        lobby_id = self.user_lobbies.pop(sid, None)
+        if lobby_id is None:
+            return out
+
+        if lobby_id in self.game_powers_managers:
+            self.game_powers_managers[lobby_id].remove_player(sid)
+
+        lobby = self.lobbies.get(lobby_id)
+        if lobby is None:
+            return out
+
+        player = self._find_player(lobby, sid)
+        player_name = player['name'] if player else None
+        was_host = player['is_host'] if player else False
+        lobby['players'] = [p for p in lobby['players'] if p['socket_id'] != sid]
+        self._count_public_id(player, -1)
+
+        if not lobby['players']:
+            self.log(f'Eliminando lobby {lobby_id} - vacío')
+            self._delete_lobby(lobby_id)
+            out.append(Message('lobby_closed', {'message': 'El lobby está vacío'}, lobby_id))
+        elif lobby.get('status') == 'playing' and len(lobby['players']) == 1:
+            # Si el juego está en curso y solo queda un jugador, ese jugador gana
+            self.log(f"Solo queda un jugador en lobby {lobby_id} tras desconexión, finalizando partida")
+            out.extend(self._end_game(lobby_id))
+        else:
+            # Si el host se desconectó, transferir el rol al siguiente jugador
+            if was_host:
+                new_host = lobby['players'][0]
+                new_host['is_host'] = True
+                new_host['ready'] = False
+                lobby['host'] = new_host['socket_id']
+                self.log(f'Nuevo host del lobby {lobby_id}: {new_host["name"]}')
+
+            lobby['player_count'] = len(lobby['players'])
+            self.matchmaker.update(lobby_id, lobby['max_players'] - len(lobby['players']))
+            self.log(f'Jugador {player_name} salió del lobby {lobby_id}')
+            out.append(Message('player_left', {
+                'message': f'{player_name} ha salido del lobby',
+                'lobby': lobby
+            }, lobby_id))
+            out.append(Message('lobby_updated', {'lobby': lobby}, lobby_id))
+        return out
+
+    def _identity(self, sid: str, data: Dict):
+        """(nombre, public_id) del jugador: los de su sesión, o el nombre enviado si es invitado"""
+        session = self.sessions.get(sid)
+        if session is not None:
+            return session['name'], session['public_id']
+        return data.get('player_name', 'Jugador'), None
+
+    def create_lobby(self, sid: str, data: Dict = None) -> List:
+        data = data or {}
+        player_name, public_id = self._identity(sid, data)
+        max_players = data.get('max_players', 4)
+
+        # Verificar si el usuario autenticado ya está en otro lobby
+        if public_id and public_id in self.public_ids:
+            return [Message('error', {'message': 'Ya estás en otro lobby. Sal de él primero.'}, sid)]
+
+        lobby_id = self.id_factory()
+        self.lobbies[lobby_id] = {
+            'id': lobby_id,
+            'host': sid,
+            'players': [{
+                'socket_id': sid,
+                'name': player_name,
+                'public_id': public_id,
+                'is_host': True,
+                'ready': False
+            }],
+            'max_players': max_players,
+            'created_at': self.now_iso(),
+            'status': 'waiting'
+        }
+        self.user_lobbies[sid] = lobby_id
+        self._count_public_id(self.lobbies[lobby_id]['players'][0], 1)
+
+        self.log(f'Lobby creado: {lobby_id} por {player_name}')
+        return [
+            RoomChange(sid, lobby_id, True),
+            Message('lobby_created', {
+                'lobby': self.lobbies[lobby_id],
+                'message': f'Lobby {lobby_id} creado exitosamente'
+            }, sid)
+        ]
+
+    def join_lobby(self, sid: str, data: Dict = None) -> List:
+        data = data or {}
+        lobby_id = data.get('lobby_id')
+        player_name, public_id = self._identity(sid, data)
+
+        lobby = self.lobbies.get(lobby_id)
+        if lobby is None:
+            return [Message('error', {'message': 'Lobby no encontrado'}, sid)]
+
+        # Verificar si el usuario autenticado ya está en este lobby
+        if public_id:
+            for player in lobby['players']:
+                if player.get('public_id') == public_id:
+                    return [Message('error', {'message': 'Ya estás en este lobby con otra conexión'}, sid)]
+
+        if len(lobby['players']) >= lobby['max_players']:
+            return [Message('error', {'message': 'Lobby lleno'}, sid)]
+
+        # Se permite unirse con el juego en curso (jugará desde la siguiente pregunta)
+        player = {
+            'socket_id': sid,
+            'name': player_name,
+            'public_id': public_id,
+            'is_host': False,
+            'ready': False
+        }
+        if lobby['status'] == 'playing':
+            player['score'] = 0
+            player['active_powers'] = {}
+        if lobby_id in self.matchmaker:
+            # En partida rápida no hay que marcarse listo
+            player['ready'] = True
+        lobby['players'].append(player)
+        self.user_lobbies[sid] = lobby_id
+        self._count_public_id(player, 1)
+
+        self.log(f'{player_name} se unió al lobby {lobby_id}')
+        out = [
+            RoomChange(sid, lobby_id, True),
+            Message('lobby_joined', {
+                'lobby': lobby,
+                'message': f'Te uniste al lobby {lobby_id}'
+            }, sid),
+            Message('player_joined', {
+                'lobby': lobby,
+                'player': player,
+                'player_count': len(lobby['players'])
+            }, lobby_id, skip_sid=sid)
+        ]
+        out.extend(self._quick_play_slots_changed(lobby_id, lobby))
+        return out
+
+    def leave_lobby(self, sid: str, data: Dict = None) -> List:
+        out = []
+        lobby_id = self._lobby_of(sid, out)
+        if lobby_id is None:
+            return out
+
+        if lobby_id in self.game_powers_managers:
+            self.game_powers_managers[lobby_id].remove_player(sid)
+
+        del self.user_lobbies[sid]
+        lobby = self.lobbies.get(lobby_id)
+        if lobby is None:
+            return out
+
+        player = self._find_player(lobby, sid)
+        lobby['players'] = [p for p in lobby['players'] if p['socket_id'] != sid]
+        self._count_public_id(player, -1)
+        out.append(RoomChange(sid, lobby_id, False))
+
+        if not lobby['players']:
+            self._delete_lobby(lobby_id)
+            self.log(f'Lobby {lobby_id} eliminado (vacío)')
+        elif lobby.get('status') == 'playing' and len(lobby['players']) == 1:
+            # Promover al único jugador restante como host; la partida termina
+            remaining_player = lobby['players'][0]
+            self._promote_host(lobby, remaining_player)
+            self.log(f"[HOST-REASSIGN] Unico jugador restante {remaining_player.get('name')} ({remaining_player.get('socket_id')}) ahora es host del lobby {lobby_id}")
+            self.log(f"Solo queda un jugador en lobby {lobby_id} tras leave_lobby, finalizando partida")
+            out.extend(self._end_game(lobby_id))
+        else:
+            # Si el host se fue, asignar nuevo host
+            if player and player['is_host']:
+                new_host = lobby['players'][0]
+                new_host['is_host'] = True
+                new_host['ready'] = False
+                lobby['host'] = new_host['socket_id']
+                self.log(f'Nuevo host del lobby {lobby_id}: {new_host["name"]}')
+
+            self.matchmaker.update(lobby_id, lobby['max_players'] - len(lobby['players']))
+            out.append(Message('player_left', {
+                'lobby': lobby,
+                'player_name': player['name'] if player else 'Jugador',
+                'player_count': len(lobby['players'])
+            }, lobby_id))
+            out.append(Message('lobby_updated', {'lobby': lobby}, lobby_id))
+
+        out.append(Message('lobby_left', {'message': 'Saliste del lobby'}, sid))
+        return out
+
+    def get_lobbies(self, sid: str, data: Dict = None) -> List:
+        available_lobbies = [
+            {
+                'id': lobby['id'],
+                'player_count': len(lobby['players']),
+                'max_players': lobby['max_players'],
+                'status': lobby['status'],
+                'host_name': lobby['players'][0]['name'] if lobby['players'] else 'Unknown'
+            }
+            for lobby in self.lobbies.values()
+            if lobby['status'] == 'waiting'
+        ]
+        return [Message('lobbies_list', {'lobbies': available_lobbies}, sid)]
+
+    def toggle_ready(self, sid: str, data: Dict = None) -> List:
+        out = []
+        lobby_id = self._lobby_of(sid, out)
+        if lobby_id is None or lobby_id not in self.lobbies:
+            return out
+        lobby = self.lobbies[lobby_id]
+
+        player = self._find_player(lobby, sid)
+        if player:
+            player['ready'] = not player['ready']
+        return [Message('player_ready_changed', {'lobby': lobby}, lobby_id)]
+
+    def quick_play(self, sid: str, data: Dict = None) -> List:
+        """
+        Partida rápida: une al jugador al lobby en espera más adecuado
+
+        Busca en el matchmaker un lobby de su nivel (el más lleno y antiguo);
+        si no hay ninguno crea uno nuevo que espera jugadores. El lobby empieza
+        solo al llenarse o tras QUICK_PLAY_WAIT_SECONDS con el mínimo de jugadores.
+        """
+        quick_play_requests_total.inc()
+        if sid in self.user_lobbies:
+            return [Message('error', {'message': 'Ya estás en un lobby'}, sid)]
+
+        data = data or {}
+        tier = 0
+        public_id = self.sessions.get(sid, {}).get('public_id')
+        if public_id and self.skill_lookup is not None:
+            try:
+                tier = self.matchmaker.tier_for(self.skill_lookup(public_id))
+            except Exception as e:
+                self.log(f'⚠️ Error obteniendo nivel para partida rápida: {e}')
+
+        lobby_id = self.matchmaker.find(tier)
+        if lobby_id is not None:
+            out = self.join_lobby(sid, dict(data, lobby_id=lobby_id))
+            if self.user_lobbies.get(sid) == lobby_id:
+                quick_play_matched_total.inc()
+            return out
+
+        out = self.create_lobby(sid, dict(data, max_players=self.matchmaker.max_players))
+        lobby_id = self.user_lobbies.get(sid)
+        if lobby_id is None:
+            return out
+        lobby = self.lobbies[lobby_id]
+        lobby['quick_play'] = True
+        lobby['skill_tier'] = tier
+        lobby['players'][0]['ready'] = True
+        self.matchmaker.add(lobby_id, tier, lobby['max_players'] - 1)
+        self._schedule(lobby_id, QUICK_PLAY_WAIT_SECONDS, self._quick_play_timeout)
+        return out
+
+    def _quick_play_timeout(self, lobby_id: str) -> List:
+        """Fin de la espera: empieza con los jugadores que haya, o sigue esperando"""
+        lobby = self.lobbies.get(lobby_id)
+        if lobby is None or lobby_id not in self.matchmaker:
+            return []
+        if len(lobby['players']) >= QUICK_PLAY_MIN_PLAYERS:
+            self.log(f'Partida rápida {lobby_id}: empezando con {len(lobby["players"])} jugadores')
+            return self._begin_game(lobby_id)
+        self._schedule(lobby_id, QUICK_PLAY_WAIT_SECONDS, self._quick_play_timeout)
+        return []
+
+    # ------------------------------------------------------------------
+    # Partida
+    # ------------------------------------------------------------------
+
+    def start_game(self, sid: str, data: Dict = None) -> List:
+        out = []
+        lobby_id = self._lobby_of(sid, out)
+        if lobby_id is None or lobby_id not in self.lobbies:
+            return out
+        lobby = self.lobbies[lobby_id]
+
+        if lobby['host'] != sid:
+            return [Message('error', {'message': 'Solo el host puede iniciar el juego'}, sid)]
+
+        if not all(p['ready'] or p['is_host'] for p in lobby['players']):
+            return [Message('error', {'message': 'No todos los jugadores están listos'}, sid)]
+
+        return self._begin_game(lobby_id)
+
+    def _begin_game(self, lobby_id: str) -> List:
+        """Empieza la partida de un lobby (start_game o partida rápida completa)"""
+        lobby = self.lobbies[lobby_id]
+        self.matchmaker.remove(lobby_id)
+        lobby['status'] = 'playing'
+        lobby['win_score'] = WIN_SCORE
+        for player in lobby['players']:
+            player['score'] = 0
+            player['active_powers'] = {}
+
+        self.game_powers_managers[lobby_id] = GamePowersManager()
+
+        self.log(f'Generando primera pregunta para el lobby {lobby_id}...')
+        self._start_round(lobby_id)
+
+        # Enviar la primera pregunta tras una pausa
+        self._schedule(lobby_id, START_DELAY, self._send_question)
+        return [
+            Message('game_started', {
+                'lobby': lobby,
+                'win_score': WIN_SCORE,
+                'message': '¡Primero en llegar a 10,000 puntos gana!'
+            }, lobby_id),
+            Message('lobby_updated', {'lobby': lobby}, lobby_id)
+        ]
+
+    def _send_question(self, lobby_id: str) -> List:
+        """Envía la pregunta activa a cada jugador con sus poderes"""
+        if lobby_id not in self.active_questions or lobby_id not in self.lobbies:
+            return []
+
+        lobby = self.lobbies[lobby_id]
+        question_data = self.active_questions[lobby_id]
+        question = question_data['current_question']
+
+        # Resetear poderes para la nueva pregunta (limpia flags de doble puntos)
+        powers_manager = self._powers(lobby_id)
+        powers_manager.reset_all_for_new_question()
+
+        out = []
+        total_players = len(lobby['players'])
+        for player in lobby['players']:
+            socket_id = player['socket_id']
+            out.append(Message('new_question', {
+                'question': question['question'],
+                'options': question['options'],
+                'difficulty': question['difficulty'],
+                'category': question['category'],
+                'question_number': question_data['question_number'],
+                'time_limit': QUESTION_TIME_LIMIT,
+                'powers': powers_manager.question_powers(socket_id),
+                'players_answered': 0,
+                'total_players': total_players
+            }, socket_id))
+
+        self.player_answers[lobby_id] = {
+            'start_time': self.clock(),
+            'answers': {},
+            'correct_answer': question['correct_answer'],
+            # Respuestas recibidas y aún sin puntuar: sid -> (opción, tiempo)
+            'pending': {},
+            # Clave de idempotencia aceptada de cada jugador: sid -> answer_id
+            # (la elige el cliente, así que solo vale para su propio reintento)
+            'answer_ids': {},
+            # Tick programado para puntuar el buffer
+            'tick': None
+        }
+
+        self.log(f'Enviando pregunta #{question_data["question_number"]} con poderes individuales al lobby {lobby_id}')
+        out.append(Message('lobby_updated', {'lobby': lobby}, lobby_id))
+
+        self._schedule(lobby_id, question_timeout(), self._on_question_timeout)
+        return out
+
+    def _on_question_timeout(self, lobby_id: str) -> List:
+        """Tiempo agotado: marca como no respondida la pregunta de quien falte"""
+        if lobby_id not in self.lobbies or lobby_id not in self.active_questions:
+            return []
+
+        # Las respuestas recibidas antes del límite se puntúan primero; si con
+        # ellas ya respondieron todos (o alguien ganó) el lote decide el avance
+        out = self._flush_answers(lobby_id)
+        answers = self.player_answers.get(lobby_id)
+        if answers is not None and answers.get('closed'):
+            return out
+        if answers is not None:
+            answers['closed'] = True
+            for player in self.lobbies[lobby_id]['players']:
+                if player['socket_id'] not in answers['answers']:
+                    answers['answers'][player['socket_id']] = {
+                        'answer_index': -1,
+                        'is_correct': False,
+                        'points': 0,
+                        'response_time': QUESTION_TIME_LIMIT
+                    }
+
+        self.log(f'⏰ Tiempo agotado en lobby {lobby_id}')
+        self._record_question_telemetry(lobby_id)
+        self._schedule(lobby_id, TIMEOUT_REVEAL_DELAY, self._advance)
+        return out
+
+    def _advance(self, lobby_id: str) -> List:
+        """Pasa a la siguiente pregunta, o termina la partida si no hay más"""
+        if lobby_id not in self.lobbies or lobby_id not in self.active_questions:
+            return []
+
+        next_question = self.feed.next_question(lobby_id)
+        # La fuente puede tardar: comprobar que la partida sigue activa
+        if lobby_id not in self.lobbies or lobby_id not in self.active_questions:
+            return []
+
+        if next_question:
+            question_data = self.active_questions[lobby_id]
+            question_data['current_question'] = self.prepare_question(next_question)
+            question_data['question_number'] += 1
+            return self._send_question(lobby_id)
+        return self._end_game(lobby_id)
+
+    def _end_game(self, lobby_id: str) -> List:
+        """Finaliza la ronda y envía los resultados"""
+        if lobby_id not in self.lobbies:
+            return []
+
+        self._cancel_timer(lobby_id)
+        self._record_question_telemetry(lobby_id)
+
+        lobby = self.lobbies[lobby_id]
+        lobby['status'] = 'round_finished'
+
+        # Resetear estado ready para la pantalla de fin de ronda
+        for player in lobby['players']:
+            player['ready'] = False
+
+        # Asegurar un host válido si el actual ya no está entre los jugadores
+        socket_ids = [p.get('socket_id') for p in lobby['players']]
+        if lobby.get('host') not in socket_ids and lobby['players']:
+            new_host = lobby['players'][0]
+            self._promote_host(lobby, new_host)
+            self.log(f"[HOST-REASSIGN] end_game: nuevo host {new_host.get('name')} ({new_host.get('socket_id')}) en lobby {lobby_id}")
+
+        sorted_players = sorted(lobby['players'], key=lambda p: p.get('score', 0), reverse=True)
+        results = [
+            {
+                'name': player['name'],
+                'score': player.get('score', 0),
+                'rank': idx + 1
+            }
+            for idx, player in enumerate(sorted_players)
+        ]
+
+        self.log(f'Ronda terminada en lobby {lobby_id}')
+
+        # Registrar victoria
+        if sorted_players and self.record_win:
+            winner = sorted_players[0]
+            if winner.get('public_id'):
+                try:
+                    self.record_win(winner)
+                    self.log(f"Victoria registrada para: {winner['name']}")
+                except Exception as e:
+                    self.log(f'⚠️ Error registrando victoria: {e}')
+
+        if sorted_players and self.record_game:
+            try:
+                self.record_game({
+                    'lobby_id': lobby_id,
+                    'quick_play': bool(lobby.get('quick_play')),
+                    'questions': self.active_questions.get(lobby_id, {}).get('question_number', 0),
+                    'rounds': self.game_rounds.pop(lobby_id, []),
+                    'players': [
+                        {
+                            'socket_id': player['socket_id'],
+                            'public_id': player.get('public_id'),
+                            'name': player['name'],
+                            'score': player.get('score', 0),
+                            'rank': idx + 1
+                        }
+                        for idx, player in enumerate(sorted_players)
+                    ]
+                })
+            except Exception as e:
+                self.log(f'⚠️ Error registrando partida: {e}')
+
+        self.active_questions.pop(lobby_id, None)
+        self._drop_answers(lobby_id)
+        self.game_rounds.pop(lobby_id, None)
+
+        return [
+            Message('round_ended', {
+                'results': results,
+                'winner': results[0] if results else None,
+                'solo_player': len(lobby['players']) == 1
+            }, lobby_id),
+            Message('lobby_updated', {'lobby': lobby}, lobby_id)
+        ]
+
+    def submit_answer(self, sid: str, data: Dict = None) -> List:
+        """
+        Recibe una respuesta y la deja en el buffer del lobby
+
+        Las respuestas se puntúan por lotes en el siguiente tick (ver
+        _flush_answers). El tiempo de respuesta se mide al recibirla. Si el
+        cliente reenvía la misma respuesta (mismo `answer_id`) se descarta sin
+        más trabajo.
+        """
+        out = []
+        lobby_id = self._lobby_of(sid, out)
+        if lobby_id is None:
+            return out
+
+        answers = self.player_answers.get(lobby_id)
+        if lobby_id not in self.lobbies or lobby_id not in self.active_questions or answers is None:
+            return [Message('error', {'message': 'No hay juego activo'}, sid)]
+
+        data = data or {}
+        answer_id = data.get('answer_id')
+        if answer_id is not None and answers['answer_ids'].get(sid) == answer_id:
+            answers_deduplicated_total.inc()
+            return []
+        if sid in answers['answers'] or sid in answers['pending']:
+            return [Message('error', {'message': 'Ya respondiste esta pregunta'}, sid)]
+        if answers.get('closed'):
+            return [Message('error', {'message': 'La pregunta ya terminó'}, sid)]
+
+        # Tiempo medido en el servidor menos la demora de red del jugador (ida
+        # de la pregunta + vuelta de la respuesta), para no penalizar el RTT
+        response_time = self.clock() - answers['start_time']
+        if self.latency is not None:
+            response_time = max(0.0, response_time - self.latency.compensation(sid))
+
+        if answer_id is not None:
+            answers['answer_ids'][sid] = answer_id
+        answers['pending'][sid] = (data.get('answer_index'), response_time)
+
+        if self.answer_tick <= 0:
+            return self._flush_answers(lobby_id)
+        if answers['tick'] is None:
+            answers['tick'] = self.scheduler.call_later(
+                self.answer_tick, lambda: self._deliver(self._flush_answers(lobby_id, answers))
+            )
+        return []
+
+    def _flush_answers(self, lobby_id: str, answers: Dict = None) -> List:
+        """
+        Puntúa todas las respuestas del buffer del lobby de una vez
+
+        Envía un answer_result a cada jugador del lote, y una sola
+        actualización del lobby y una sola comprobación de victoria /
+        todos respondieron para todo el lote.
+        """
+        current = self.player_answers.get(lobby_id)
+        if current is None or (answers is not None and answers is not current):
+            return []
+        answers = current
+        if answers['tick'] is not None:
+            answers['tick'].cancel()
+            answers['tick'] = None
+        pending = answers['pending']
+        lobby = self.lobbies.get(lobby_id)
+        question_data = self.active_questions.get(lobby_id)
+        if not pending or lobby is None or question_data is None:
+            return []
+        answers['pending'] = {}
+        answer_batch_histogram.observe(len(pending))
+
+        correct_answer = answers['correct_answer']
+        explanation = question_data['current_question'].get('explanation', '')
+        players_by_sid = {p['socket_id']: p for p in lobby['players']}
+        powers_manager = self.game_powers_managers.get(lobby_id)
+
+        out = []
+        names = []
+        leader = None
+        for sid, (answer_index, response_time) in pending.items():
+            is_correct = answer_index == correct_answer
+            points = 0
+            player_score = 0
+            player = players_by_sid.get(sid)
+            if player:
+                # Doble puntos activo en el gestor del jugador (se consume al acertar)
+                double_points = False
+                if is_correct and powers_manager is not None:
+                    player_manager = powers_manager.get_or_create_manager(sid)
+                    if player_manager.has_double_points_active():
+                        double_points = True
+                        player_manager.clear_double_points()
+                points = calculate_answer_points(is_correct, response_time, double_points)
+                if double_points:
+                    self.log(f'Doble puntos aplicado! {points} puntos para {player["name"]}')
+
+                player['score'] = player.get('score', 0) + points
+                player_score = player['score']
+                names.append(player['name'])
+                if leader is None or player_score > leader['score']:
+                    leader = player
+
+            answers['answers'][sid] = {
+                'answer_index': answer_index,
+                'is_correct': is_correct,
+                'points': points,
+                'response_time': response_time
+            }
+            out.append(Message('answer_result', {
+                'is_correct': is_correct,
+                'points': points,
+                'total_score': player_score,
+                'correct_answer': correct_answer,
+                'explanation': explanation
+            }, sid))
+
+        out.append(Message('player_answered', {
+            'player_name': names[-1] if names else None,
+            'player_names': names,
+            'total_answered': len(answers['answers']),
+            'total_players': len(lobby['players'])
+        }, lobby_id))
+        out.append(Message('lobby_updated', {'lobby': lobby}, lobby_id))
+
+        if answers.get('closed'):
+            return out
+        if leader is not None and leader['score'] >= lobby.get('win_score', WIN_SCORE):
+            self.log(f'¡{leader["name"]} ganó con {leader["score"]} puntos!')
+            answers['closed'] = True
+            self._schedule(lobby_id, WIN_DELAY, self._end_game)
+        elif len(answers['answers']) >= len(lobby['players']):
+            self.log('✓ Todos respondieron')
+            answers['closed'] = True
+            self._record_question_telemetry(lobby_id)
+            self._schedule(lobby_id, ANSWER_REVEAL_DELAY, self._advance)
+        return out
+
+    def time_up(self, sid: str, data: Dict = None) -> List:
+        """
+        Registra que el jugador no respondió a tiempo
+
+        El avance de pregunta lo maneja el temporizador de la pregunta.
+        """
+        lobby_id = self.user_lobbies.get(sid)
+        answers = self.player_answers.get(lobby_id)
+        if lobby_id not in self.active_questions or answers is None:
+            return []
+        if sid not in answers['answers'] and sid not in answers['pending']:
+            answers['answers'][sid] = {
+                'answer_index': -1,
+                'is_correct': False,
+                'points': 0,
+                'response_time': QUESTION_TIME_LIMIT
+            }
+        return []
+
+    def request_new_round(self, sid: str, data: Dict = None) -> List:
+        out = []
+        lobby_id = self._lobby_of(sid, out)
+        if lobby_id is None:
+            return out
+        lobby = self.lobbies.get(lobby_id)
+        if lobby is None:
+            return [Message('error', {'message': 'Lobby no encontrado'}, sid)]
+
+        if lobby['host'] != sid:
+            return [Message('error', {'message': 'Solo el host puede iniciar una nueva ronda'}, sid)]
+
+        lobby['status'] = 'waiting_new_round'
+        for player in lobby['players']:
+            if not player['is_host']:
+                player['ready'] = False
+
+        self.log(f'Nueva ronda solicitada en lobby {lobby_id}')
+        return [Message('waiting_new_round', {
+            'lobby': lobby,
+            'message': 'Esperando a que todos estén listos'
+        }, lobby_id)]
+
+    def ready_for_new_round(self, sid: str, data: Dict = None) -> List:
+        out = []
+        lobby_id = self._lobby_of(sid, out)
+        if lobby_id is None or lobby_id not in self.lobbies:
+            return out
+        lobby = self.lobbies[lobby_id]
+
+        player = self._find_player(lobby, sid)
+        if player:
+            player['ready'] = True
+        out.append(Message('player_ready_changed', {'lobby': lobby}, lobby_id))
+
+        # Todos los jugadores (incluido el host) deben estar listos
+        if lobby['status'] == 'playing' or not all(p['ready'] for p in lobby['players']):
+            return out
+
+        lobby['status'] = 'playing'
+        for player in lobby['players']:
+            player['score'] = 0
+            player['active_powers'] = {}
+
+        # Resetear todos los poderes para la nueva partida
+        self._powers(lobby_id).reset_all_for_new_game()
+
+        self.log(f'Iniciando nueva ronda en lobby {lobby_id}...')
+        self._start_round(lobby_id, '[new_round] ')
+
+        self._schedule(lobby_id, START_DELAY, self._send_question)
+        out.append(Message('new_round_started', {
+            'lobby': lobby,
+            'message': '¡Nueva ronda comenzando!'
+        }, lobby_id))
+        out.append(Message('lobby_updated', {'lobby': lobby}, lobby_id))
+        return out
+
+    def back_to_lobby(self, sid: str, data: Dict = None) -> List:
+        out = []
+        lobby_id = self._lobby_of(sid, out)
+        if lobby_id is None:
+            return out
+        lobby = self.lobbies.get(lobby_id)
+        if lobby is None:
+            return [Message('error', {'message': 'Lobby no encontrado'}, sid)]
+
+        # Normalmente solo el host puede volver al lobby, pero si la partida ya
+        # terminó (round_finished) cualquier jugador puede hacerlo.
+        if lobby.get('status') != 'round_finished' and lobby['host'] != sid:
+            return [Message('error', {'message': 'Solo el host puede volver al lobby'}, sid)]
+
+        # Si el host registrado ya no está, el jugador que ejecuta la acción pasa a ser host
+        me = self._find_player(lobby, sid)
+        if self._find_player(lobby, lobby.get('host')) is None and me is not None:
+            self._promote_host(lobby, me)
+            self.log(f"[HOST-REASSIGN] back_to_lobby: jugador {me.get('name')} ({sid}) es ahora host del lobby {lobby_id}")
+
+        lobby['status'] = 'waiting'
+        for player in lobby['players']:
+            player['score'] = 0
+            if not player['is_host']:
+                player['ready'] = False
+
+        self._cancel_timer(lobby_id)
+        self.active_questions.pop(lobby_id, None)
+        self._drop_answers(lobby_id)
+        self.game_rounds.pop(lobby_id, None)
+
+        self.log(f'Volviendo al lobby {lobby_id}')
+        return [Message('returned_to_lobby', {
+            'lobby': lobby,
+            'message': 'Volviendo al lobby'
+        }, lobby_id)]
+
+    def use_power(self, sid: str, data: Dict = None) -> List:
+        out = []
+        lobby_id = self._lobby_of(sid, out)
+        if lobby_id is None:
+            return out
+        power_type = (data or {}).get('power_type')
+
+        lobby = self.lobbies.get(lobby_id)
+        if not lobby:
+            return [Message('error', {'message': 'Lobby no encontrado'}, sid)]
+
+        player = self._find_player(lobby, sid)
+        if not player:
+            return [Message('error', {'message': 'Jugador no encontrado en el lobby'}, sid)]
+
+        # Usar siempre los puntos reales del jugador en el lobby
+        player_manager = self._powers(lobby_id).get_or_create_manager(sid)
+        success, result = player_manager.use_power(power_type, player.get('score', 0))
+
+        if not success:
+            self.log(f'Error al usar poder: {result.get("error", "Desconocido")}')
+            return [Message('power_error', {
+                'error': result.get('error', 'Error al usar poder'),
+                'power_type': power_type,
+                'socket_id': sid
+            }, sid)]
+
+        self.log(f'Poder {power_type} usado exitosamente en lobby {lobby_id}')
+
+        # 50/50: enviar las opciones ya eliminadas para esta pregunta
+        # (calculadas una sola vez en prepare_question, nunca la correcta)
+        effect = result['effect']
+        if effect.get('type') == 'fifty_fifty' and lobby_id in self.active_questions:
+            question = self.prepare_question(self.active_questions[lobby_id].get('current_question'))
+            if question:
+                effect['eliminated_options'] = question['fifty_fifty_eliminated']
+        # Lo que ven los demás jugadores (lobby y notificaciones) no incluye las opciones
+        public_effect = {k: v for k, v in effect.items() if k != 'eliminated_options'}
+
+        player['score'] = max(0, result['new_points'])
+        # Registrar el poder como activo para el jugador (se consume al responder)
+        player.setdefault('active_powers', {})[power_type] = public_effect
+
+        return [
+            Message('power_used', {
+                'success': True,
+                'power_type': power_type,
+                'new_points': player['score'],
+                'cost': result['cost'],
+                'effect': effect,
+                'socket_id': sid
+            }, sid),
+            Message('player_used_power', {
+                'player_name': player['name'],
+                'power_type': power_type,
+                'effect': public_effect
+            }, lobby_id, skip_sid=sid),
+            Message('lobby_updated', {'lobby': lobby}, lobby_id)
+        ]
+
+    # ------------------------------------------------------------------
+    # Chat y consultas
+    # ------------------------------------------------------------------
+
+    def send_chat_message(self, sid: str, data: Dict = None) -> List:
+        out = []
+        lobby_id = self._lobby_of(sid, out)
+        if lobby_id is None or lobby_id not in self.lobbies:
+            return out
+
+        player = self._find_player(self.lobbies[lobby_id], sid)
+        if not player:
+            return [Message('error', {'message': 'Jugador no encontrado'}, sid)]
+
+        message = (data or {}).get('message', '').strip()
+        if not message:
+            return []
+
+        return [Message('chat_message', {
+            'socket_id': sid,
+            'player_name': player['name'],
+            'message': message,
+            'timestamp': self.now_iso()
+        }, lobby_id)]
+
+    def get_lobby_update(self, sid: str, data: Dict = None) -> List:
+        lobby = self.lobbies.get(self.user_lobbies.get(sid))
+        if lobby is None:
+            return []
+        return [Message('lobby_updated', {'lobby': lobby}, sid)]
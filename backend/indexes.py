@@ -0,0 +1,156 @@
+"""
+Índices de MongoDB y comprobación de planes de consulta
+Al arrancar se crean los índices que usan las consultas frecuentes (login por
+email, token y victorias por public_id, ranking por games_won, historial por
+jugador) y después se pide a MongoDB el plan de cada una: si alguna recorre
+la colección entera (COLLSCAN) u ordena en memoria (SORT) se avisa a gritos;
+con DB_STRICT_INDEXES el arranque falla.
+
+También se puede usar a mano:
+    python indexes.py bootstrap   # crea los índices
+    python indexes.py check       # sale con código 1 si alguna consulta no usa índice
+"""
+import argparse
+import os
+import threading
+from typing import Dict, List, Tuple
+
+from pymongo import ASCENDING, DESCENDING
+
+from ranking import RANKING_SORT
+
+# Crear índices y comprobar planes antes de aceptar requests (el arranque falla si falta alguno)
+DB_STRICT_INDEXES = os.getenv("DB_STRICT_INDEXES", "").lower() in ('1', 'true', 'yes')
+
+# colección -> [(claves, opciones)]
+INDEXES: Dict[str, List[Tuple[List, Dict]]] = {
+    'users': [
+        ([('email', ASCENDING)], {'name': 'users_email', 'unique': True}),
+        ([('public_id', ASCENDING)], {'name': 'users_public_id', 'unique': True}),
+        (RANKING_SORT, {'name': 'ranking_games_won'}),
+    ],
+    'matches': [
+        ([('i', ASCENDING), ('_id', DESCENDING)], {'name': 'matches_player_recent'}),
+    ],
+}
+
+# (nombre, colección, filtro, orden) de las consultas frecuentes
+HOT_QUERIES = [
+    ('login por email', 'users', {'email': 'nadie@example.com'}, None),
+    ('token / victorias por public_id', 'users', {'public_id': '00000000-0000-0000-0000-000000000000'}, None),
+    ('ranking por games_won', 'users', {}, RANKING_SORT),
+    ('usuarios por games_won', 'users', {}, [('games_won', DESCENDING)]),
+    ('historial por jugador', 'matches', {'i': '00000000-0000-0000-0000-000000000000'}, [('_id', DESCENDING)]),
+]
+
+# Etapas que indican que la consulta no usa un índice
+UNINDEXED_STAGES = {'COLLSCAN', 'SORT'}
+
+
+class MissingIndexError(RuntimeError):
+    """Una consulta frecuente se ejecuta sin índice"""
+
+
+def bootstrap_indexes(db) -> int:
+    """
+    Crea los índices de INDEXES (create_index no hace nada si ya existen)
+
+    Returns:
+        índices asegurados
+    """
+    created = 0
+    for collection, indexes in INDEXES.items():
+        for keys, options in indexes:
+            try:
+                db[collection].create_index(keys, **options)
+                created += 1
+            except Exception as e:
+                # p. ej. emails duplicados impiden el índice único
+                print(f"❌ No se pudo crear el índice {options['name']} en {collection}: {e}")
+    print(f"✓ Índices de MongoDB asegurados: {created}")
+    return created
+
+
+def _stages(plan) -> List[str]:
+    """Nombres de todas las etapas de un plan (explain) anidado"""
+    if isinstance(plan, dict):
+        found = [plan['stage']] if isinstance(plan.get('stage'), str) else []
+        for value in plan.values():
+            found.extend(_stages(value))
+        return found
+    if isinstance(plan, list):
+        return [stage for item in plan for stage in _stages(item)]
+    return []
+
+
+def unindexed_queries(db) -> List[str]:
+    """Consultas de HOT_QUERIES cuyo plan ganador recorre la colección u ordena en memoria"""
+    missing = []
+    for name, collection, query, sort in HOT_QUERIES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = cursor.limit(10).explain().get('queryPlanner', {}).get('winningPlan', {})
+        stages = set(_stages(plan))
+        if stages & UNINDEXED_STAGES:
+            missing.append(f"{name} ({', '.join(sorted(stages & UNINDEXED_STAGES))})")
+    return missing
+
+
+def check_query_plans(db):
+    """Lanza MissingIndexError si alguna consulta frecuente no usa índice"""
+    missing = unindexed_queries(db)
+    if missing:
+        raise MissingIndexError('Consultas sin índice: ' + '; '.join(missing))
+    print(f"✓ Planes de consulta: {len(HOT_QUERIES)} consultas frecuentes usan índice")
+
+
+def bootstrap(db, strict: bool = DB_STRICT_INDEXES):
+    """
+    Índices y comprobación de planes al arrancar
+
+    En modo estricto corre en el arranque y cualquier error lo detiene; si no,
+    corre en segundo plano y solo lo registra (MongoDB puede tardar en estar).
+    """
+    def run():
+        bootstrap_indexes(db)
+        check_query_plans(db)
+
+    if strict:
+        run()
+        return None
+
+    def run_logged():
+        try:
+            run()
+        except MissingIndexError as e:
+            print(f"❌❌ {e}")
+        except Exception as e:
+            print(f"⚠️ No se pudieron comprobar los índices: {e}")
+
+    thread = threading.Thread(target=run_logged, daemon=True)
+    thread.start()
+    return thread
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Índices de MongoDB')
+    parser.add_argument('command', choices=['bootstrap', 'check'])
+    parser.add_argument('--uri', default=os.getenv('MONGODB_URI', 'mongodb://localhost:27017/'))
+    parser.add_argument('--db', default='game_on_db')
+    args = parser.parse_args(argv)
+
+    from db import new_client
+    db = new_client(args.uri)[args.db]
+    if args.command == 'bootstrap':
+        bootstrap_indexes(db)
+    try:
+        check_query_plans(db)
+    except MissingIndexError as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
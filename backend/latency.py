@@ -0,0 +1,125 @@
+"""
+Latencia (RTT) por conexión
+El servidor envía `latency_ping` periódicamente y el cliente lo devuelve como
+`latency_pong`. El RTT se mide siempre con el reloj monotónico del servidor
+(el cliente solo devuelve el id), y se usa para descontar la demora de red del
+tiempo de respuesta, sin penalizar a los jugadores lejanos en el bonus.
+"""
+import itertools
+import os
+import time
+from collections import deque
+from typing import Dict, Optional
+
+import metrics
+
+# Cada cuántos segundos se mide el RTT de cada conexión
+LATENCY_PING_SECONDS = float(os.getenv("LATENCY_PING_SECONDS", "5"))
+# Máximo que se descuenta del tiempo de respuesta (evita abusar retrasando el pong)
+LATENCY_MAX_COMPENSATION = float(os.getenv("LATENCY_MAX_COMPENSATION", "1.0"))
+# Muestras recientes por conexión (se usa la mediana)
+LATENCY_SAMPLES = 7
+# Pings sin respuesta que se recuerdan por conexión
+MAX_PENDING_PINGS = 4
+
+rtt_histogram = metrics.histogram(
+    'client_rtt_seconds', [0.025, 0.05, 0.1, 0.2, 0.4, 0.8, 1.6, 3.2], 'RTT medido por ping/pong'
+)
+compensation_histogram = metrics.histogram(
+    'answer_latency_compensation_seconds', [0.025, 0.05, 0.1, 0.2, 0.4, 0.8, 1.0],
+    'Segundos descontados del tiempo de respuesta por latencia'
+)
+lost_pings_total = metrics.counter('latency_pings_lost_total', 'Pings descartados sin respuesta')
+tracked_gauge = metrics.gauge('latency_tracked_connections', 'Conexiones con medición de RTT')
+
+
+class LatencyTracker:
+    """RTT reciente de cada conexión"""
+
+    def __init__(self, clock=time.monotonic, max_compensation: float = LATENCY_MAX_COMPENSATION,
+                 samples: int = LATENCY_SAMPLES):
+        self._clock = clock
+        self.max_compensation = max_compensation
+        self.samples = samples
+        self._ids = itertools.count(1)
+        # Pings enviados y aún sin respuesta: sid -> {id: instante de envío}
+        self._pending: Dict[str, Dict[int, float]] = {}
+        # Últimas muestras de RTT por sid
+        self._rtts: Dict[str, deque] = {}
+
+    def __len__(self):
+        return len(self._pending)
+
+    def sids(self):
+        return list(self._pending)
+
+    def track(self, sid: str):
+        self._pending.setdefault(sid, {})
+        tracked_gauge.set(len(self._pending))
+
+    def forget(self, sid: str):
+        self._pending.pop(sid, None)
+        self._rtts.pop(sid, None)
+        tracked_gauge.set(len(self._pending))
+
+    def ping(self, sid: str) -> Dict:
+        """Registra un ping para `sid` y devuelve el payload a enviar"""
+        pending = self._pending.setdefault(sid, {})
+        if len(pending) >= MAX_PENDING_PINGS:
+            del pending[min(pending)]
+            lost_pings_total.inc()
+        ping_id = next(self._ids)
+        pending[ping_id] = self._clock()
+        return {'id': ping_id}
+
+    def pong(self, sid: str, data: Optional[Dict]) -> Optional[float]:
+        """
+        Procesa la respuesta de un ping
+
+        Returns:
+            RTT medido en segundos, o None si el id no corresponde a un ping pendiente
+        """
+        pending = self._pending.get(sid)
+        try:
+            ping_id = int((data or {}).get('id'))
+        except (TypeError, ValueError):
+            return None
+        if pending is None or ping_id not in pending:
+            return None
+        rtt = self._clock() - pending.pop(ping_id)
+        samples = self._rtts.get(sid)
+        if samples is None:
+            samples = self._rtts[sid] = deque(maxlen=self.samples)
+        samples.append(rtt)
+        rtt_histogram.observe(rtt)
+        return rtt
+
+    def rtt(self, sid: str) -> Optional[float]:
+        """Mediana de las muestras recientes (robusta a picos), o None sin muestras"""
+        samples = self._rtts.get(sid)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[len(ordered) // 2]
+
+    def compensation(self, sid: str) -> float:
+        """
+        Segundos a descontar del tiempo de respuesta medido en el servidor
+
+        El tiempo desde que se envía la pregunta hasta que llega la respuesta
+        incluye la ida de la pregunta y la vuelta de la respuesta: un RTT.
+        """
+        rtt = self.rtt(sid)
+        if rtt is None:
+            return 0.0
+        compensation = min(rtt, self.max_compensation)
+        compensation_histogram.observe(compensation)
+        return compensation
+
+    def stats(self) -> Dict:
+        rtts = [r for r in (self.rtt(sid) for sid in self._rtts) if r is not None]
+        return {
+            'connections': len(self._pending),
+            'measured': len(rtts),
+            'rtt_median': round(sorted(rtts)[len(rtts) // 2], 4) if rtts else None
+        }
@@ -0,0 +1,272 @@
+"""
+Leaderboard en memoria
+Todos los usuarios ordenados por (partidas ganadas desc, public_id asc) en una
+lista ordenada por bloques con un árbol de Fenwick sobre el tamaño de cada
+bloque. Top-K, posición de un usuario y vecinos alrededor de él cuestan
+O(log n) (más el tamaño de la respuesta), sin contar documentos en MongoDB.
+
+Se carga una vez al arrancar desde la colección de usuarios y se actualiza con
+cada victoria y cada registro. Con varios workers cada uno tiene su copia; las
+victorias registradas por otros workers se ven al volver a cargar.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import metrics
+
+# Tamaño objetivo de cada bloque de la lista ordenada (se parte al doble)
+LEADERBOARD_LOAD = 512
+LEADERBOARD_MAX_LIMIT = 100
+LEADERBOARD_MAX_RADIUS = 25
+
+leaderboard_users_gauge = metrics.gauge('leaderboard_users', 'Usuarios en el leaderboard en memoria')
+leaderboard_warm_gauge = metrics.gauge('leaderboard_warm_seconds', 'Segundos de la última carga del leaderboard')
+
+Key = Tuple[int, str]
+
+
+class OrderStatisticList:
+    """
+    Lista ordenada con acceso por posición en O(log n)
+
+    Los elementos viven en bloques ordenados de ~LEADERBOARD_LOAD; `_maxes`
+    guarda el último de cada bloque (para ubicar uno con bisect) y un árbol de
+    Fenwick la cantidad de elementos por bloque (para pasar de posición a
+    bloque y de bloque a posición).
+    """
+
+    def __init__(self, load: int = LEADERBOARD_LOAD):
+        self.load = load
+        self._chunks: List[List] = []
+        self._maxes: List = []
+        self._tree: List[int] = [0]
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def load_sorted(self, items: List):
+        """Reemplaza el contenido por `items` (ya ordenados)"""
+        load = self.load
+        self._chunks = [items[i:i + load] for i in range(0, len(items), load)]
+        self._maxes = [chunk[-1] for chunk in self._chunks]
+        self._len = len(items)
+        self._rebuild_index()
+
+    def _rebuild_index(self):
+        tree = [0] * (len(self._chunks) + 1)
+        for i, chunk in enumerate(self._chunks, 1):
+            tree[i] += len(chunk)
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _update(self, chunk_index: int, delta: int):
+        tree = self._tree
+        i = chunk_index + 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, chunk_index: int) -> int:
+        """Elementos en los bloques anteriores a `chunk_index`"""
+        tree = self._tree
+        total = 0
+        i = chunk_index
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, index: int) -> Tuple[int, int]:
+        """(bloque, desplazamiento) de la posición `index`"""
+        tree = self._tree
+        chunk = 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            nxt = chunk + step
+            if nxt < len(tree) and tree[nxt] <= index:
+                chunk = nxt
+                index -= tree[nxt]
+            step >>= 1
+        return chunk, index
+
+    def add(self, item):
+        if not self._chunks:
+            self._chunks = [[item]]
+            self._maxes = [item]
+            self._len = 1
+            self._rebuild_index()
+            return
+        i = bisect_left(self._maxes, item)
+        if i == len(self._maxes):
+            i -= 1
+        chunk = self._chunks[i]
+        insort(chunk, item)
+        self._maxes[i] = chunk[-1]
+        self._len += 1
+        if len(chunk) > 2 * self.load:
+            self._chunks[i:i + 1] = [chunk[:self.load], chunk[self.load:]]
+            self._maxes[i:i + 1] = [chunk[self.load - 1], chunk[-1]]
+            self._rebuild_index()
+        else:
+            self._update(i, 1)
+
+    def remove(self, item):
+        i = bisect_left(self._maxes, item)
+        if i == len(self._maxes):
+            raise KeyError(item)
+        chunk = self._chunks[i]
+        j = bisect_left(chunk, item)
+        if chunk[j] != item:
+            raise KeyError(item)
+        del chunk[j]
+        self._len -= 1
+        if chunk:
+            self._maxes[i] = chunk[-1]
+            self._update(i, -1)
+        else:
+            del self._chunks[i]
+            del self._maxes[i]
+            self._rebuild_index()
+
+    def index(self, item) -> int:
+        """Posición (desde 0) de `item`; KeyError si no está"""
+        i = bisect_left(self._maxes, item)
+        if i == len(self._maxes):
+            raise KeyError(item)
+        chunk = self._chunks[i]
+        j = bisect_left(chunk, item)
+        if chunk[j] != item:
+            raise KeyError(item)
+        return self._prefix(i) + j
+
+    def slice(self, start: int, stop: int) -> List:
+        start = max(0, start)
+        stop = min(stop, self._len)
+        if start >= stop:
+            return []
+        chunk, offset = self._locate(start)
+        out = []
+        while len(out) < stop - start:
+            out.extend(self._chunks[chunk][offset:offset + (stop - start - len(out))])
+            chunk += 1
+            offset = 0
+        return out
+
+
+class Leaderboard:
+    """Posición de todos los usuarios por partidas ganadas"""
+
+    def __init__(self, load: int = LEADERBOARD_LOAD):
+        self._lock = threading.RLock()
+        self._list = OrderStatisticList(load)
+        # public_id -> (partidas ganadas, nombre)
+        self._users: Dict[str, Tuple[int, str]] = {}
+        self.ready = False
+        # Usuarios que cambiaron mientras se cargaba (se releen al terminar)
+        self._dirty: Optional[set] = None
+
+    def __len__(self):
+        return len(self._users)
+
+    @staticmethod
+    def _key(public_id: str, games_won: int) -> Key:
+        return (-games_won, public_id)
+
+    def load(self, users: Iterable[Dict]):
+        """Carga todos los usuarios (documentos con public_id, name y games_won)"""
+        entries = {}
+        for user in users:
+            entries[user['public_id']] = (user.get('games_won', 0) or 0, user.get('name', ''))
+        keys = sorted((-games_won, public_id) for public_id, (games_won, _) in entries.items())
+        with self._lock:
+            self._users = entries
+            self._list.load_sorted(keys)
+            self.ready = True
+            leaderboard_users_gauge.set(len(entries))
+
+    def warm(self, collection):
+        """Carga desde MongoDB; las victorias registradas mientras tanto se releen al final"""
+        started = time.perf_counter()
+        with self._lock:
+            self._dirty = set()
+        try:
+            self.load(collection.find({}, {'_id': 0, 'public_id': 1, 'name': 1, 'games_won': 1}))
+            with self._lock:
+                dirty, self._dirty = self._dirty, None
+            if dirty:
+                for user in collection.find({'public_id': {'$in': list(dirty)}},
+                                            {'_id': 0, 'public_id': 1, 'name': 1, 'games_won': 1}):
+                    self.set(user['public_id'], user.get('games_won', 0), user.get('name', ''))
+            leaderboard_warm_gauge.set(round(time.perf_counter() - started, 3))
+            print(f"✓ Leaderboard cargado: {len(self)} usuarios en {time.perf_counter() - started:.2f}s")
+        except Exception as e:
+            with self._lock:
+                self._dirty = None
+            print(f"⚠️ No se pudo cargar el leaderboard: {e}")
+
+    def start_warm(self, collection):
+        """Carga en segundo plano (las rutas responden 503 hasta que termina)"""
+        thread = threading.Thread(target=self.warm, args=(collection,), daemon=True)
+        thread.start()
+        return thread
+
+    def set(self, public_id: str, games_won: int, name: str = None):
+        """Fija las partidas ganadas de un usuario (lo agrega si no estaba)"""
+        with self._lock:
+            if self._dirty is not None:
+                self._dirty.add(public_id)
+            previous = self._users.get(public_id)
+            if previous is not None:
+                if name is None:
+                    name = previous[1]
+                if previous[0] == games_won:
+                    self._users[public_id] = (games_won, name)
+                    return
+                self._list.remove(self._key(public_id, previous[0]))
+            self._users[public_id] = (games_won, name or '')
+            self._list.add(self._key(public_id, games_won))
+            leaderboard_users_gauge.set(len(self._users))
+
+    def increment(self, public_id: str, amount: int = 1, name: str = None):
+        with self._lock:
+            previous = self._users.get(public_id)
+            self.set(public_id, (previous[0] if previous else 0) + amount, name)
+
+    def _entries(self, start: int, keys: List[Key]) -> List[Dict]:
+        users = self._users
+        return [
+            {'rank': start + idx + 1, 'name': users[public_id][1], 'games_won': -negated}
+            for idx, (negated, public_id) in enumerate(keys)
+        ]
+
+    def top(self, limit: int = 10) -> List[Dict]:
+        with self._lock:
+            return self._entries(0, self._list.slice(0, limit))
+
+    def rank(self, public_id: str) -> Optional[Dict]:
+        """Posición (desde 1) del usuario, o None si no está"""
+        with self._lock:
+            user = self._users.get(public_id)
+            if user is None:
+                return None
+            position = self._list.index(self._key(public_id, user[0]))
+            return {'rank': position + 1, 'name': user[1], 'games_won': user[0], 'total': len(self._users)}
+
+    def around(self, public_id: str, radius: int = 5) -> Optional[Dict]:
+        """Usuario y hasta `radius` vecinos por arriba y por abajo"""
+        with self._lock:
+            me = self.rank(public_id)
+            if me is None:
+                return None
+            start = max(0, me['rank'] - 1 - radius)
+            keys = self._list.slice(start, me['rank'] + radius)
+            return {'me': me, 'usuarios': self._entries(start, keys)}
+
+
+# Leaderboard del proceso (lo carga init_auth)
+leaderboard = Leaderboard()
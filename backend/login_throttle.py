@@ -0,0 +1,109 @@
+"""
+Límite de intentos de login y registro
+Cada intento de /login o /register cuesta un hash pbkdf2 y una consulta a
+MongoDB, así que una ráfaga de intentos (relleno de credenciales, clientes
+reintentando en bucle) se traduce directamente en CPU. Estos límites por IP
+y por email se comprueban antes de tocar la base de datos o el pool de hash:
+un intento rechazado responde 429 con Retry-After sin más coste que dos
+contadores en memoria.
+
+Las ventanas son deslizantes (ver SlidingWindowLimiter en rate_limit.py). Un
+login correcto olvida los intentos de ese email. Con varios workers cada uno
+cuenta por su lado salvo con AUTH_RATE_LIMIT_BACKEND=mongo, que comparte los
+contadores en la colección `rate_limits` (con índice TTL).
+"""
+import os
+from typing import Optional
+
+import metrics
+from rate_limit import MemoryWindowStore, MongoWindowStore, SlidingWindowLimiter, parse_rate
+
+# "intentos/segundos" por IP (login y registro juntos) y por email; "0" desactiva
+AUTH_RATE_LIMIT_IP = os.getenv("AUTH_RATE_LIMIT_IP", "100/60")
+AUTH_RATE_LIMIT_EMAIL = os.getenv("AUTH_RATE_LIMIT_EMAIL", "10/300")
+# 'memory' (por worker) o 'mongo' (compartido por todos los workers)
+AUTH_RATE_LIMIT_BACKEND = os.getenv("AUTH_RATE_LIMIT_BACKEND", "memory").lower()
+# Claves (IPs + emails) que se recuerdan en memoria como máximo
+AUTH_RATE_LIMIT_KEYS = int(os.getenv("AUTH_RATE_LIMIT_KEYS", "100000"))
+# Proxies delante del servidor que añaden su salto a X-Forwarded-For (p. ej. 1 en Render)
+TRUSTED_PROXIES = int(os.getenv("TRUSTED_PROXIES", "0"))
+
+rate_limited_ip_total = metrics.counter('auth_rate_limited_ip_total', 'Intentos de login/registro rechazados por IP')
+rate_limited_email_total = metrics.counter(
+    'auth_rate_limited_email_total', 'Intentos de login/registro rechazados por email'
+)
+rate_limit_keys_gauge = metrics.gauge('auth_rate_limit_keys', 'IPs y emails con intentos recientes en memoria')
+
+
+def client_ip(remote_addr: Optional[str], forwarded_for: Optional[str], trusted_proxies: int = TRUSTED_PROXIES) -> str:
+    """
+    IP del cliente: la que vio el último proxy de confianza
+
+    Solo se usa X-Forwarded-For si hay proxies de confianza (si no, cualquiera
+    podría inventarse una IP por intento y saltarse el límite).
+    """
+    if trusted_proxies > 0 and forwarded_for:
+        hops = [hop.strip() for hop in forwarded_for.split(',') if hop.strip()]
+        if hops:
+            return hops[-min(trusted_proxies, len(hops))]
+    return remote_addr or 'desconocida'
+
+
+class LoginThrottle:
+    """
+    Límites por IP y por email para login y registro
+
+    Args:
+        ip_rate / email_rate: "intentos/segundos" ("0" desactiva)
+        max_keys: claves máximas en memoria (se descarta la menos usada)
+        clock: reloj de pared (inyectable para tests)
+    """
+
+    def __init__(self, ip_rate: str = AUTH_RATE_LIMIT_IP, email_rate: str = AUTH_RATE_LIMIT_EMAIL,
+                 max_keys: int = AUTH_RATE_LIMIT_KEYS, clock=None):
+        self._store = MemoryWindowStore(max_keys)
+        kwargs = {'store': self._store}
+        if clock is not None:
+            kwargs['clock'] = clock
+        self.by_ip = SlidingWindowLimiter(*parse_rate(ip_rate), **kwargs)
+        self.by_email = SlidingWindowLimiter(*parse_rate(email_rate), **kwargs)
+
+    def start(self, db, backend: str = AUTH_RATE_LIMIT_BACKEND):
+        """Con backend 'mongo' los contadores pasan a la colección rate_limits"""
+        if backend != 'mongo':
+            return
+        try:
+            store = MongoWindowStore(db.rate_limits)
+        except Exception as e:
+            print(f"⚠️ Límite de intentos compartido no disponible, se cuenta por worker: {e}")
+            return
+        self._store = store
+        self.by_ip.store = self.by_email.store = store
+        print("✓ Límite de intentos de login compartido en MongoDB (rate_limits)")
+
+    def check(self, ip: str, email: Optional[str] = None) -> float:
+        """
+        Registra un intento de la IP (y del email, si viene)
+
+        Returns:
+            0 si se permite; si no, segundos que hay que esperar
+        """
+        wait = self.by_ip.hit(f'ip:{ip}')
+        if wait:
+            rate_limited_ip_total.inc()
+            return wait
+        if email:
+            wait = self.by_email.hit(f'email:{email.strip().lower()}')
+            if wait:
+                rate_limited_email_total.inc()
+        if isinstance(self._store, MemoryWindowStore):
+            rate_limit_keys_gauge.set(len(self._store))
+        return wait
+
+    def succeeded(self, email: str):
+        """Login correcto: el email vuelve a tener todos sus intentos"""
+        self.by_email.reset(f'email:{email.strip().lower()}')
+
+
+# Instancia global del proceso
+login_throttle = LoginThrottle()
@@ -40,23 +40,33 @@ else:
             async_mode = 'threading'
 
 # NOW we can import Flask and other modules
-from flask import Flask
+from flask import Flask, Response, jsonify, request
 from flask_socketio import SocketIO
 from flask_cors import CORS
 from dotenv import load_dotenv
-from pymongo import MongoClient
 
 # Load environment variables
 load_dotenv()
 
 # Environment
-mongo_uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
 jwt_secret = os.getenv("JWT_SECRET", "dev-secret-key")
 FRONTEND_URL = os.getenv("URL_FRONTEND", "http://localhost:5173")
 
-# Connect DB
-client = MongoClient(mongo_uri)
-db = client['game_on_db']
+# Procesos de hash de contraseñas: se crean antes que cualquier otro hilo
+from password_pool import password_pool
+password_pool.start()
+
+# Base de datos: cliente con pool creado a demanda (ver db.py; DB_BACKEND=memory sin servidor)
+from db import get_db, health as db_health
+db = get_db()
+
+# Índices de las consultas frecuentes y comprobación de sus planes (ver indexes.py)
+from indexes import bootstrap as bootstrap_indexes
+bootstrap_indexes(db)
+
+# Victorias y resultados de partida se escriben en lote (ver write_behind.py)
+from write_behind import write_behind
+write_behind.start(db)
 
 # Flask app
 app = Flask(__name__)
@@ -97,13 +107,23 @@ register_socket_events(socketio)
 
 # Auth routes
 def register_auth_routes():
-    from auth import register, login, init_auth, obtener_usuarios
+    from auth import (register, login, logout, init_auth, obtener_usuarios, obtener_ranking,
+                      obtener_top, obtener_posicion, obtener_vecinos, obtener_historial,
+                      obtener_estadisticas, obtener_partida)
 
     init_auth(app, db)
 
     app.add_url_rule('/register', 'register', register, methods=['POST'])
     app.add_url_rule('/login', 'login', login, methods=['POST'])
+    app.add_url_rule('/logout', 'logout', logout, methods=['POST'])
     app.add_url_rule('/obtenerUsuarios', 'obtener_usuarios', obtener_usuarios, methods=['GET'])
+    app.add_url_rule('/ranking', 'obtener_ranking', obtener_ranking, methods=['GET'])
+    app.add_url_rule('/leaderboard/top', 'obtener_top', obtener_top, methods=['GET'])
+    app.add_url_rule('/leaderboard/rank/<public_id>', 'obtener_posicion', obtener_posicion, methods=['GET'])
+    app.add_url_rule('/leaderboard/around/<public_id>', 'obtener_vecinos', obtener_vecinos, methods=['GET'])
+    app.add_url_rule('/matches/<public_id>', 'obtener_historial', obtener_historial, methods=['GET'])
+    app.add_url_rule('/matches/<public_id>/stats', 'obtener_estadisticas', obtener_estadisticas, methods=['GET'])
+    app.add_url_rule('/match/<match_id>', 'obtener_partida', obtener_partida, methods=['GET'])
 
 register_auth_routes()
 
@@ -111,6 +131,19 @@ register_auth_routes()
 def index():
     return "Servidor Game-On funcionando 🚀"
 
+@app.route("/health")
+def health_endpoint():
+    estado = db_health()
+    return jsonify({'status': 'ok' if estado['up'] is not False else 'degraded', 'db': estado}), \
+        (503 if estado['up'] is False else 200)
+
+@app.route("/metrics")
+def metrics_endpoint():
+    import metrics
+    if request.args.get('format') == 'prometheus':
+        return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+    return jsonify(metrics.snapshot())
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     socketio.run(app, host='0.0.0.0', port=port, allow_unsafe_werkzeug=True)
@@ -0,0 +1,271 @@
+"""
+Historial de partidas
+Cada partida terminada se guarda como un documento compacto en `matches`:
+claves cortas, los jugadores en arrays paralelos ordenados por posición y
+todas las respuestas (opción, tiempo en ms y puntos por jugador y pregunta)
+empaquetadas en un solo campo binario. Una partida de 4 jugadores y 30
+preguntas ocupa ~1 KB en BSON en lugar de ~9 KB con un subdocumento por
+respuesta. El `_id` es un ObjectId, que ya lleva la fecha de fin.
+
+Las estadísticas de cada jugador no se calculan recorriendo su historial: se
+acumulan con $inc en `player_stats` al guardar cada partida, así que leerlas
+es un documento por _id aunque el jugador tenga un año de partidas. Ambas
+escrituras van por la cola de write_behind (en lote, fuera del juego).
+
+Documento de `matches`:
+    _id  ObjectId (fecha de fin)
+    i    public_id de cada jugador por posición (None si es invitado)
+    n    nombre de cada jugador
+    s    puntuación de cada jugador
+    q    preguntas jugadas
+    qp   True si fue partida rápida (se omite si no)
+    a    respuestas empaquetadas (ver pack_answers)
+"""
+import struct
+import threading
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+import metrics
+from calibration import question_key
+from write_behind import write_behind
+
+MATCH_HISTORY_DEFAULT_LIMIT = 10
+MATCH_HISTORY_MAX_LIMIT = 50
+
+# Por pregunta: clave crc32 del texto y opción correcta
+QUESTION_FORMAT = struct.Struct('<IB')
+# Por jugador y pregunta: opción (-1 sin respuesta), tiempo en ms y puntos
+ANSWER_FORMAT = struct.Struct('<bHH')
+MAX_UINT16 = 0xFFFF
+
+matches_recorded_total = metrics.counter('matches_recorded_total', 'Partidas enviadas al historial')
+match_history_queries_total = metrics.counter(
+    'match_history_queries_total', 'Consultas de historial y estadísticas de jugadores'
+)
+
+
+def _clamp_uint16(value) -> int:
+    return max(0, min(MAX_UINT16, int(value)))
+
+
+def pack_answers(rounds: List[Dict], socket_ids: List[str]) -> bytes:
+    """
+    Empaqueta las respuestas de una partida
+
+    Args:
+        rounds: preguntas cerradas del motor ({question, correct_answer, answers})
+        socket_ids: jugadores en el orden del documento (por posición)
+
+    Returns:
+        por pregunta, QUESTION_FORMAT seguido de ANSWER_FORMAT por jugador
+    """
+    missing = ANSWER_FORMAT.pack(-1, 0, 0)
+    parts = []
+    for question in rounds:
+        correct = question.get('correct_answer', 0)
+        parts.append(QUESTION_FORMAT.pack(question_key(question['question']),
+                                          correct if 0 <= correct < 256 else 0))
+        answers = question['answers']
+        for sid in socket_ids:
+            answer = answers.get(sid)
+            if answer is None:
+                parts.append(missing)
+                continue
+            index = answer.get('answer_index')
+            if not isinstance(index, int) or not 0 <= index < 128:
+                index = -1
+            parts.append(ANSWER_FORMAT.pack(
+                index,
+                _clamp_uint16(answer.get('response_time', 0) * 1000),
+                _clamp_uint16(answer.get('points', 0))
+            ))
+    return b''.join(parts)
+
+
+def unpack_answers(blob: bytes, players: int) -> List[Dict]:
+    """Inverso de pack_answers para `players` jugadores"""
+    rounds = []
+    offset = 0
+    while offset < len(blob):
+        key, correct = QUESTION_FORMAT.unpack_from(blob, offset)
+        offset += QUESTION_FORMAT.size
+        answers = []
+        for _ in range(players):
+            index, response_ms, points = ANSWER_FORMAT.unpack_from(blob, offset)
+            offset += ANSWER_FORMAT.size
+            answers.append({
+                'answer_index': index,
+                'is_correct': index == correct,
+                'response_ms': response_ms,
+                'points': points
+            })
+        rounds.append({'question_key': key, 'correct_answer': correct, 'answers': answers})
+    return rounds
+
+
+def _player_totals(rounds: List[Dict], position: int) -> Dict[str, int]:
+    """Respondidas, acertadas y ms totales de un jugador (por su posición)"""
+    answered = correct = response_ms = 0
+    for question in rounds:
+        answer = question['answers'][position]
+        if answer['answer_index'] < 0:
+            continue
+        answered += 1
+        correct += answer['is_correct']
+        response_ms += answer['response_ms']
+    return {'answered': answered, 'correct': correct, 'response_ms': response_ms}
+
+
+def parse_match_id(value: str) -> ObjectId:
+    """ObjectId de una partida o cursor (ValueError si no es válido)"""
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        raise ValueError('Id de partida inválido')
+
+
+class MatchHistory:
+    """
+    Guarda y consulta el historial de partidas
+
+    Args:
+        db: base de datos de pymongo (se puede indicar después con start)
+        queue: cola de escrituras diferidas
+    """
+
+    def __init__(self, db=None, queue=write_behind):
+        self.db = db
+        self.queue = queue
+        self._indexes_ready = False
+        self._lock = threading.Lock()
+
+    def start(self, db):
+        self.db = db
+
+    def _ensure_indexes(self):
+        """Índice de partidas recientes por jugador (se crea en la primera consulta)"""
+        if self._indexes_ready:
+            return
+        with self._lock:
+            if not self._indexes_ready:
+                self.db.matches.create_index([('i', 1), ('_id', -1)], name='matches_player_recent')
+                self._indexes_ready = True
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    def build_document(self, summary: Dict) -> Dict:
+        """Documento compacto de `matches` a partir del resumen del motor"""
+        players = summary['players']
+        doc = {
+            '_id': ObjectId(),
+            'i': [player.get('public_id') for player in players],
+            'n': [player['name'] for player in players],
+            's': [player.get('score', 0) for player in players],
+            'q': summary.get('questions', 0),
+            'a': pack_answers(summary.get('rounds', []), [player.get('socket_id') for player in players])
+        }
+        if summary.get('quick_play'):
+            doc['qp'] = True
+        return doc
+
+    def record(self, summary: Dict):
+        """Encola la partida y los $inc de estadísticas de sus jugadores autenticados"""
+        doc = self.build_document(summary)
+        self.queue.insert('matches', doc)
+        rounds = unpack_answers(doc['a'], len(doc['i']))
+        for position, public_id in enumerate(doc['i']):
+            if not public_id:
+                continue
+            totals = _player_totals(rounds, position)
+            self.queue.increment('player_stats', '_id', public_id, {
+                'g': 1,
+                'w': 1 if position == 0 else 0,
+                'pts': doc['s'][position],
+                'a': totals['answered'],
+                'c': totals['correct'],
+                'ms': totals['response_ms']
+            }, upsert=True)
+        matches_recorded_total.inc()
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _summary(doc: Dict, public_id: Optional[str] = None) -> Dict:
+        players = [
+            {'name': name, 'score': score, 'rank': idx + 1}
+            for idx, (name, score) in enumerate(zip(doc['n'], doc['s']))
+        ]
+        out = {
+            'id': str(doc['_id']),
+            'ended_at': doc['_id'].generation_time.isoformat(),
+            'quick_play': bool(doc.get('qp')),
+            'questions': doc.get('q', 0),
+            'players': players
+        }
+        if public_id is not None and public_id in doc['i']:
+            position = doc['i'].index(public_id)
+            totals = _player_totals(unpack_answers(doc.get('a', b''), len(doc['i'])), position)
+            out['me'] = dict(players[position], **totals)
+        return out
+
+    def recent(self, public_id: str, limit: int = MATCH_HISTORY_DEFAULT_LIMIT,
+               before: Optional[str] = None) -> Dict:
+        """
+        Partidas más recientes de un jugador
+
+        Args:
+            public_id: jugador
+            limit: partidas por página (hasta MATCH_HISTORY_MAX_LIMIT)
+            before: cursor (id de la última partida de la página anterior)
+
+        Returns:
+            {'partidas': [...], 'next_cursor': id o None}
+        """
+        match_history_queries_total.inc()
+        limit = max(1, min(limit, MATCH_HISTORY_MAX_LIMIT))
+        query = {'i': public_id}
+        if before:
+            query['_id'] = {'$lt': parse_match_id(before)}
+        self._ensure_indexes()
+        docs = list(self.db.matches.find(query).sort('_id', -1).limit(limit))
+        return {
+            'partidas': [self._summary(doc, public_id) for doc in docs],
+            'next_cursor': str(docs[-1]['_id']) if len(docs) == limit else None
+        }
+
+    def match(self, match_id: str) -> Optional[Dict]:
+        """Partida completa con las respuestas de cada jugador por pregunta"""
+        match_history_queries_total.inc()
+        doc = self.db.matches.find_one({'_id': parse_match_id(match_id)})
+        if doc is None:
+            return None
+        out = self._summary(doc)
+        out['rounds'] = unpack_answers(doc.get('a', b''), len(doc['i']))
+        return out
+
+    def stats(self, public_id: str) -> Dict:
+        """Estadísticas acumuladas de un jugador (sin partidas: todo a 0)"""
+        match_history_queries_total.inc()
+        doc = self.db.player_stats.find_one({'_id': public_id}) or {}
+        games, answered = doc.get('g', 0), doc.get('a', 0)
+        return {
+            'games_played': games,
+            'games_won': doc.get('w', 0),
+            'win_rate': round(doc.get('w', 0) / games, 3) if games else 0.0,
+            'average_score': round(doc.get('pts', 0) / games, 1) if games else 0.0,
+            'answered': answered,
+            'correct': doc.get('c', 0),
+            'accuracy': round(doc.get('c', 0) / answered, 3) if answered else 0.0,
+            'average_response_ms': round(doc.get('ms', 0) / answered) if answered else 0
+        }
+
+
+# Historial del proceso (init_auth le da la base de datos)
+match_history = MatchHistory()
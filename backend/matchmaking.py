@@ -0,0 +1,126 @@
+"""
+Matchmaking de partida rápida
+Mantiene los lobbys de partida rápida que esperan jugadores agrupados por
+nivel (según partidas ganadas) y plazas libres. Cada grupo es un heap por
+antigüedad, así que asignar un jugador al lobby más lleno y más antiguo de su
+nivel cuesta O(log n).
+"""
+import heapq
+import itertools
+import os
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+import metrics
+
+# Jugadores por lobby de partida rápida
+QUICK_PLAY_PLAYERS = int(os.getenv("QUICK_PLAY_PLAYERS", "4"))
+# Segundos de espera antes de empezar aunque el lobby no esté lleno
+QUICK_PLAY_WAIT_SECONDS = float(os.getenv("QUICK_PLAY_WAIT_SECONDS", "20"))
+# Mínimo de jugadores para empezar al agotarse la espera
+QUICK_PLAY_MIN_PLAYERS = int(os.getenv("QUICK_PLAY_MIN_PLAYERS", "2"))
+# Cortes de partidas ganadas que separan los niveles (0-4, 5-19, 20-49, 50+)
+SKILL_TIERS = [int(x) for x in os.getenv("QUICK_PLAY_SKILL_TIERS", "5,20,50").split(',') if x.strip()]
+
+quick_play_requests_total = metrics.counter('quick_play_requests_total', 'Pedidos de partida rápida')
+quick_play_matched_total = metrics.counter(
+    'quick_play_matched_total', 'Pedidos de partida rápida asignados a un lobby existente'
+)
+quick_play_waiting_gauge = metrics.gauge('quick_play_waiting_lobbies', 'Lobbys de partida rápida esperando jugadores')
+
+
+def skill_tier(games_won: Optional[int], tiers: List[int] = None) -> int:
+    """Nivel (0, 1, 2...) según las partidas ganadas"""
+    return bisect_right(SKILL_TIERS if tiers is None else tiers, games_won or 0)
+
+
+class Matchmaker:
+    """
+    Lobbys esperando jugadores, por (nivel, plazas libres)
+
+    Cada grupo guarda un heap de (orden de creación, lobby_id). Al mover un
+    lobby de grupo la entrada vieja no se borra del heap: se descarta al
+    encontrarla (borrado perezoso), comparando con la versión vigente.
+    """
+
+    def __init__(self, max_players: int = QUICK_PLAY_PLAYERS, tiers: List[int] = None):
+        self.max_players = max_players
+        self.tiers = SKILL_TIERS if tiers is None else tiers
+        self._order = itertools.count()
+        self._versions = itertools.count()
+        # (nivel, plazas libres) -> heap de (orden, versión, lobby_id)
+        self._buckets: Dict[Tuple[int, int], List] = {}
+        # lobby_id -> (nivel, plazas libres, orden, versión)
+        self._entries: Dict[str, Tuple[int, int, int, int]] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, lobby_id: str):
+        return lobby_id in self._entries
+
+    def tier_for(self, games_won: Optional[int]) -> int:
+        return skill_tier(games_won, self.tiers)
+
+    def _push(self, lobby_id: str, tier: int, free: int, order: int):
+        version = next(self._versions)
+        self._entries[lobby_id] = (tier, free, order, version)
+        heapq.heappush(self._buckets.setdefault((tier, free), []), (order, version, lobby_id))
+
+    def add(self, lobby_id: str, tier: int, free_slots: int):
+        """Registra un lobby que espera jugadores"""
+        if free_slots <= 0:
+            self.remove(lobby_id)
+            return
+        self._push(lobby_id, tier, free_slots, next(self._order))
+        quick_play_waiting_gauge.set(len(self._entries))
+
+    def update(self, lobby_id: str, free_slots: int):
+        """Cambia las plazas libres de un lobby (lo quita si se llenó)"""
+        entry = self._entries.get(lobby_id)
+        if entry is None:
+            return
+        if free_slots <= 0:
+            self.remove(lobby_id)
+            return
+        tier, _, order, _ = entry
+        # Conserva su antigüedad para no perder el turno
+        self._push(lobby_id, tier, free_slots, order)
+
+    def remove(self, lobby_id: str):
+        if self._entries.pop(lobby_id, None) is not None:
+            quick_play_waiting_gauge.set(len(self._entries))
+
+    def _peek(self, tier: int, free: int) -> Optional[str]:
+        heap = self._buckets.get((tier, free))
+        while heap:
+            _, version, lobby_id = heap[0]
+            entry = self._entries.get(lobby_id)
+            if entry is not None and entry[3] == version:
+                return lobby_id
+            heapq.heappop(heap)
+        return None
+
+    def find(self, tier: int) -> Optional[str]:
+        """
+        Lobby para un jugador de `tier`
+
+        Prioriza el propio nivel y luego los vecinos más cercanos; dentro de un
+        nivel, el lobby con menos plazas libres (se llena antes) y más antiguo.
+        """
+        max_tier = len(self.tiers)
+        for distance in range(max_tier + 1):
+            for candidate in ((tier,) if distance == 0 else (tier - distance, tier + distance)):
+                if candidate < 0 or candidate > max_tier:
+                    continue
+                for free in range(1, self.max_players):
+                    lobby_id = self._peek(candidate, free)
+                    if lobby_id is not None:
+                        return lobby_id
+        return None
+
+    def stats(self) -> Dict:
+        by_tier: Dict[int, int] = {}
+        for tier, _, _, _ in self._entries.values():
+            by_tier[tier] = by_tier.get(tier, 0) + 1
+        return {'waiting_lobbies': len(self._entries), 'by_tier': by_tier}
@@ -0,0 +1,456 @@
+"""
+Base de datos en memoria compatible con la parte de pymongo que usa el backend
+Permite arrancar la app, los tests y los benchmarks sin un servidor MongoDB
+(DB_BACKEND=memory). Implementa find/find_one con proyección, orden y límite,
+insert_one/insert_many, update_one con $inc/$set y upsert, bulk_write con
+InsertOne/UpdateOne, create_index (los índices únicos se respetan y el primer
+campo de cada índice se indexa por hash para las búsquedas por igualdad),
+count_documents y explain. Los filtros admiten igualdad (también dentro de
+arrays), $lt, $lte, $gt, $gte, $ne, $in, $exists, $or y $and.
+
+Los datos se pierden al cerrar el proceso.
+"""
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pymongo.results import InsertManyResult, InsertOneResult, UpdateResult
+
+DUPLICATE_KEY = 11000
+_MISSING = object()
+
+
+def _equals(value, expected) -> bool:
+    if value == expected:
+        return True
+    return isinstance(value, list) and not isinstance(expected, list) and expected in value
+
+
+def _compare(value, op: str, arg) -> bool:
+    if op == '$in':
+        return any(_equals(value, item) for item in arg)
+    if op == '$ne':
+        return not _equals(value, arg)
+    if op == '$exists':
+        return (value is not _MISSING) == bool(arg)
+    if value is _MISSING or value is None:
+        return False
+    try:
+        if op == '$lt':
+            return value < arg
+        if op == '$lte':
+            return value <= arg
+        if op == '$gt':
+            return value > arg
+        if op == '$gte':
+            return value >= arg
+    except TypeError:
+        return False
+    raise ValueError(f'Operador no soportado en la base en memoria: {op}')
+
+
+def _is_operator_dict(cond) -> bool:
+    return isinstance(cond, dict) and bool(cond) and all(key.startswith('$') for key in cond)
+
+
+def matches(doc: Dict, query: Dict) -> bool:
+    """Indica si `doc` cumple el filtro `query`"""
+    for key, cond in query.items():
+        if key == '$or':
+            if not any(matches(doc, sub) for sub in cond):
+                return False
+        elif key == '$and':
+            if not all(matches(doc, sub) for sub in cond):
+                return False
+        elif _is_operator_dict(cond):
+            value = doc.get(key, _MISSING)
+            if not all(_compare(value, op, arg) for op, arg in cond.items()):
+                return False
+        elif not _equals(doc.get(key), cond):
+            return False
+    return True
+
+
+def _project(doc: Dict, projection: Optional[Dict]) -> Dict:
+    if not projection:
+        return dict(doc)
+    included = [key for key, value in projection.items() if value and key != '_id']
+    if included:
+        out = {key: doc[key] for key in included if key in doc}
+        if projection.get('_id', 1) and '_id' in doc:
+            out['_id'] = doc['_id']
+        return out
+    return {key: value for key, value in doc.items() if projection.get(key, 1)}
+
+
+def _sort_value(value):
+    # None y los campos ausentes van primero, como en MongoDB
+    return (0, 0) if value is None else (1, value)
+
+
+def _normalize_keys(keys, direction=None) -> List[Tuple[str, int]]:
+    if isinstance(keys, str):
+        return [(keys, direction if direction is not None else 1)]
+    return list(keys)
+
+
+def _sort_docs(docs: List[Dict], keys: List[Tuple[str, int]]):
+    # Orden estable campo a campo, del último al primero
+    for field, direction in reversed(keys):
+        docs.sort(key=lambda doc: _sort_value(doc.get(field)), reverse=direction < 0)
+
+
+def _hashable_values(value) -> List:
+    values = value if isinstance(value, list) else [value]
+    out = []
+    for item in values:
+        try:
+            hash(item)
+        except TypeError:
+            continue
+        out.append(item)
+    return out
+
+
+class MemoryCursor:
+    def __init__(self, collection: 'MemoryCollection', query: Dict, projection: Optional[Dict]):
+        self._collection = collection
+        self._query = query or {}
+        self._projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._limit = 0
+        self._skip = 0
+
+    def sort(self, keys, direction=None):
+        self._sort = _normalize_keys(keys, direction)
+        return self
+
+    def limit(self, n: int):
+        self._limit = n
+        return self
+
+    def skip(self, n: int):
+        self._skip = n
+        return self
+
+    def _results(self) -> List[Dict]:
+        end = self._skip + self._limit if self._limit else None
+        ordered = self._collection._ordered(self._sort, self._query)
+        if ordered is not None:
+            # Orden de un índice: se recorre hasta llenar el límite
+            docs = []
+            for doc in ordered:
+                if matches(doc, self._query):
+                    docs.append(doc)
+                    if end is not None and len(docs) >= end:
+                        break
+        else:
+            docs = self._collection._matching(self._query)
+            _sort_docs(docs, self._sort)
+        return [_project(doc, self._projection) for doc in docs[self._skip:end]]
+
+    def __iter__(self):
+        return iter(self._results())
+
+    def explain(self) -> Dict:
+        """Plan aproximado: IXSCAN si un índice empieza por el campo filtrado o de orden"""
+        indexed = self._collection._index_prefixes()
+        field = next((key for key in self._query if not key.startswith('$')), None)
+        if field is None and self._sort:
+            field = self._sort[0][0]
+        if field in indexed:
+            plan = {'stage': 'FETCH', 'inputStage': {'stage': 'IXSCAN', 'indexName': indexed[field]}}
+        elif self._sort:
+            plan = {'stage': 'SORT', 'inputStage': {'stage': 'COLLSCAN'}}
+        else:
+            plan = {'stage': 'COLLSCAN'}
+        return {'queryPlanner': {'winningPlan': plan}}
+
+
+class MemoryCollection:
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.RLock()
+        self._docs: Dict[Any, Dict] = {}
+        # nombre -> (claves, único)
+        self._indexes: Dict[str, Tuple[List[Tuple[str, int]], bool]] = {'_id_': ([('_id', 1)], True)}
+        # campo -> valor -> _ids (primer campo de cada índice)
+        self._hash: Dict[str, Dict[Any, set]] = {}
+        # orden de los índices compuestos, recalculado tras cada escritura
+        self._version = 0
+        self._orders: Dict[Tuple, Tuple[int, List[Dict]]] = {}
+
+    # --- índices ---
+
+    def _index_prefixes(self) -> Dict[str, str]:
+        return {keys[0][0]: name for name, (keys, _) in self._indexes.items()}
+
+    def _unique_fields(self) -> List[str]:
+        return [keys[0][0] for keys, unique in self._indexes.values()
+                if unique and len(keys) == 1 and keys[0][0] != '_id']
+
+    def _index_add(self, doc: Dict):
+        self._version += 1
+        for field, table in self._hash.items():
+            for value in _hashable_values(doc.get(field)):
+                table.setdefault(value, set()).add(doc['_id'])
+
+    def _index_remove(self, doc: Dict):
+        self._version += 1
+        for field, table in self._hash.items():
+            for value in _hashable_values(doc.get(field)):
+                ids = table.get(value)
+                if ids is not None:
+                    ids.discard(doc['_id'])
+                    if not ids:
+                        del table[value]
+
+    def _check_unique(self, doc: Dict, ignore_id=_MISSING):
+        if doc['_id'] in self._docs and doc['_id'] != ignore_id:
+            raise DuplicateKeyError(f'E11000 duplicate key _id: {doc["_id"]}', DUPLICATE_KEY)
+        for field in self._unique_fields():
+            value = doc.get(field, _MISSING)
+            if value is _MISSING:
+                continue
+            others = self._hash.get(field, {}).get(value, set()) - {ignore_id}
+            if others:
+                raise DuplicateKeyError(f'E11000 duplicate key {field}: {value}', DUPLICATE_KEY)
+
+    def create_index(self, keys, unique: bool = False, name: str = None, **kwargs) -> str:
+        keys = _normalize_keys(keys)
+        name = name or '_'.join(f'{field}_{direction}' for field, direction in keys)
+        with self._lock:
+            field = keys[0][0]
+            if field != '_id' and field not in self._hash:
+                table: Dict[Any, set] = {}
+                for doc in self._docs.values():
+                    for value in _hashable_values(doc.get(field)):
+                        table.setdefault(value, set()).add(doc['_id'])
+                self._hash[field] = table
+            if unique and len(keys) == 1 and field != '_id':
+                if any(len(ids) > 1 for ids in self._hash[field].values()):
+                    raise DuplicateKeyError(f'E11000 duplicate key {field} al crear {name}', DUPLICATE_KEY)
+            self._indexes[name] = (keys, unique)
+        return name
+
+    def _ordered(self, sort: List[Tuple[str, int]], query: Dict) -> Optional[List[Dict]]:
+        """
+        Documentos en el orden de un índice que empieza por `sort` (None si no
+        hay índice o si la igualdad sobre un campo indexado deja pocos candidatos)
+        """
+        if not sort:
+            return None
+        key = tuple(sort)
+        with self._lock:
+            if not any(tuple(keys[:len(sort)]) == key for keys, _ in self._indexes.values()):
+                return None
+            if any(field in self._hash for field in query if not field.startswith('$')):
+                return None
+            version, docs = self._orders.get(key, (None, None))
+            if version != self._version:
+                docs = list(self._docs.values())
+                _sort_docs(docs, sort)
+                self._orders[key] = (self._version, docs)
+            return docs
+
+    def index_information(self) -> Dict:
+        return {name: {'key': keys, 'unique': unique} for name, (keys, unique) in self._indexes.items()}
+
+    # --- lectura ---
+
+    def _candidates(self, query: Dict) -> Iterable[Dict]:
+        """Documentos a revisar: por hash si hay igualdad sobre un campo indexado"""
+        if '_id' in query and not _is_operator_dict(query['_id']):
+            doc = self._docs.get(query['_id'])
+            return [doc] if doc is not None else []
+        for field, cond in query.items():
+            table = self._hash.get(field)
+            if table is None or field.startswith('$'):
+                continue
+            if _is_operator_dict(cond):
+                if set(cond) == {'$in'}:
+                    ids = set()
+                    for value in _hashable_values(list(cond['$in'])):
+                        ids |= table.get(value, set())
+                    return [self._docs[i] for i in ids]
+                continue
+            try:
+                ids = table.get(cond, ())
+            except TypeError:
+                continue
+            return [self._docs[i] for i in ids]
+        return self._docs.values()
+
+    def _matching(self, query: Dict) -> List[Dict]:
+        with self._lock:
+            return [doc for doc in self._candidates(query) if matches(doc, query)]
+
+    def find(self, query: Dict = None, projection: Dict = None) -> MemoryCursor:
+        return MemoryCursor(self, query or {}, projection)
+
+    def find_one(self, query: Dict = None, projection: Dict = None) -> Optional[Dict]:
+        query = query or {}
+        with self._lock:
+            for doc in self._candidates(query):
+                if matches(doc, query):
+                    return _project(doc, projection)
+        return None
+
+    def count_documents(self, query: Dict) -> int:
+        return len(self._matching(query))
+
+    # --- escritura ---
+
+    def _insert(self, document: Dict) -> Any:
+        doc = dict(document)
+        doc.setdefault('_id', ObjectId())
+        self._check_unique(doc)
+        self._docs[doc['_id']] = doc
+        self._index_add(doc)
+        # Como pymongo, el documento original recibe el _id
+        document.setdefault('_id', doc['_id'])
+        return doc['_id']
+
+    def insert_one(self, document: Dict) -> InsertOneResult:
+        with self._lock:
+            return InsertOneResult(self._insert(document), True)
+
+    def insert_many(self, documents: Iterable[Dict], ordered: bool = True) -> InsertManyResult:
+        result = self.bulk_write([InsertOne(doc) for doc in documents], ordered=ordered)
+        return InsertManyResult(result['inserted_ids'], True)
+
+    def _update(self, query: Dict, update: Dict, upsert: bool) -> Tuple[int, Any]:
+        doc = next((d for d in self._candidates(query) if matches(d, query)), None)
+        if doc is None:
+            if not upsert:
+                return 0, None
+            doc = {key: value for key, value in query.items()
+                   if not key.startswith('$') and not _is_operator_dict(value)}
+            new = self._apply(doc, update)
+            self._insert(new)
+            return 0, new['_id']
+        new = self._apply(dict(doc), update)
+        self._check_unique(new, ignore_id=doc['_id'])
+        self._index_remove(doc)
+        self._docs[doc['_id']] = new
+        self._index_add(new)
+        return 1, None
+
+    @staticmethod
+    def _apply(doc: Dict, update: Dict) -> Dict:
+        for op, fields in update.items():
+            if op == '$inc':
+                for field, amount in fields.items():
+                    doc[field] = doc.get(field, 0) + amount
+            elif op == '$set':
+                doc.update(fields)
+            elif op == '$setOnInsert':
+                for field, value in fields.items():
+                    doc.setdefault(field, value)
+            else:
+                raise ValueError(f'Operador de actualización no soportado en la base en memoria: {op}')
+        return doc
+
+    def update_one(self, query: Dict, update: Dict, upsert: bool = False) -> UpdateResult:
+        with self._lock:
+            modified, upserted_id = self._update(query, update, upsert)
+        raw = {'n': modified or int(upserted_id is not None), 'nModified': modified}
+        if upserted_id is not None:
+            raw['upserted'] = upserted_id
+        return UpdateResult(raw, True)
+
+    def bulk_write(self, requests: List, ordered: bool = True) -> Dict:
+        errors = []
+        inserted_ids = []
+        with self._lock:
+            for index, request in enumerate(requests):
+                try:
+                    if isinstance(request, InsertOne):
+                        inserted_ids.append(self._insert(request._doc))
+                    elif isinstance(request, UpdateOne):
+                        self._update(request._filter, request._doc, bool(request._upsert))
+                    else:
+                        raise ValueError(f'Operación no soportada en la base en memoria: {request!r}')
+                except DuplicateKeyError as e:
+                    errors.append({'index': index, 'code': DUPLICATE_KEY, 'errmsg': str(e)})
+                    if ordered:
+                        break
+        if errors:
+            raise BulkWriteError({'writeErrors': errors, 'nInserted': len(inserted_ids)})
+        return {'inserted_ids': inserted_ids}
+
+    def delete_many(self, query: Dict) -> int:
+        with self._lock:
+            docs = self._matching(query)
+            for doc in docs:
+                self._index_remove(doc)
+                del self._docs[doc['_id']]
+        return len(docs)
+
+    def drop(self):
+        with self._lock:
+            self._docs.clear()
+            self._hash.clear()
+            self._orders.clear()
+            self._version += 1
+            self._indexes = {'_id_': ([('_id', 1)], True)}
+
+
+class MemoryDatabase:
+    def __init__(self, name: str):
+        self.name = name
+        self._collections: Dict[str, MemoryCollection] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = MemoryCollection(name)
+            return self._collections[name]
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+    def list_collection_names(self) -> List[str]:
+        return list(self._collections)
+
+    def drop_collection(self, name: str):
+        with self._lock:
+            self._collections.pop(name, None)
+
+    def command(self, command, *args, **kwargs) -> Dict:
+        if command == 'ping':
+            return {'ok': 1.0}
+        raise ValueError(f'Comando no soportado en la base en memoria: {command}')
+
+
+class MemoryClient:
+    """Cliente en memoria con la interfaz de MongoClient que usa el backend"""
+
+    def __init__(self, *args, **kwargs):
+        self._databases: Dict[str, MemoryDatabase] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        with self._lock:
+            if name not in self._databases:
+                self._databases[name] = MemoryDatabase(name)
+            return self._databases[name]
+
+    def get_database(self, name: str) -> MemoryDatabase:
+        return self[name]
+
+    @property
+    def admin(self) -> MemoryDatabase:
+        return self['admin']
+
+    def drop_database(self, name: str):
+        with self._lock:
+            self._databases.pop(name, None)
+
+    def close(self):
+        pass
@@ -0,0 +1,132 @@
+"""
+Métricas en memoria del servidor
+Contadores, gauges e histogramas simples que se exponen en /metrics
+(JSON por defecto, formato texto de Prometheus con ?format=prometheus)
+"""
+import bisect
+import threading
+from typing import Dict, List
+
+# Registro global de métricas por nombre
+REGISTRY: Dict[str, object] = {}
+_registry_lock = threading.Lock()
+
+
+class Counter:
+    """Contador monotónico"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str = ''):
+        self.name = name
+        self.help = help
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self):
+        return self.value
+
+
+class Gauge:
+    """Valor instantáneo que puede subir y bajar"""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, help: str = ''):
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def snapshot(self):
+        return self.value
+
+
+class Histogram:
+    """Histograma con buckets fijos (límites superiores inclusivos)"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, buckets: List[float], help: str = ''):
+        self.name = name
+        self.help = help
+        self.buckets = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        buckets['+Inf'] = self.count
+        return {'buckets': buckets, 'sum': self.sum, 'count': self.count}
+
+
+def _register(cls, name, *args, **kwargs):
+    with _registry_lock:
+        metric = REGISTRY.get(name)
+        if metric is None:
+            metric = cls(name, *args, **kwargs)
+            REGISTRY[name] = metric
+        return metric
+
+
+def counter(name: str, help: str = '') -> Counter:
+    """Obtiene (o crea) un contador registrado"""
+    return _register(Counter, name, help=help)
+
+
+def gauge(name: str, help: str = '') -> Gauge:
+    """Obtiene (o crea) un gauge registrado"""
+    return _register(Gauge, name, help=help)
+
+
+def histogram(name: str, buckets: List[float], help: str = '') -> Histogram:
+    """Obtiene (o crea) un histograma registrado"""
+    return _register(Histogram, name, buckets, help=help)
+
+
+def snapshot() -> Dict:
+    """Estado actual de todas las métricas, listo para serializar a JSON"""
+    return {name: metric.snapshot() for name, metric in sorted(REGISTRY.items())}
+
+
+def render_prometheus() -> str:
+    """Métricas en formato de exposición de texto de Prometheus"""
+    lines = []
+    for name, metric in sorted(REGISTRY.items()):
+        if metric.help:
+            lines.append(f'# HELP {name} {metric.help}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        if metric.kind == 'histogram':
+            data = metric.snapshot()
+            for bound, count in data['buckets'].items():
+                lines.append(f'{name}_bucket{{le="{bound}"}} {count}')
+            lines.append(f'{name}_sum {data["sum"]}')
+            lines.append(f'{name}_count {data["count"]}')
+        else:
+            lines.append(f'{name} {metric.snapshot()}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,154 @@
+"""
+Hash de contraseñas en un pool de procesos
+pbkdf2 es CPU puro: hecho en el worker de eventlet bloquea el hub y congela
+todas las partidas mientras dura, así que una ráfaga de logins paraba los
+lobbys. register y login lo delegan aquí: se calcula en PASSWORD_HASH_WORKERS
+procesos aparte y el request solo espera el resultado (una espera cooperativa
+para eventlet/gevent).
+
+La cola está acotada: con PASSWORD_HASH_MAX_QUEUE trabajos esperando, los
+siguientes se rechazan al instante con PasswordPoolBusy (la ruta responde 503
+con Retry-After) en lugar de acumular requests que igual vencerían.
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+import metrics
+
+# Procesos que calculan hashes (0 = en el propio worker, sin pool)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+# Trabajos que pueden esperar un proceso libre antes de rechazar
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))
+# Segundos máximos que un request espera su hash
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
+PASSWORD_HASH_METHOD = 'pbkdf2:sha256'
+
+hash_queue_gauge = metrics.gauge('password_hash_queue_depth', 'Hashes de contraseña en curso o esperando proceso')
+hash_jobs_total = metrics.counter('password_hash_jobs_total', 'Hashes de contraseña aceptados en el pool')
+hash_rejected_total = metrics.counter(
+    'password_hash_rejected_total', 'Hashes rechazados por cola llena o tiempo agotado'
+)
+hash_histogram = metrics.histogram(
+    'password_hash_seconds', [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10],
+    'Espera total de cada hash de contraseña (cola + cálculo)'
+)
+
+
+class PasswordPoolBusy(Exception):
+    """Cola de hashes llena o sin respuesta a tiempo (reintentar más tarde)"""
+
+
+def _hash(password: str) -> str:
+    return generate_password_hash(password, method=PASSWORD_HASH_METHOD)
+
+
+def _check(pwhash: str, password: str) -> bool:
+    return check_password_hash(pwhash, password)
+
+
+class PasswordPool:
+    """
+    Pool acotado de hash de contraseñas
+
+    Args:
+        workers: procesos del pool (0 = calcular en el hilo que llama)
+        max_queue: trabajos que pueden esperar con todos los procesos ocupados
+        timeout: segundos máximos de espera por resultado
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_queue: int = PASSWORD_HASH_MAX_QUEUE,
+                 timeout: float = PASSWORD_HASH_TIMEOUT):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._executor = None
+        self._in_flight = 0
+        self._atexit = False
+
+    def start(self):
+        """Crea los procesos (mejor al arrancar, antes de abrir otros hilos)"""
+        with self._lock:
+            if self._executor is None and self.workers > 0:
+                # fork: los procesos no vuelven a importar la app
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+                if not self._atexit:
+                    # Sin esto el intérprete no termina al salir (bajo eventlet queda esperando al pool)
+                    atexit.register(self.close)
+                    self._atexit = True
+                print(f"✓ Pool de hash de contraseñas: {self.workers} procesos")
+        return self
+
+    def _release(self, future=None):
+        with self._lock:
+            self._in_flight -= 1
+            hash_queue_gauge.set(self._in_flight)
+
+    def _run(self, fn, *args):
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                hash_rejected_total.inc()
+                raise PasswordPoolBusy('Demasiados inicios de sesión en curso')
+            self._in_flight += 1
+            hash_queue_gauge.set(self._in_flight)
+        started = time.perf_counter()
+        try:
+            if self.workers <= 0:
+                try:
+                    return fn(*args)
+                finally:
+                    self._release()
+            if self._executor is None:
+                self.start()
+            try:
+                future = self._executor.submit(fn, *args)
+            except Exception:
+                self._release()
+                raise
+            # El lugar se libera cuando el proceso termina de verdad, no cuando
+            # el request deja de esperar: así la cola acotada cuenta el trabajo real
+            future.add_done_callback(self._release)
+            try:
+                return future.result(timeout=self.timeout)
+            except FutureTimeout:
+                # Si todavía no empezó no llega a ocupar un proceso
+                future.cancel()
+                hash_rejected_total.inc()
+                raise PasswordPoolBusy('El hash de la contraseña no terminó a tiempo')
+            except BrokenProcessPool:
+                # Un proceso murió: se recrea el pool para los siguientes
+                print("⚠️ Pool de hash de contraseñas roto, recreándolo")
+                with self._lock:
+                    self._executor = None
+                raise PasswordPoolBusy('Pool de hash de contraseñas no disponible')
+        finally:
+            hash_histogram.observe(time.perf_counter() - started)
+            hash_jobs_total.inc()
+
+    def hash(self, password: str) -> str:
+        """generate_password_hash en el pool"""
+        return self._run(_hash, password)
+
+    def check(self, pwhash: str, password: str) -> bool:
+        """check_password_hash en el pool"""
+        return self._run(_check, pwhash, password)
+
+    def close(self):
+        """Descarta los hashes en cola y espera a que terminen los procesos"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+# Pool del proceso (main.py lo arranca al inicio)
+password_pool = PasswordPool()
@@ -3,8 +3,13 @@ Sistema de Poderes para el Juego de Trivia
 Cada pregunta ofrece 3 tipos de poderes con diferente coste de puntos
 """
 
+import json
+import os
+import threading
+import time
+from array import array
 from enum import Enum
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
 
 class PowerType(Enum):
     """Tipos de poderes disponibles"""
@@ -20,83 +25,369 @@ class PowerCost(Enum):
     TIME_BOOST = 400           # Costo ajustado - más tiempo
 
 
-class Power:
-    """Clase que representa un poder individual"""
-    
-    def __init__(self, power_type: PowerType, cost: int, description: str, effect: str):
-        self.power_type = power_type
-        self.cost = cost
-        self.description = description
-        self.effect = effect
-        self.is_used = False
-    
-    def to_dict(self):
+# Definiciones de poderes disponibles (valores por defecto del registro)
+POWERS_CONFIG = {
+    PowerType.FIFTY_FIFTY: {
+        "cost": PowerCost.FIFTY_FIFTY.value,
+        "name": "50/50",
+        "description": "Elimina 2 respuestas incorrectas",
+        "effect": "Reduce las opciones a solo 2 (1 correcta y 1 incorrecta)",
+        "emoji": "🎯",
+        "handler": "fifty_fifty",
+        "duration": 0,
+        "message": "Se han eliminado 2 opciones incorrectas",
+        "params": {"remaining_options": 2}
+    },
+    PowerType.DOUBLE_POINTS: {
+        "cost": PowerCost.DOUBLE_POINTS.value,
+        "name": "Doble Puntos",
+        "description": "Duplica los puntos de esta pregunta",
+        "effect": "Si aciertas, ganas el doble de puntos",
+        "emoji": "⭐",
+        "handler": "double_points",
+        "duration": 0,
+        "message": "¡Ganarás el doble de puntos en esta pregunta!",
+        "params": {"multiplier": 2}
+    },
+    PowerType.TIME_BOOST: {
+        "cost": PowerCost.TIME_BOOST.value,
+        "name": "Tiempo Extra",
+        "description": "Añade 10 segundos más para responder",
+        "effect": "Amplía el temporizador de la pregunta",
+        "emoji": "⏱️",
+        "handler": "time_boost",
+        "duration": 10,
+        "message": "Se añadieron 10 segundos al temporizador",
+        "params": {}
+    }
+}
+
+# Archivo JSON con costes y poderes extra; se relee en caliente si cambia.
+# Relativo al backend (no al directorio desde el que se arranca)
+POWERS_CONFIG_PATH = os.getenv(
+    "POWERS_CONFIG_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "powers_config.json")
+)
+POWERS_CONFIG_CHECK_SECONDS = float(os.getenv("POWERS_CONFIG_CHECK_SECONDS", "2"))
+
+# El estado por jugador se guarda en bytes: como mucho 8 poderes distintos
+MAX_POWERS = 8
+# Tiempo extra máximo que puede configurarse para un poder de tiempo
+MAX_TIME_BOOST_SECONDS = 60
+
+
+class PowerDefinition(NamedTuple):
+    """
+    Definición inmutable de un poder (flyweight)
+
+    Hay una sola instancia por poder, compartida por todos los jugadores;
+    el estado de cada jugador se guarda aparte como bitmask.
+    """
+    power_type: Optional[PowerType]
+    value: str
+    bit: int
+    cost: int
+    name: str
+    description: str
+    effect: str
+    emoji: str
+    # Duración del efecto en segundos (0 = dura hasta responder)
+    duration: int
+    handler: Callable
+    effect_payload: Dict
+
+    def to_dict(self, is_used: bool = False) -> Dict:
         """Convierte el poder a diccionario para enviar al cliente"""
         return {
-            "power_type": self.power_type.value,
+            "power_type": self.value,
+            "name": self.name,
+            "emoji": self.emoji,
             "cost": self.cost,
             "description": self.description,
             "effect": self.effect,
-            "is_used": self.is_used
+            "is_used": is_used
         }
 
 
+# Manejadores de efecto: reciben la definición y el slot de estado del
+# jugador, aplican el efecto y devuelven los datos para el cliente.
+
+def _fifty_fifty_effect(definition, store, slot) -> Dict:
+    return dict(definition.effect_payload)
+
+
+def _double_points_effect(definition, store, slot) -> Dict:
+    if store is not None:
+        store.double_points[slot] = 1
+    return dict(definition.effect_payload)
+
+
+def _time_boost_effect(definition, store, slot) -> Dict:
+    return dict(definition.effect_payload)
+
+
+EFFECT_HANDLERS: Dict[str, Callable] = {
+    "fifty_fifty": _fifty_fifty_effect,
+    "double_points": _double_points_effect,
+    "time_boost": _time_boost_effect,
+}
+
+
+class PowerTable(NamedTuple):
+    """Tabla pre-calculada de una versión del registro (se reemplaza entera)"""
+    version: int
+    definitions: Tuple[PowerDefinition, ...]
+    by_value: Dict[str, PowerDefinition]
+    all_mask: int
+    # Payloads pre-serializados por combinación de poderes usados.
+    # Son compartidos: quien los reciba no debe modificarlos.
+    payloads_by_mask: Tuple[List[Dict], ...]
+    used_values_by_mask: Tuple[List[str], ...]
+    # Mayor tiempo extra que puede dar un poder (el motor alarga el timeout de la pregunta)
+    max_added_time: int = 0
+
+
+class PowerRegistry:
+    """
+    Registro declarativo de poderes
+
+    Cada poder es un registro (coste, duración, manejador de efecto). El uso de
+    un poder cuesta una búsqueda en `table.by_value` más la llamada al
+    manejador. Los costes y poderes nuevos se leen de un JSON que se recarga
+    sin reiniciar el servidor:
+
+        {"powers": [
+            {"id": "fifty_fifty", "cost": 650},
+            {"id": "mega_time", "handler": "time_boost", "cost": 800,
+             "duration": 20, "name": "Mega Tiempo", "emoji": "⌛"},
+            {"id": "double_points", "enabled": false}
+        ]}
+    """
+
+    def __init__(self, config_path: str = None, check_seconds: float = POWERS_CONFIG_CHECK_SECONDS):
+        self.config_path = config_path
+        self.check_seconds = check_seconds
+        # Bit asignado a cada poder; estable entre recargas para no
+        # corromper el estado de partidas en curso
+        self._bits: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._next_check = 0.0
+        self.table: PowerTable = self._build(self._default_records(), 0)
+        if config_path:
+            self.reload_if_changed(force=True)
+
+    @staticmethod
+    def _default_records() -> List[Dict]:
+        return [dict(config, id=power_type.value) for power_type, config in POWERS_CONFIG.items()]
+
+    @staticmethod
+    def _bit_for(bits: Dict[str, int], value: str) -> int:
+        bit = bits.get(value)
+        if bit is None:
+            if len(bits) >= MAX_POWERS:
+                raise ValueError(f"Máximo {MAX_POWERS} poderes distintos")
+            bit = 1 << len(bits)
+            bits[value] = bit
+        return bit
+
+    def _build(self, records: List[Dict], version: int) -> PowerTable:
+        # Los bits nuevos solo se confirman si toda la configuración es válida
+        bits = dict(self._bits)
+        definitions = []
+        for record in records:
+            handler_name = record.get("handler", record["id"])
+            handler = EFFECT_HANDLERS.get(handler_name)
+            if handler is None:
+                raise ValueError(f"Manejador de efecto desconocido: {handler_name}")
+            cost = int(record["cost"])
+            if cost < 0:
+                raise ValueError(f"Coste inválido para {record['id']}: {cost}")
+            duration = int(record.get("duration", 0))
+            if not 0 <= duration <= MAX_TIME_BOOST_SECONDS:
+                raise ValueError(f"Duración inválida para {record['id']}: {duration} "
+                                 f"(entre 0 y {MAX_TIME_BOOST_SECONDS} segundos)")
+            payload = {"type": handler_name, "message": record.get("message", "")}
+            payload.update(record.get("params", {}))
+            if handler_name == "time_boost":
+                payload["added_time"] = duration
+            try:
+                power_type = PowerType(record["id"])
+            except ValueError:
+                power_type = None
+            definitions.append(PowerDefinition(
+                power_type=power_type,
+                value=record["id"],
+                bit=self._bit_for(bits, record["id"]),
+                cost=cost,
+                name=record.get("name", record["id"]),
+                description=record.get("description", ""),
+                effect=record.get("effect", ""),
+                emoji=record.get("emoji", "✨"),
+                duration=duration,
+                handler=handler,
+                effect_payload=payload
+            ))
+
+        definitions = tuple(definitions)
+        all_mask = 0
+        for d in definitions:
+            all_mask |= d.bit
+        mask_count = 1 << max(len(bits), 1)
+        table = PowerTable(
+            version=version,
+            definitions=definitions,
+            by_value={d.value: d for d in definitions},
+            all_mask=all_mask,
+            payloads_by_mask=tuple(
+                [d.to_dict(is_used=bool(mask & d.bit)) for d in definitions]
+                for mask in range(mask_count)
+            ),
+            used_values_by_mask=tuple(
+                [d.value for d in definitions if mask & d.bit]
+                for mask in range(mask_count)
+            ),
+            max_added_time=max((d.effect_payload.get("added_time", 0) for d in definitions), default=0)
+        )
+        self._bits = bits
+        return table
+
+    def load_records(self, records: List[Dict]):
+        """Aplica una lista de registros sobre los valores por defecto"""
+        merged = {r["id"]: r for r in self._default_records()}
+        for record in records:
+            if "id" not in record:
+                raise ValueError("Cada poder necesita un 'id'")
+            if record.get("enabled", True) is False:
+                merged.pop(record["id"], None)
+                continue
+            merged[record["id"]] = dict(merged.get(record["id"], {}), **record)
+        with self._lock:
+            self.table = self._build(list(merged.values()), self.table.version + 1)
+
+    def reload_if_changed(self, force: bool = False) -> bool:
+        """
+        Relee el archivo de configuración si cambió (como mucho cada check_seconds)
+
+        Returns:
+            True si se cargó una nueva versión
+        """
+        if not self.config_path:
+            return False
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return False
+        self._next_check = now + self.check_seconds
+        try:
+            mtime = os.path.getmtime(self.config_path)
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        try:
+            with open(self.config_path, encoding="utf-8") as f:
+                config = json.load(f)
+            self.load_records(config.get("powers", []))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"⚠️ Configuración de poderes inválida, se mantiene la anterior: {e}")
+            return False
+        print(f"✓ Poderes recargados desde {self.config_path} (versión {self.table.version})")
+        return True
+
+
+# Registro compartido por todo el servidor
+registry = PowerRegistry(POWERS_CONFIG_PATH)
+
+
+def check_power(definition: PowerDefinition, offered_mask: int, used_mask: int,
+                current_points: int) -> str:
+    """
+    Valida el uso de un poder contra el estado en bitmask
+
+    Returns:
+        mensaje de error, o None si se puede usar
+    """
+    if not offered_mask & definition.bit:
+        return "Poder no disponible"
+    if used_mask & definition.bit:
+        return "Este poder ya lo usaste en esta partida"
+    if current_points < definition.cost:
+        return f"No tienes suficientes puntos. Necesitas {definition.cost}, tienes {current_points}"
+    return None
+
+
+class PowerStateArrays:
+    """
+    Estado de poderes de muchos jugadores como arrays tipados (struct-of-arrays)
+
+    Cada jugador ocupa un slot; las operaciones de todo el lobby (resets,
+    consultas de doble puntos) se hacen sobre el array completo.
+    """
+
+    def __init__(self, capacity: int = 0):
+        self.used_mask = array('B', bytes(capacity))
+        self.question_state = array('B', bytes(capacity))
+        self.double_points = array('B', bytes(capacity))
+        self.surcharge = array('d', [1.0]) * capacity
+        # Arrays constantes para los resets en bloque (se amplían al crecer)
+        self._zeros = array('B', bytes(capacity))
+        self._ones = array('d', [1.0]) * capacity
+
+    def __len__(self):
+        return len(self.used_mask)
+
+    def add_slot(self) -> int:
+        self.used_mask.append(0)
+        self.question_state.append(0)
+        self.double_points.append(0)
+        self.surcharge.append(1.0)
+        self._zeros.append(0)
+        self._ones.append(1.0)
+        return len(self.used_mask) - 1
+
+    def clear_slot(self, slot: int):
+        self.used_mask[slot] = 0
+        self.question_state[slot] = 0
+        self.double_points[slot] = 0
+        self.surcharge[slot] = 1.0
+
+    def reset_questions(self):
+        self.question_state[:] = self._zeros
+        self.double_points[:] = self._zeros
+
+    def reset_games(self):
+        self.used_mask[:] = self._zeros
+        self.question_state[:] = self._zeros
+        self.double_points[:] = self._zeros
+        self.surcharge[:] = self._ones
+
+
 class PowersManager:
     """Gestor central de poderes para cada pregunta"""
     
     # Definiciones de poderes disponibles
-    POWERS_CONFIG = {
-        PowerType.FIFTY_FIFTY: {
-            "cost": PowerCost.FIFTY_FIFTY.value,
-            "name": "50/50",
-            "description": "Elimina 2 respuestas incorrectas",
-            "effect": "Reduce las opciones a solo 2 (1 correcta y 1 incorrecta)",
-            "emoji": "🎯"
-        },
-        PowerType.DOUBLE_POINTS: {
-            "cost": PowerCost.DOUBLE_POINTS.value,
-            "name": "Doble Puntos",
-            "description": "Duplica los puntos de esta pregunta",
-            "effect": "Si aciertas, ganas el doble de puntos",
-            "emoji": "⭐"
-        },
-        PowerType.TIME_BOOST: {
-            "cost": PowerCost.TIME_BOOST.value,
-            "name": "Tiempo Extra",
-            "description": "Añade 10 segundos más para responder",
-            "effect": "Amplía el temporizador de la pregunta",
-            "emoji": "⏱️"
-        }
-    }
+    POWERS_CONFIG = POWERS_CONFIG
 
     def __init__(self):
         """Inicializa el gestor de poderes"""
-        self.available_powers: List[Power] = []
-        self.used_powers: List[Power] = []
+        # Poderes ofrecidos y usados en la pregunta actual (bitmasks)
+        self.offered_mask = 0
+        self.used_mask = 0
         self.player_points = 0
         # Multiplicador aplicado cuando se paga con puntos (sobrecargo)
         self.points_surcharge_multiplier = 1.0
 
     def generate_question_powers(self) -> List[Dict]:
         """
-        Genera 3 poderes para una nueva pregunta
+        Genera los poderes del registro para una nueva pregunta
         
         Returns:
-            List[Dict]: Lista de 3 poderes disponibles
+            List[Dict]: Poderes disponibles (lista compartida, solo lectura)
         """
-        self.available_powers = []
-        self.used_powers = []
-        
-        for power_type, config in self.POWERS_CONFIG.items():
-            power = Power(
-                power_type=power_type,
-                cost=config["cost"],
-                description=config["description"],
-                effect=config["effect"]
-            )
-            self.available_powers.append(power)
-        
-        return [p.to_dict() for p in self.available_powers]
+        table = registry.table
+        self.offered_mask = table.all_mask
+        self.used_mask = 0
+        return table.payloads_by_mask[0]
 
     def can_use_power(self, power_type: str, current_points: int) -> Tuple[bool, str]:
         """
@@ -109,22 +400,12 @@ class PowersManager:
         Returns:
             Tuple[bool, str]: (Puede usar, Mensaje)
         """
-        # Convertir string a PowerType
-        try:
-            p_type = PowerType(power_type)
-        except ValueError:
+        definition = registry.table.by_value.get(power_type)
+        if definition is None:
             return False, "Poder no válido"
-        
-        # Buscar el poder en disponibles
-        power = next((p for p in self.available_powers if p.power_type == p_type), None)
-        
-        if not power:
-            return False, "Poder no disponible"
-        
-        # Calcular coste real si se paga con puntos (se aplicará sobrecargo más adelante en use_power)
-        if current_points < power.cost:
-            return False, f"No tienes suficientes puntos. Necesitas {power.cost}, tienes {current_points}"
-        
+        error = check_power(definition, self.offered_mask, 0, current_points)
+        if error:
+            return False, error
         return True, "Poder disponible"
 
     def use_power(self, power_type: str, current_points: int) -> Tuple[bool, Dict]:
@@ -138,35 +419,21 @@ class PowersManager:
         Returns:
             Tuple[bool, Dict]: (Éxito, Datos del efecto)
         """
-        can_use, message = self.can_use_power(power_type, current_points)
-        
-        if not can_use:
-            return False, {"error": message}
-        
-        try:
-            p_type = PowerType(power_type)
-        except ValueError:
+        definition = registry.table.by_value.get(power_type)
+        if definition is None:
             return False, {"error": "Poder no válido"}
+        error = check_power(definition, self.offered_mask, 0, current_points)
+        if error:
+            return False, {"error": error}
 
-
-        # Buscar el poder
-        power = next((p for p in self.available_powers if p.power_type == p_type), None)
-        if not power:
-            return False, {"error": "Poder no disponible"}
-
-        # Coste efectivo a cobrar (sin sobrecargo)
-        effective_cost = int(round(power.cost * self.points_surcharge_multiplier))
+        # Coste efectivo a cobrar (con sobrecargo)
+        effective_cost = int(round(definition.cost * self.points_surcharge_multiplier))
 
         if current_points < effective_cost:
             return False, {"error": f"No tienes suficientes puntos. Necesitas {effective_cost}, tienes {current_points}"}
 
-
-        # Aplicar efecto del poder
-        effect_data = self._apply_power_effect(p_type, current_points)
-
-        # Marcar instancia de poder como usada y registrar
-        power.is_used = True
-        self.used_powers.append(power)
+        # Marcar el poder como usado en esta pregunta
+        self.used_mask |= definition.bit
 
         return True, {
             "success": True,
@@ -174,41 +441,10 @@ class PowersManager:
             # Devolvemos el coste real que se ha cobrado (con sobrecargo)
             "cost": effective_cost,
             "new_points": current_points - effective_cost,
-            "effect": effect_data
+            # El gestor central no guarda estado de jugador
+            "effect": definition.handler(definition, None, 0)
         }
 
-    def _apply_power_effect(self, power_type: PowerType, current_points: int) -> Dict:
-        """
-        Aplica el efecto específico de cada poder
-        
-        Args:
-            power_type: Tipo de poder
-            current_points: Puntos actuales
-            
-        Returns:
-            Dict: Datos del efecto aplicado
-        """
-        if power_type == PowerType.FIFTY_FIFTY:
-            return {
-                "type": "fifty_fifty",
-                "message": "Se han eliminado 2 opciones incorrectas",
-                "remaining_options": 2
-            }
-        
-        elif power_type == PowerType.DOUBLE_POINTS:
-            return {
-                "type": "double_points",
-                "message": "¡Ganarás el doble de puntos en esta pregunta!",
-                "multiplier": 2
-            }
-        
-        elif power_type == PowerType.TIME_BOOST:
-            return {
-                "type": "time_boost",
-                "message": "Se añadieron 10 segundos al temporizador",
-                "added_time": 10
-            }
-
     def get_available_powers(self) -> List[Dict]:
         """
         Obtiene todos los poderes disponibles aún no usados
@@ -216,7 +452,10 @@ class PowersManager:
         Returns:
             List[Dict]: Lista de poderes disponibles
         """
-        return [p.to_dict() for p in self.available_powers if not p.is_used]
+        return [
+            d.to_dict() for d in registry.table.definitions
+            if self.offered_mask & d.bit and not self.used_mask & d.bit
+        ]
 
     def get_question_powers_info(self) -> List[Dict]:
         """
@@ -225,160 +464,194 @@ class PowersManager:
         Returns:
             List[Dict]: Información formateada de cada poder
         """
-        powers_info = []
-        
-        for power_type, config in self.POWERS_CONFIG.items():
-            powers_info.append({
-                "power_type": power_type.value,
-                "name": config["name"],
-                "emoji": config["emoji"],
-                "cost": config["cost"],
-                "description": config["description"],
-                "effect": config["effect"],
-                "is_used": False
-            })
-        
-        return powers_info
+        return [d.to_dict() for d in registry.table.definitions]
 
     def reset_for_new_question(self):
         """Reinicia el gestor para una nueva pregunta"""
-        self.available_powers = []
-        self.used_powers = []
+        self.offered_mask = 0
+        self.used_mask = 0
 
     def reset_for_new_round(self):
-        self.available_powers = []
-        self.used_powers = []
+        self.offered_mask = 0
+        self.used_mask = 0
 
 
 class PlayerPowersManager:
-    """Gestor de poderes por jugador (persistencia por partida para ese jugador)"""
+    """
+    Gestor de poderes por jugador (persistencia por partida para ese jugador)
 
-    def __init__(self):
-        self.available_powers: List[Power] = []
-        self.used_powers: List[Power] = []
-        self.used_power_types_this_game = set()
-        self.points_surcharge_multiplier = 1.0
-        self.double_points_active = False
+    Es una vista sobre un slot de PowerStateArrays: `used_mask` (poderes usados
+    en la partida), `question_state` (poderes ofrecidos en la pregunta actual),
+    el flag de doble puntos y el multiplicador de sobrecargo. Sin store propio
+    crea uno de un solo slot.
+    """
+
+    __slots__ = ('_store', '_slot')
+
+    def __init__(self, store: PowerStateArrays = None, slot: int = None):
+        if store is None:
+            store = PowerStateArrays()
+            slot = store.add_slot()
+        self._store = store
+        self._slot = slot
+
+    @property
+    def used_mask(self) -> int:
+        return self._store.used_mask[self._slot]
+
+    @property
+    def question_state(self) -> int:
+        return self._store.question_state[self._slot]
+
+    @property
+    def points_surcharge_multiplier(self) -> float:
+        return self._store.surcharge[self._slot]
+
+    @points_surcharge_multiplier.setter
+    def points_surcharge_multiplier(self, value: float):
+        self._store.surcharge[self._slot] = value
+
+    @property
+    def used_power_types_this_game(self) -> set:
+        return set(registry.table.used_values_by_mask[self._store.used_mask[self._slot]])
+
+    @property
+    def double_points_active(self) -> bool:
+        return bool(self._store.double_points[self._slot])
 
     def generate_question_powers(self, player_used_powers: List[str] = None) -> List[Dict]:
-        self.available_powers = []
-        self.used_powers = []
-        for power_type, config in PowersManager.POWERS_CONFIG.items():
-            power = Power(
-                power_type=power_type,
-                cost=config["cost"],
-                description=config["description"],
-                effect=config["effect"]
-            )
-            if power_type.value in self.used_power_types_this_game:
-                power.is_used = True
-            self.available_powers.append(power)
-        return [p.to_dict() for p in self.available_powers]
+        table = registry.table
+        self._store.question_state[self._slot] = table.all_mask
+        return table.payloads_by_mask[self._store.used_mask[self._slot]]
 
     def get_used_powers(self) -> List[str]:
-        return list(self.used_power_types_this_game)
+        return registry.table.used_values_by_mask[self._store.used_mask[self._slot]]
 
     def can_use_power(self, power_type: str, current_points: int) -> Tuple[bool, str]:
-        try:
-            p_type = PowerType(power_type)
-        except ValueError:
+        definition = registry.table.by_value.get(power_type)
+        if definition is None:
             return False, "Poder no válido"
-        power = next((p for p in self.available_powers if p.power_type == p_type), None)
-        if not power:
-            return False, "Poder no disponible"
-        if p_type.value in self.used_power_types_this_game:
-            return False, "Este poder ya lo usaste en esta partida"
-        if current_points < power.cost:
-            return False, f"No tienes suficientes puntos. Necesitas {power.cost}, tienes {current_points}"
+        store, slot = self._store, self._slot
+        error = check_power(definition, store.question_state[slot], store.used_mask[slot], current_points)
+        if error:
+            return False, error
         return True, "Poder disponible"
 
     def use_power(self, power_type: str, current_points: int) -> Tuple[bool, Dict]:
-        can_use, msg = self.can_use_power(power_type, current_points)
-        if not can_use:
-            return False, {"error": msg}
-        p_type = PowerType(power_type)
-        power = next((p for p in self.available_powers if p.power_type == p_type), None)
-        if not power:
-            return False, {"error": "Poder no disponible"}
-        effective_cost = int(round(power.cost * self.points_surcharge_multiplier))
+        definition = registry.table.by_value.get(power_type)
+        if definition is None:
+            return False, {"error": "Poder no válido"}
+        store, slot = self._store, self._slot
+        error = check_power(definition, store.question_state[slot], store.used_mask[slot], current_points)
+        if error:
+            return False, {"error": error}
+        effective_cost = int(round(definition.cost * store.surcharge[slot]))
         if current_points < effective_cost:
             return False, {"error": f"No tienes suficientes puntos. Necesitas {effective_cost}, tienes {current_points}"}
-        self.used_power_types_this_game.add(p_type.value)
-        effect_data = self._apply_power_effect(p_type)
-        power.is_used = True
-        self.used_powers.append(power)
+        store.used_mask[slot] |= definition.bit
         return True, {
             "success": True,
             "power_type": power_type,
             "cost": effective_cost,
             "new_points": current_points - effective_cost,
-            "effect": effect_data
+            "effect": definition.handler(definition, store, slot)
         }
 
-    def _apply_power_effect(self, power_type: PowerType) -> Dict:
-        if power_type == PowerType.FIFTY_FIFTY:
-            return {
-                "type": "fifty_fifty",
-                "message": "Se han eliminado 2 opciones incorrectas",
-                "remaining_options": 2
-            }
-        elif power_type == PowerType.DOUBLE_POINTS:
-            self.double_points_active = True
-            return {
-                "type": "double_points",
-                "message": "¡Ganarás el doble de puntos en esta pregunta!",
-                "multiplier": 2
-            }
-        elif power_type == PowerType.TIME_BOOST:
-            return {
-                "type": "time_boost",
-                "message": "Se añadieron 10 segundos al temporizador",
-                "added_time": 10
-            }
-        return {"type": "unknown"}
-
     def has_double_points_active(self) -> bool:
-        return self.double_points_active
+        return bool(self._store.double_points[self._slot])
 
     def clear_double_points(self):
-        self.double_points_active = False
+        self._store.double_points[self._slot] = 0
 
     def reset_for_new_question(self):
-        self.available_powers = []
-        self.used_powers = []
         # Doble puntos solo dura una pregunta
-        self.double_points_active = False
+        self._store.question_state[self._slot] = 0
+        self._store.double_points[self._slot] = 0
 
     def reset_for_new_game(self):
-        self.available_powers = []
-        self.used_powers = []
-        self.used_power_types_this_game = set()
-        self.double_points_active = False
+        self._store.used_mask[self._slot] = 0
+        self._store.question_state[self._slot] = 0
+        self._store.double_points[self._slot] = 0
 
 
 class GamePowersManager:
-    """Gestor de poderes del lobby: crea y mantiene gestores por jugador"""
+    """
+    Gestor de poderes del lobby
+
+    Guarda el estado de todos los jugadores en un PowerStateArrays (un slot
+    por socket) y entrega PlayerPowersManager como vistas sobre ese slot.
+    """
 
     def __init__(self):
-        self.player_managers: Dict[str, PlayerPowersManager] = {}
+        self.state = PowerStateArrays()
+        self._slots: Dict[str, int] = {}
+        self._socket_ids: List[str] = []
+        self._free_slots: List[int] = []
+        self._views: Dict[str, PlayerPowersManager] = {}
+
+    @property
+    def player_managers(self) -> Dict[str, PlayerPowersManager]:
+        return {sid: self.get_or_create_manager(sid) for sid in self._slots}
+
+    def __len__(self):
+        return len(self._slots)
+
+    def slot_for(self, socket_id: str) -> int:
+        """Slot del jugador (lo asigna si es nuevo)"""
+        slot = self._slots.get(socket_id)
+        if slot is None:
+            if self._free_slots:
+                slot = self._free_slots.pop()
+                self._socket_ids[slot] = socket_id
+            else:
+                slot = self.state.add_slot()
+                self._socket_ids.append(socket_id)
+            self._slots[socket_id] = slot
+        return slot
 
     def get_or_create_manager(self, socket_id: str) -> PlayerPowersManager:
-        if socket_id not in self.player_managers:
-            self.player_managers[socket_id] = PlayerPowersManager()
-        return self.player_managers[socket_id]
+        view = self._views.get(socket_id)
+        if view is None:
+            view = PlayerPowersManager(self.state, self.slot_for(socket_id))
+            self._views[socket_id] = view
+        return view
+
+    def question_powers(self, socket_id: str) -> List[Dict]:
+        """Ofrece los poderes de la pregunta a un jugador sin crear objetos"""
+        slot = self.slot_for(socket_id)
+        table = registry.table
+        self.state.question_state[slot] = table.all_mask
+        return table.payloads_by_mask[self.state.used_mask[slot]]
 
     def remove_player(self, socket_id: str):
-        if socket_id in self.player_managers:
-            del self.player_managers[socket_id]
+        slot = self._slots.pop(socket_id, None)
+        if slot is None:
+            return
+        self.state.clear_slot(slot)
+        self._socket_ids[slot] = None
+        self._free_slots.append(slot)
+        self._views.pop(socket_id, None)
+
+    def players_with_double_points(self) -> List[str]:
+        """Sockets con doble puntos activo en la pregunta actual"""
+        flags = self.state.double_points
+        result = []
+        slot = flags.index(1) if 1 in flags else -1
+        while slot != -1:
+            result.append(self._socket_ids[slot])
+            try:
+                slot = flags.index(1, slot + 1)
+            except ValueError:
+                slot = -1
+        return result
 
     def reset_all_for_new_question(self):
-        for mgr in self.player_managers.values():
-            mgr.reset_for_new_question()
+        # Punto barato para aplicar cambios de configuración de poderes
+        registry.reload_if_changed()
+        self.state.reset_questions()
 
     def reset_all_for_new_game(self):
-        for mgr in self.player_managers.values():
-            mgr.reset_for_new_game()
-
+        self.state.reset_games()
 
 
 # Función auxiliar para testing
@@ -0,0 +1,234 @@
+"""
+Profundidad de pre-carga adaptativa por lobby
+Mide el ritmo de cada lobby (intervalo entre preguntas) y la latencia de
+generación, y calcula cuántas preguntas mantener en cola para que la
+probabilidad de quedarse sin pregunta quede por debajo del objetivo.
+"""
+import math
+import os
+import threading
+import time
+from statistics import NormalDist
+
+import metrics
+
+# Probabilidad máxima aceptada de encontrar la cola vacía
+PREFETCH_STALL_TARGET = float(os.getenv("PREFETCH_STALL_TARGET", "0.05"))
+PREFETCH_MIN_DEPTH = int(os.getenv("PREFETCH_MIN_DEPTH", "1"))
+PREFETCH_MAX_DEPTH = int(os.getenv("PREFETCH_MAX_DEPTH", "6"))
+
+# Valores iniciales mientras no hay mediciones del lobby
+DEFAULT_INTERVAL = 20.0
+DEFAULT_FETCH_LATENCY = 2.0
+# Peso de cada nueva muestra en las medias exponenciales
+EWMA_ALPHA = 0.3
+
+stalls_total = metrics.counter(
+    'prefetch_stalls_total', 'Preguntas pedidas con la cola vacía (generación síncrona)'
+)
+queue_depth_histogram = metrics.histogram(
+    'prefetch_queue_depth', [0, 1, 2, 3, 4, 6, 8], 'Preguntas en cola al sacar una pregunta'
+)
+target_depth_histogram = metrics.histogram(
+    'prefetch_target_depth', [1, 2, 3, 4, 6, 8], 'Profundidad objetivo calculada por lobby'
+)
+fetch_latency_histogram = metrics.histogram(
+    'prefetch_fetch_seconds', [0.25, 0.5, 1, 2, 4, 8, 16, 32], 'Duración de cada generación de pregunta'
+)
+
+
+class _Ewma:
+    """Media y varianza exponenciales"""
+
+    __slots__ = ('mean', 'var', 'samples')
+
+    def __init__(self, initial: float):
+        self.mean = initial
+        self.var = (initial / 2) ** 2
+        self.samples = 0
+
+    def add(self, value: float):
+        if self.samples == 0:
+            self.mean = value
+        else:
+            diff = value - self.mean
+            self.mean += EWMA_ALPHA * diff
+            self.var = (1 - EWMA_ALPHA) * (self.var + EWMA_ALPHA * diff * diff)
+        self.samples += 1
+
+
+class LobbyPace:
+    """Ritmo observado de un lobby y profundidad de cola recomendada"""
+
+    def __init__(self, stall_target: float = PREFETCH_STALL_TARGET,
+                 min_depth: int = PREFETCH_MIN_DEPTH, max_depth: int = PREFETCH_MAX_DEPTH,
+                 clock=time.monotonic):
+        self.interval = _Ewma(DEFAULT_INTERVAL)
+        self.fetch_latency = _Ewma(DEFAULT_FETCH_LATENCY)
+        self.min_depth = min_depth
+        self.max_depth = max_depth
+        self.z = NormalDist().inv_cdf(1 - stall_target)
+        self.stalls = 0
+        self.dequeues = 0
+        self._clock = clock
+        self._last_dequeue = None
+
+    def reset_clock(self):
+        """Olvida el último instante (al empezar partida) sin perder lo aprendido"""
+        self._last_dequeue = None
+
+    def record_dequeue(self, queue_depth: int):
+        """Registra que el juego pidió una pregunta con `queue_depth` en cola"""
+        now = self._clock()
+        if self._last_dequeue is not None:
+            self.interval.add(now - self._last_dequeue)
+        self._last_dequeue = now
+        self.dequeues += 1
+        queue_depth_histogram.observe(queue_depth)
+        target_depth_histogram.observe(self.target_depth())
+        if queue_depth == 0:
+            self.stalls += 1
+            stalls_total.inc()
+
+    def record_fetch(self, seconds: float):
+        """Registra la duración de una generación de pregunta"""
+        self.fetch_latency.add(seconds)
+        fetch_latency_histogram.observe(seconds)
+
+    def target_depth(self) -> int:
+        """
+        Menor profundidad d tal que P(latencia > d * intervalo) < objetivo
+
+        Con latencia L e intervalo I aproximados como normales e independientes,
+        L - d*I tiene media mL - d*mI y varianza vL + d²·vI.
+        """
+        m_l, v_l = self.fetch_latency.mean, self.fetch_latency.var
+        m_i, v_i = max(self.interval.mean, 0.1), self.interval.var
+        depth = self.min_depth
+        while depth < self.max_depth:
+            if m_l - depth * m_i + self.z * math.sqrt(v_l + depth * depth * v_i) < 0:
+                break
+            depth += 1
+        return depth
+
+    def stats(self) -> dict:
+        return {
+            'interval_mean': round(self.interval.mean, 3),
+            'fetch_latency_mean': round(self.fetch_latency.mean, 3),
+            'target_depth': self.target_depth(),
+            'stalls': self.stalls,
+            'dequeues': self.dequeues
+        }
+
+
+class PrefetchQuestionFeed:
+    """
+    Fuente de preguntas con pre-carga adaptativa por lobby
+
+    Un thread por lobby mantiene la cola en la profundidad que indica su
+    LobbyPace mientras la partida siga activa.
+
+    Args:
+        generate: función que genera una pregunta (bloqueante), o None si falla
+        first_attempts: intentos para la primera pregunta de una partida
+        retry_delay: pausa entre intentos
+    """
+
+    def __init__(self, generate, first_attempts: int = 3, retry_delay: float = 1.0,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.generate = generate
+        self.first_attempts = first_attempts
+        self.retry_delay = retry_delay
+        self._clock = clock
+        self._sleep = sleep
+        # Cola de preguntas pre-cargadas por lobby
+        self.queues = {}
+        # Ritmo medido por lobby (define cuántas preguntas pre-cargar)
+        self.paces = {}
+        # Eventos para despertar al generador cuando se consume una pregunta
+        self.events = {}
+        # Threads de generación por lobby
+        self.threads = {}
+
+    def pace(self, lobby_id: str) -> LobbyPace:
+        if lobby_id not in self.paces:
+            self.paces[lobby_id] = LobbyPace(clock=self._clock)
+        return self.paces[lobby_id]
+
+    def _timed_generate(self, lobby_id: str):
+        """Genera una pregunta registrando la latencia en el ritmo del lobby"""
+        started = self._clock()
+        question = self.generate()
+        self.pace(lobby_id).record_fetch(self._clock() - started)
+        return question
+
+    def first_question(self, lobby_id: str):
+        """Primera pregunta de la partida (con reintentos); None si todos fallan"""
+        for attempt in range(1, self.first_attempts + 1):
+            try:
+                print(f'  Intento {attempt} de {self.first_attempts}...')
+                question = self.generate()
+                if question:
+                    return question
+            except Exception as e:
+                print(f'  Error: {e}')
+            self._sleep(self.retry_delay)
+        return None
+
+    def start(self, lobby_id: str, is_active):
+        """Vacía la cola y mantiene un generador continuo mientras `is_active()`"""
+        self.queues[lobby_id] = []
+        pace = self.pace(lobby_id)
+        pace.reset_clock()
+        wake = self.events.setdefault(lobby_id, threading.Event())
+
+        # Si el generador de la partida anterior sigue vivo, se reutiliza
+        thread = self.threads.get(lobby_id)
+        if thread is not None and thread.is_alive():
+            wake.set()
+            return
+
+        def generate_questions_continuously():
+            print(f'Thread de generación iniciado para lobby {lobby_id}')
+            while is_active() and lobby_id in self.queues:
+                # Limpiar antes de mirar la cola: un set() posterior (pregunta
+                # consumida) hace que la espera de abajo vuelva enseguida
+                wake.clear()
+                target = pace.target_depth()
+                queue = self.queues.get(lobby_id)
+                if queue is not None and len(queue) < target:
+                    print(f'Generando pregunta para cola del lobby {lobby_id} (objetivo {target})...')
+                    question = self._timed_generate(lobby_id)
+                    if question and lobby_id in self.queues:
+                        self.queues[lobby_id].append(question)
+                        print(f'Pregunta agregada a cola. Total en cola: {len(self.queues[lobby_id])}')
+                    continue
+                # Cola completa: esperar a que se consuma una pregunta
+                wake.wait(timeout=2)
+            self.threads.pop(lobby_id, None)
+            print(f'Thread de generación terminado para lobby {lobby_id}')
+
+        thread = threading.Thread(target=generate_questions_continuously, daemon=True)
+        self.threads[lobby_id] = thread
+        thread.start()
+
+    def next_question(self, lobby_id: str):
+        """Saca la siguiente pregunta de la cola, o genera una si está vacía"""
+        queue = self.queues.setdefault(lobby_id, [])
+        self.pace(lobby_id).record_dequeue(len(queue))
+        if lobby_id in self.events:
+            self.events[lobby_id].set()
+
+        if queue:
+            return queue.pop(0)
+
+        print('Cola vacía, generando pregunta inmediata...')
+        return self._timed_generate(lobby_id)
+
+    def stop(self, lobby_id: str):
+        """Libera el estado de pre-carga de un lobby eliminado"""
+        self.paces.pop(lobby_id, None)
+        self.queues.pop(lobby_id, None)
+        event = self.events.pop(lobby_id, None)
+        if event:
+            event.set()
@@ -0,0 +1,409 @@
+"""
+Packs de preguntas pre-traducidos e indexados
+Convierte volcados de preguntas (Open Trivia DB o la API personalizada) en un
+archivo binario compacto que el servidor carga al iniciar, de modo que en
+tiempo de juego no se traduce ni se parsea nada.
+
+Uso:
+    python question_pack.py build -o questions.pack opentdb.json api.json
+    python question_pack.py info questions.pack
+
+Formato (little-endian, versión 1):
+    cabecera     magic 'GOQP', versión, contadores y offsets de cada sección
+    strings      tabla de offsets u32 (n+1) + blob UTF-8 con strings internados
+    preguntas    registros fijos de 24 bytes (ver QUESTION_STRUCT)
+    opciones     ids de string u32, contiguos por pregunta
+    índice       por dificultad (easy, medium, hard): (inicio, cantidad) u32
+                 seguido de los índices de pregunta u32
+"""
+import argparse
+import html
+import json
+import mmap
+import os
+import random
+import struct
+from typing import Dict, List, Optional
+
+PACK_MAGIC = b'GOQP'
+PACK_VERSION = 1
+
+# Claves internas de dificultad, en el orden del índice del pack
+DIFFICULTY_KEYS = ('easy', 'medium', 'hard')
+
+# Etiquetas que se muestran al jugador para preguntas de Open Trivia DB
+DIFFICULTY_LABELS_ES = {
+    'easy': 'Fácil',
+    'medium': 'Medio',
+    'hard': 'Difícil',
+}
+
+# magic, versión, flags, n_strings, n_preguntas, n_opciones,
+# offset tabla de strings, offset blob, offset preguntas, offset opciones, offset índice
+HEADER_STRUCT = struct.Struct('<4sHHIIIIIIII')
+# pregunta, categoría, etiqueta de dificultad, explicación (ids de string),
+# primera opción, cantidad de opciones, índice de la respuesta correcta
+QUESTION_STRUCT = struct.Struct('<IIIIIBB2x')
+U32 = struct.Struct('<I')
+INDEX_ENTRY_STRUCT = struct.Struct('<II')
+
+
+class QuestionPackError(Exception):
+    """Error al leer o construir un pack de preguntas"""
+
+
+# ---------------------------------------------------------------------------
+# Lectura (servidor)
+# ---------------------------------------------------------------------------
+
+class QuestionPack:
+    """Pack de preguntas mapeado en memoria (solo lectura)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise QuestionPackError(f"Pack vacío: {path}")
+
+        if len(self._mm) < HEADER_STRUCT.size:
+            self.close()
+            raise QuestionPackError(f"Pack truncado: {path}")
+
+        (magic, version, _flags, self.string_count, self.question_count,
+         self.option_count, self._strings_offset, self._blob_offset,
+         self._questions_offset, self._options_offset,
+         self._index_offset) = HEADER_STRUCT.unpack_from(self._mm, 0)
+
+        if magic != PACK_MAGIC:
+            self.close()
+            raise QuestionPackError(f"No es un pack de preguntas: {path}")
+        if version != PACK_VERSION:
+            self.close()
+            raise QuestionPackError(f"Versión de pack no soportada: {version}")
+
+        # Strings ya decodificados (los strings están internados, se repiten poco)
+        self._strings: Dict[int, str] = {}
+
+        self._difficulty_ranges = {}
+        for i, key in enumerate(DIFFICULTY_KEYS):
+            start, count = INDEX_ENTRY_STRUCT.unpack_from(
+                self._mm, self._index_offset + i * INDEX_ENTRY_STRUCT.size
+            )
+            self._difficulty_ranges[key] = (start, count)
+        self._index_ids_offset = self._index_offset + len(DIFFICULTY_KEYS) * INDEX_ENTRY_STRUCT.size
+
+    def __len__(self):
+        return self.question_count
+
+    def close(self):
+        try:
+            self._mm.close()
+        except Exception:
+            pass
+        self._file.close()
+
+    def _string(self, string_id: int) -> str:
+        cached = self._strings.get(string_id)
+        if cached is not None:
+            return cached
+        start, end = struct.unpack_from('<II', self._mm, self._strings_offset + string_id * 4)
+        value = self._mm[self._blob_offset + start:self._blob_offset + end].decode('utf-8')
+        self._strings[string_id] = value
+        return value
+
+    def count(self, difficulty: str) -> int:
+        """Cantidad de preguntas indexadas para una dificultad"""
+        return self._difficulty_ranges.get(difficulty, (0, 0))[1]
+
+    def question(self, index: int) -> Dict:
+        """
+        Devuelve la pregunta en el formato interno del juego
+
+        Args:
+            index: posición de la pregunta dentro del pack
+
+        Returns:
+            dict nuevo (el llamador puede modificarlo)
+        """
+        if not 0 <= index < self.question_count:
+            raise IndexError(index)
+        (question_id, category_id, label_id, explanation_id,
+         first_option, option_count, correct_index) = QUESTION_STRUCT.unpack_from(
+            self._mm, self._questions_offset + index * QUESTION_STRUCT.size
+        )
+        options = [
+            self._string(U32.unpack_from(self._mm, self._options_offset + (first_option + i) * 4)[0])
+            for i in range(option_count)
+        ]
+        return {
+            'question': self._string(question_id),
+            'options': options,
+            'correct_answer': correct_index,
+            'difficulty': self._string(label_id),
+            'category': self._string(category_id),
+            'explanation': self._string(explanation_id)
+        }
+
+    def random_question(self, difficulty: Optional[str] = 'medium', rng=random) -> Optional[Dict]:
+        """
+        Elige una pregunta al azar de la dificultad pedida
+
+        Si no hay preguntas de esa dificultad (o difficulty es None) se elige
+        entre todas, igual que hace la consulta a la API.
+        """
+        if self.question_count == 0:
+            return None
+        start, count = self._difficulty_ranges.get(difficulty, (0, 0))
+        if count == 0:
+            return self.question(rng.randrange(self.question_count))
+        position = start + rng.randrange(count)
+        index = U32.unpack_from(self._mm, self._index_ids_offset + position * 4)[0]
+        return self.question(index)
+
+
+def load_question_pack(path: str) -> Optional[QuestionPack]:
+    """Carga un pack si existe; devuelve None (con aviso) si no se puede usar"""
+    if not path:
+        return None
+    if not os.path.exists(path):
+        print(f"⚠️ Pack de preguntas no encontrado: {path}")
+        return None
+    try:
+        pack = QuestionPack(path)
+    except (OSError, QuestionPackError) as e:
+        print(f"⚠️ No se pudo cargar el pack de preguntas '{path}': {e}")
+        return None
+    print(f"✓ Pack de preguntas cargado: {path} ({len(pack)} preguntas)")
+    return pack
+
+
+# ---------------------------------------------------------------------------
+# Construcción (CLI offline)
+# ---------------------------------------------------------------------------
+
+def parse_dump(data) -> List[Dict]:
+    """
+    Normaliza un volcado de preguntas a registros del pack
+
+    Acepta el JSON de Open Trivia DB ({"results": [...]}) o la lista
+    de la API personalizada (pregunta/opciones/respuesta/dificultad).
+    Cada registro indica si su texto está en inglés y debe traducirse.
+    """
+    if isinstance(data, dict) and isinstance(data.get('results'), list):
+        records = []
+        for item in data['results']:
+            correct = html.unescape(item.get('correct_answer', ''))
+            options = [correct] + [html.unescape(o) for o in item.get('incorrect_answers', [])]
+            difficulty = item.get('difficulty', 'medium')
+            if difficulty not in DIFFICULTY_KEYS:
+                difficulty = 'medium'
+            records.append({
+                'question': html.unescape(item.get('question', '')),
+                'options': options,
+                'correct_text': correct,
+                'difficulty': difficulty,
+                'label': DIFFICULTY_LABELS_ES[difficulty],
+                'category': html.unescape(item.get('category', 'General')),
+                'shuffle': item.get('type') != 'boolean',
+                'translate': True
+            })
+        return records
+
+    if isinstance(data, list):
+        from ai_service import difficulty_key
+        records = []
+        for item in data:
+            options = list(item.get('opciones', []))
+            dificultad = item.get('dificultad', '')
+            records.append({
+                'question': item.get('pregunta', ''),
+                'options': options,
+                'correct_text': item.get('respuesta', ''),
+                'difficulty': difficulty_key(dificultad),
+                'label': dificultad or 'Medio',
+                'category': item.get('categoria', 'General'),
+                'shuffle': False,
+                'translate': False
+            })
+        return records
+
+    raise QuestionPackError("Formato de volcado no reconocido")
+
+
+class _StringTable:
+    """Tabla de strings internados: cada texto distinto se guarda una sola vez"""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def intern(self, value: str) -> int:
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = len(self.values)
+            self.ids[value] = string_id
+            self.values.append(value)
+        return string_id
+
+
+def build_pack(records: List[Dict], output_path: str, translate: bool = True, seed: int = 0) -> Dict:
+    """
+    Traduce (una sola vez) y escribe los registros como pack binario
+
+    Args:
+        records: registros devueltos por parse_dump
+        output_path: archivo de salida
+        translate: si False no se llama al traductor (útil sin red)
+        seed: semilla para el orden de opciones de Open Trivia DB
+
+    Returns:
+        dict con estadísticas de la construcción
+    """
+    translations: Dict[str, str] = {}
+
+    def tr(text):
+        if not translate:
+            return text
+        if text not in translations:
+            from ai_service import translate_text
+            translations[text] = translate_text(text)
+        return translations[text]
+
+    rng = random.Random(seed)
+    strings = _StringTable()
+    questions = []
+    option_ids: List[int] = []
+    by_difficulty = {key: [] for key in DIFFICULTY_KEYS}
+    seen = set()
+    skipped = 0
+
+    for record in records:
+        options = record['options']
+        if not record['question'] or len(options) < 2 or len(options) > 255:
+            skipped += 1
+            continue
+        try:
+            correct_index = options.index(record['correct_text'])
+        except ValueError:
+            # Mismo criterio que la API: si la respuesta no está, usar la primera
+            correct_index = 0
+
+        if record['shuffle']:
+            order = list(range(len(options)))
+            rng.shuffle(order)
+            options = [options[i] for i in order]
+            correct_index = order.index(correct_index)
+
+        if record['translate']:
+            question_text = tr(record['question'])
+            options = [tr(o) for o in options]
+            category = tr(record['category'])
+        else:
+            question_text = record['question']
+            category = record['category']
+
+        if question_text in seen:
+            skipped += 1
+            continue
+        seen.add(question_text)
+
+        index = len(questions)
+        questions.append((
+            strings.intern(question_text),
+            strings.intern(category),
+            strings.intern(record['label']),
+            strings.intern(f'La respuesta correcta es: {options[correct_index]}'),
+            len(option_ids),
+            len(options),
+            correct_index
+        ))
+        option_ids.extend(strings.intern(o) for o in options)
+        by_difficulty[record['difficulty']].append(index)
+
+    blob = bytearray()
+    string_offsets = [0]
+    for value in strings.values:
+        blob += value.encode('utf-8')
+        string_offsets.append(len(blob))
+    while len(blob) % 4:
+        blob += b'\0'
+
+    strings_offset = HEADER_STRUCT.size
+    blob_offset = strings_offset + 4 * len(string_offsets)
+    questions_offset = blob_offset + len(blob)
+    options_offset = questions_offset + QUESTION_STRUCT.size * len(questions)
+    index_offset = options_offset + 4 * len(option_ids)
+
+    out = bytearray(HEADER_STRUCT.pack(
+        PACK_MAGIC, PACK_VERSION, 0, len(strings.values), len(questions), len(option_ids),
+        strings_offset, blob_offset, questions_offset, options_offset, index_offset
+    ))
+    out += struct.pack(f'<{len(string_offsets)}I', *string_offsets)
+    out += blob
+    for q in questions:
+        out += QUESTION_STRUCT.pack(*q)
+    out += struct.pack(f'<{len(option_ids)}I', *option_ids)
+    start = 0
+    for key in DIFFICULTY_KEYS:
+        out += INDEX_ENTRY_STRUCT.pack(start, len(by_difficulty[key]))
+        start += len(by_difficulty[key])
+    for key in DIFFICULTY_KEYS:
+        out += struct.pack(f'<{len(by_difficulty[key])}I', *by_difficulty[key])
+
+    tmp_path = output_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(out)
+    os.replace(tmp_path, output_path)
+
+    return {
+        'questions': len(questions),
+        'strings': len(strings.values),
+        'skipped': skipped,
+        'translated': len(translations),
+        'bytes': len(out),
+        'by_difficulty': {key: len(v) for key, v in by_difficulty.items()}
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Packs de preguntas pre-traducidos para Game-On')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('build', help='Importa volcados JSON y genera un pack')
+    build.add_argument('dumps', nargs='+', help='Archivos JSON (Open Trivia DB o API personalizada)')
+    build.add_argument('-o', '--output', default='questions.pack')
+    build.add_argument('--no-translate', action='store_true', help='No traducir (sin red)')
+    build.add_argument('--seed', type=int, default=0, help='Semilla para el orden de opciones')
+
+    info = sub.add_parser('info', help='Muestra el contenido de un pack')
+    info.add_argument('pack')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        records = []
+        for path in args.dumps:
+            with open(path, encoding='utf-8') as f:
+                records.extend(parse_dump(json.load(f)))
+        stats = build_pack(records, args.output, translate=not args.no_translate, seed=args.seed)
+        print(f"✓ Pack escrito en {args.output}: {stats['questions']} preguntas, "
+              f"{stats['strings']} strings, {stats['bytes']} bytes "
+              f"(omitidas: {stats['skipped']}, traducciones: {stats['translated']})")
+        print(f"  Por dificultad: {stats['by_difficulty']}")
+        return 0
+
+    pack = QuestionPack(args.pack)
+    try:
+        print(f"{args.pack}: versión {PACK_VERSION}, {len(pack)} preguntas, {pack.string_count} strings")
+        for key in DIFFICULTY_KEYS:
+            print(f"  {key}: {pack.count(key)}")
+    finally:
+        pack.close()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,175 @@
+"""
+Ranking global paginado
+Guarda en memoria una foto de los primeros RANKING_CACHE_SIZE usuarios por
+partidas ganadas (una consulta con el índice games_won) y sirve las páginas
+desde ahí. La foto se invalida al sumar una victoria y caduca tras
+RANKING_CACHE_SECONDS (victorias registradas por otros workers). Cada página
+lleva un ETag para que un ranking sin cambios se responda con 304 sin cuerpo.
+"""
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import metrics
+
+# Usuarios que se guardan en la foto en memoria
+RANKING_CACHE_SIZE = int(os.getenv("RANKING_CACHE_SIZE", "1000"))
+# Segundos de vida de la foto aunque no haya victorias en este proceso
+RANKING_CACHE_SECONDS = float(os.getenv("RANKING_CACHE_SECONDS", "30"))
+RANKING_DEFAULT_LIMIT = 10
+RANKING_MAX_LIMIT = 100
+# Páginas serializadas que se guardan por foto
+MAX_CACHED_PAGES = 256
+
+# Orden del ranking (el público desempata para que el cursor sea estable)
+RANKING_SORT = [('games_won', -1), ('public_id', 1)]
+RANKING_PROJECTION = {'_id': 0, 'public_id': 1, 'name': 1, 'games_won': 1}
+
+ranking_requests_total = metrics.counter('ranking_requests_total', 'Páginas de ranking pedidas')
+ranking_not_modified_total = metrics.counter(
+    'ranking_not_modified_total', 'Páginas de ranking respondidas con 304 (ETag sin cambios)'
+)
+ranking_rebuilds_total = metrics.counter('ranking_rebuilds_total', 'Fotos del ranking leídas de MongoDB')
+ranking_db_pages_total = metrics.counter(
+    'ranking_db_pages_total', 'Páginas de ranking fuera de la foto (consulta por cursor)'
+)
+
+
+def encode_cursor(rank: int, games_won: int, public_id: str) -> str:
+    """Cursor opaco con la posición del último usuario de la página"""
+    raw = json.dumps([rank, games_won, public_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[int, int, str]:
+    """Inverso de encode_cursor (ValueError si el cursor no es válido)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        rank, games_won, public_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return int(rank), int(games_won), str(public_id)
+    except Exception:
+        raise ValueError('Cursor inválido')
+
+
+def ensure_ranking_index(collection):
+    """Índice que usa la consulta del ranking (orden y cursor)"""
+    collection.create_index(RANKING_SORT, name='ranking_games_won')
+
+
+class RankingCache:
+    """
+    Foto del ranking y páginas ya serializadas
+
+    Args:
+        collection: colección de usuarios
+        size: usuarios que se guardan en la foto
+        ttl: segundos de vida de la foto
+        clock: reloj monotónico
+    """
+
+    def __init__(self, collection, size: int = RANKING_CACHE_SIZE, ttl: float = RANKING_CACHE_SECONDS,
+                 clock=time.monotonic):
+        self.collection = collection
+        self.size = size
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._indexed = False
+        # rows: [(games_won, public_id, name)], complete: la foto tiene a todos los usuarios
+        self._snapshot: Optional[Dict] = None
+
+    def invalidate(self):
+        """Descarta la foto (se vuelve a leer en el próximo pedido)"""
+        self._snapshot = None
+
+    def _rows(self, query: Dict, limit: int) -> List[Tuple[int, str, str]]:
+        cursor = self.collection.find(query, RANKING_PROJECTION).sort(RANKING_SORT).limit(limit)
+        return [(user.get('games_won', 0), user['public_id'], user['name']) for user in cursor]
+
+    def _current(self) -> Dict:
+        snapshot = self._snapshot
+        if snapshot is not None and self._clock() - snapshot['built_at'] < self.ttl:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and self._clock() - snapshot['built_at'] < self.ttl:
+                return snapshot
+            if not self._indexed:
+                try:
+                    ensure_ranking_index(self.collection)
+                    self._indexed = True
+                except Exception as e:
+                    print(f"⚠️ No se pudo crear el índice del ranking: {e}")
+            rows = self._rows({}, self.size)
+            snapshot = {
+                'rows': rows,
+                'complete': len(rows) < self.size,
+                'built_at': self._clock(),
+                'pages': {}
+            }
+            self._snapshot = snapshot
+            ranking_rebuilds_total.inc()
+            return snapshot
+
+    def page(self, limit: int = RANKING_DEFAULT_LIMIT, cursor: str = None) -> Tuple[str, str]:
+        """
+        Página del ranking ya serializada
+
+        Args:
+            limit: usuarios por página (1..RANKING_MAX_LIMIT)
+            cursor: `next_cursor` de la página anterior (None = desde el primero)
+
+        Returns:
+            (cuerpo JSON, etag)
+        """
+        ranking_requests_total.inc()
+        limit = max(1, min(int(limit), RANKING_MAX_LIMIT))
+        start, last = 0, None
+        if cursor:
+            last = decode_cursor(cursor)
+            start = last[0]
+
+        snapshot = self._current()
+        key = (cursor, limit)
+        cached = snapshot['pages'].get(key)
+        if cached is not None:
+            return cached
+
+        rows = snapshot['rows']
+        in_snapshot = last is None or (0 < start <= len(rows) and rows[start - 1][1] == last[2])
+        if in_snapshot and (start + limit <= len(rows) or snapshot['complete']):
+            items = rows[start:start + limit]
+            has_more = start + limit < len(rows) or not snapshot['complete']
+        else:
+            # Fuera de la foto: seguir desde el cursor con el índice (sin saltar documentos)
+            ranking_db_pages_total.inc()
+            query = {}
+            if last is not None:
+                _, games_won, public_id = last
+                query = {'$or': [
+                    {'games_won': {'$lt': games_won}},
+                    {'games_won': games_won, 'public_id': {'$gt': public_id}}
+                ]}
+            items = self._rows(query, limit + 1)
+            has_more = len(items) > limit
+            items = items[:limit]
+
+        usuarios = [
+            {'rank': start + idx + 1, 'name': name, 'games_won': games_won}
+            for idx, (games_won, _, name) in enumerate(items)
+        ]
+        next_cursor = None
+        if has_more and items:
+            games_won, public_id, _ = items[-1]
+            next_cursor = encode_cursor(start + len(items), games_won, public_id)
+
+        body = json.dumps({'usuarios': usuarios, 'next_cursor': next_cursor}, ensure_ascii=False)
+        etag = hashlib.sha1(body.encode()).hexdigest()[:20]
+        if len(snapshot['pages']) >= MAX_CACHED_PAGES:
+            snapshot['pages'].clear()
+        snapshot['pages'][key] = (body, etag)
+        return body, etag
@@ -0,0 +1,239 @@
+"""
+Limitadores de tasa compartidos por el proceso
+"""
+import datetime
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+
+class TokenBucket:
+    """
+    Token bucket thread-safe con reserva de tokens
+
+    Cada llamada a acquire() reserva su token al momento (el saldo puede quedar
+    negativo) y duerme solo lo que le toca, así los productores salen en orden
+    y el caudal total coincide con `rate` sin esperas fijas escalonadas.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0, clock=time.monotonic, sleep=time.sleep):
+        """
+        Args:
+            rate: tokens por segundo (<= 0 desactiva el límite)
+            capacity: ráfaga máxima permitida
+            clock: reloj monotónico (inyectable para tests)
+            sleep: función de espera (inyectable para tests)
+        """
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(capacity))
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._last
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._last = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Toma tokens solo si hay saldo disponible ahora mismo"""
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            self._refill(self._clock())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1.0, timeout: float = None) -> bool:
+        """
+        Espera hasta poder tomar tokens
+
+        Args:
+            tokens: cantidad a consumir
+            timeout: espera máxima en segundos (None = sin límite)
+
+        Returns:
+            True si se obtuvo el token, False si la espera superaría el timeout
+        """
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            wait = 0.0
+            if self._tokens < tokens:
+                wait = (tokens - self._tokens) / self.rate
+                if timeout is not None and wait > timeout:
+                    return False
+            self._tokens -= tokens
+        if wait > 0:
+            self._sleep(wait)
+        return True
+
+    def configure(self, rate: float = None, capacity: float = None):
+        """Cambia la tasa o la ráfaga en caliente"""
+        with self._lock:
+            self._refill(self._clock())
+            if rate is not None:
+                self.rate = float(rate)
+            if capacity is not None:
+                self.capacity = max(1.0, float(capacity))
+                self._tokens = min(self._tokens, self.capacity)
+
+
+class MemoryWindowStore:
+    """
+    Contadores por clave y ventana en memoria del proceso (LRU acotado)
+
+    Cada clave guarda solo (ventana, contador actual, contador anterior).
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._counts: "OrderedDict[str, List[int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._counts)
+
+    def counts(self, key: str, window: int) -> Tuple[int, int]:
+        """(intentos en la ventana actual, intentos en la anterior)"""
+        with self._lock:
+            entry = self._counts.get(key)
+        if entry is None:
+            return 0, 0
+        start, current, previous = entry
+        if start == window:
+            return current, previous
+        if start == window - 1:
+            return 0, current
+        return 0, 0
+
+    def add(self, key: str, window: int, expires_at: float):
+        with self._lock:
+            entry = self._counts.get(key)
+            if entry is None:
+                self._counts[key] = [window, 1, 0]
+                if len(self._counts) > self.max_keys:
+                    self._counts.popitem(last=False)
+                return
+            self._counts.move_to_end(key)
+            if entry[0] != window:
+                entry[2] = entry[1] if entry[0] == window - 1 else 0
+                entry[0], entry[1] = window, 0
+            entry[1] += 1
+
+    def reset(self, key: str, window: int):
+        with self._lock:
+            self._counts.pop(key, None)
+
+
+class MongoWindowStore:
+    """
+    Contadores compartidos por todos los workers en una colección de MongoDB
+
+    Un documento por clave y ventana ({_id: 'clave:ventana', n, expires_at}) que
+    un índice TTL borra solo; los dos contadores se leen en una consulta.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        collection.create_index('expires_at', expireAfterSeconds=0, name='rate_limits_ttl')
+
+    def counts(self, key: str, window: int) -> Tuple[int, int]:
+        current_id, previous_id = f'{key}:{window}', f'{key}:{window - 1}'
+        counts: Dict[str, int] = {doc['_id']: doc.get('n', 0)
+                                  for doc in self.collection.find({'_id': {'$in': [current_id, previous_id]}})}
+        return counts.get(current_id, 0), counts.get(previous_id, 0)
+
+    def add(self, key: str, window: int, expires_at: float):
+        self.collection.update_one(
+            {'_id': f'{key}:{window}'},
+            # Los índices TTL de MongoDB necesitan fechas, no números
+            {'$inc': {'n': 1}, '$setOnInsert': {
+                'expires_at': datetime.datetime.fromtimestamp(expires_at, datetime.timezone.utc)
+            }},
+            upsert=True
+        )
+
+    def reset(self, key: str, window: int):
+        self.collection.delete_many({'_id': {'$in': [f'{key}:{window}', f'{key}:{window - 1}']}})
+
+
+class SlidingWindowLimiter:
+    """
+    Límite de `limit` intentos por clave en cualquier ventana de `window` segundos
+
+    Aproxima la ventana deslizante con dos contadores fijos: los intentos de la
+    ventana actual más los de la anterior ponderados por la parte que aún se
+    solapa. Cada comprobación es O(1) y cada clave ocupa tres enteros. Solo
+    cuentan los intentos permitidos, así un cliente bloqueado vuelve a entrar
+    cuando la ventana se desliza aunque siga insistiendo.
+    """
+
+    def __init__(self, limit: int, window: float, store=None, clock=time.time):
+        """
+        Args:
+            limit: intentos permitidos por ventana (<= 0 desactiva el límite)
+            window: segundos de la ventana
+            store: MemoryWindowStore (por defecto) o MongoWindowStore
+            clock: reloj de pared (inyectable para tests)
+        """
+        self.limit = int(limit)
+        self.window = float(window)
+        self.store = store if store is not None else MemoryWindowStore()
+        self._clock = clock
+
+    def hit(self, key: str) -> float:
+        """
+        Registra un intento si cabe en el límite
+
+        Returns:
+            0 si se permite; si no, segundos hasta que vuelva a permitirse
+        """
+        if self.limit <= 0:
+            return 0.0
+        now = self._clock()
+        window = int(now // self.window)
+        elapsed = now - window * self.window
+        current, previous = self.store.counts(key, window)
+        overlap = 1.0 - elapsed / self.window
+        if current + previous * overlap < self.limit:
+            self.store.add(key, window, (window + 2) * self.window)
+            return 0.0
+        # Espera hasta que quepa un intento entero
+        if current < self.limit:
+            # Basta con que la parte de la ventana anterior que aún pesa baje lo suficiente
+            return (current + previous * overlap - self.limit + 1) / previous * self.window
+        # En la ventana siguiente la actual pasa a ser la anterior y se va descontando
+        return self.window - elapsed + (current - self.limit + 1) / current * self.window
+
+    def reset(self, key: str):
+        """Olvida los intentos de una clave (p. ej. tras un login correcto)"""
+        if self.limit <= 0:
+            return
+        self.store.reset(key, int(self._clock() // self.window))
+
+
+def parse_rate(value: str) -> Tuple[int, float]:
+    """
+    "intentos/segundos" -> (intentos, segundos); "0" desactiva el límite
+
+    Raises:
+        ValueError: si el formato no es válido
+    """
+    value = (value or '0').strip()
+    if value == '0':
+        return 0, 1.0
+    limit, _, window = value.partition('/')
+    limit, window = int(limit), float(window or 60)
+    if limit < 0 or window <= 0 or math.isinf(window):
+        raise ValueError(f'Límite de tasa inválido: {value!r} (formato "intentos/segundos")')
+    return limit, window
@@ -0,0 +1,33 @@
+"""
+Cálculo de puntos por respuesta
+"""
+
+# Puntos por acertar
+BASE_POINTS = 1000
+# Bonus máximo por rapidez y cuántos puntos se pierden por segundo
+MAX_TIME_BONUS = 500
+TIME_BONUS_PER_SECOND = 20
+# Multiplicador del poder de doble puntos
+DOUBLE_POINTS_MULTIPLIER = 2
+
+
+def calculate_answer_points(is_correct: bool, response_time: float, double_points: bool = False) -> int:
+    """
+    Puntos ganados por una respuesta
+
+    Args:
+        is_correct: si la respuesta es correcta
+        response_time: segundos desde que se envió la pregunta
+        double_points: si el jugador tiene doble puntos activo
+
+    Returns:
+        1000 + bonus por rapidez (hasta 500, -20 por segundo), duplicado con
+        doble puntos; 0 si la respuesta es incorrecta
+    """
+    if not is_correct:
+        return 0
+    time_bonus = max(0, MAX_TIME_BONUS - int(response_time * TIME_BONUS_PER_SECOND))
+    points = BASE_POINTS + time_bonus
+    if double_points:
+        points *= DOUBLE_POINTS_MULTIPLIER
+    return points
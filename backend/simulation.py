@@ -0,0 +1,349 @@
+"""
+Simulación determinista del juego con reloj virtual
+
+GameEngine recibe un reloj y un scheduler virtuales: los temporizadores de
+pregunta (45s), el tiempo extra, las pausas entre fases y las respuestas de
+los jugadores simulados ocurren en tiempo simulado, sin esperas reales. Con la
+misma semilla, dos corridas producen exactamente los mismos eventos.
+
+Uso:
+    python simulation.py --games 2000 --players 4 --seed 1
+"""
+import argparse
+import hashlib
+import heapq
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+from game_engine import WIN_SCORE, GameEngine, Message, QuestionListFeed
+
+# Fecha base del reloj virtual (created_at de lobbys y mensajes de chat)
+EPOCH = datetime(2024, 1, 1)
+
+
+class VirtualClock:
+    """Reloj en segundos que solo avanza cuando el scheduler lo indica"""
+
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+    def iso(self) -> str:
+        return (EPOCH + timedelta(seconds=self.now)).isoformat()
+
+
+class VirtualTimer:
+    """Paso programado en el scheduler virtual"""
+
+    __slots__ = ('when', 'callback', 'cancelled')
+
+    def __init__(self, when: float, callback: Callable[[], None]):
+        self.when = when
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class VirtualScheduler:
+    """
+    Cola de eventos ordenada por instante virtual
+
+    Mismo contrato que ThreadingScheduler (call_later -> handle.cancel()).
+    Los pasos con el mismo instante se ejecutan en orden de programación.
+    """
+
+    def __init__(self, clock: VirtualClock = None):
+        self.clock = clock or VirtualClock()
+        self._heap = []
+        self._seq = 0
+        self.executed = 0
+
+    def __len__(self):
+        return sum(1 for _, _, timer in self._heap if not timer.cancelled)
+
+    def call_later(self, delay: float, callback: Callable[[], None]) -> VirtualTimer:
+        timer = VirtualTimer(self.clock.now + max(0.0, delay), callback)
+        self._seq += 1
+        heapq.heappush(self._heap, (timer.when, self._seq, timer))
+        return timer
+
+    def run_next(self) -> bool:
+        """Avanza el reloj hasta el próximo paso y lo ejecuta; False si no hay"""
+        heap = self._heap
+        while heap:
+            when, _, timer = heapq.heappop(heap)
+            if timer.cancelled:
+                continue
+            if when > self.clock.now:
+                self.clock.now = when
+            timer.callback()
+            self.executed += 1
+            return True
+        return False
+
+    def run_until(self, deadline: float) -> int:
+        """Ejecuta los pasos hasta `deadline` (incluido) y deja el reloj ahí"""
+        ran = 0
+        heap = self._heap
+        while heap and heap[0][0] <= deadline:
+            if self.run_next():
+                ran += 1
+        self.clock.now = max(self.clock.now, deadline)
+        return ran
+
+    def run_for(self, seconds: float) -> int:
+        return self.run_until(self.clock.now + seconds)
+
+    def run(self, max_steps: int = None) -> int:
+        """Ejecuta hasta vaciar la cola (o `max_steps` pasos)"""
+        ran = 0
+        while (max_steps is None or ran < max_steps) and self.run_next():
+            ran += 1
+        return ran
+
+
+class SimulatedPlayer:
+    """
+    Perfil de un jugador simulado
+
+    Args:
+        accuracy: probabilidad de acertar
+        mean_response: tiempo medio de respuesta (segundos)
+        power_rate: probabilidad de intentar usar un poder en cada pregunta
+        miss_rate: probabilidad de no responder (envía time_up)
+    """
+
+    __slots__ = ('sid', 'accuracy', 'mean_response', 'power_rate', 'miss_rate')
+
+    def __init__(self, sid: str, accuracy: float = 0.6, mean_response: float = 8.0,
+                 power_rate: float = 0.15, miss_rate: float = 0.05):
+        self.sid = sid
+        self.accuracy = accuracy
+        self.mean_response = mean_response
+        self.power_rate = power_rate
+        self.miss_rate = miss_rate
+
+
+# Probabilidad de que el cliente reenvíe su respuesta y demora del reenvío
+RETRY_RATE = 0.05
+RETRY_DELAY = 0.02
+
+SIM_QUESTIONS = [
+    {
+        'question': f'Pregunta simulada {i}',
+        'options': ['A', 'B', 'C', 'D'],
+        'correct_answer': i % 4,
+        'difficulty': ('easy', 'medium', 'hard')[i % 3],
+        'category': 'Simulación',
+        'explanation': ''
+    }
+    for i in range(200)
+]
+
+
+class GameSimulation:
+    """
+    Varios lobbys jugando partidas seguidas contra un GameEngine virtual
+
+    Cada lobby juega `games_per_lobby` partidas (la siguiente con
+    request_new_round / ready_for_new_round). Todo el azar sale de `seed`.
+    """
+
+    def __init__(self, seed: int = 0, lobbies: int = 10, players: int = 4,
+                 games_per_lobby: int = 1, questions_per_game: int = 30):
+        self.rng = random.Random(seed)
+        self.clock = VirtualClock()
+        self.scheduler = VirtualScheduler(self.clock)
+        self.engine = GameEngine(
+            feed=QuestionListFeed(SIM_QUESTIONS, rng=random.Random(self.rng.random()),
+                                  per_game=questions_per_game),
+            clock=self.clock,
+            scheduler=self.scheduler,
+            rng=random.Random(self.rng.random()),
+            on_messages=self._handle_messages,
+            id_factory=lambda: f'{self.rng.getrandbits(32):08x}',
+            now_iso=self.clock.iso,
+            log=None
+        )
+        self.games_per_lobby = games_per_lobby
+        self.players: Dict[str, SimulatedPlayer] = {}
+        self.lobby_members: List[List[str]] = []
+        self.games_left: Dict[str, int] = {}
+        self.results: List[Dict] = []
+        self.games_ended: Dict[str, int] = {}
+        self.events = 0
+        # Respuestas dentro del tiempo del cliente rechazadas por pregunta cerrada
+        self.late_rejections = 0
+        self._digest = hashlib.sha256()
+
+        for lobby_index in range(lobbies):
+            sids = [f'l{lobby_index}p{i}' for i in range(players)]
+            for sid in sids:
+                self.players[sid] = SimulatedPlayer(
+                    sid,
+                    accuracy=self.rng.uniform(0.3, 0.9),
+                    mean_response=self.rng.uniform(3.0, 15.0)
+                )
+            self.lobby_members.append(sids)
+
+    def send(self, event: str, sid: str, data: Dict = None) -> List:
+        """Envía un evento al motor como lo haría el cliente (devuelve la respuesta)"""
+        self.events += 1
+        messages = self.engine.dispatch(event, sid, data)
+        self._handle_messages(messages)
+        return messages
+
+    def _handle_messages(self, messages: List):
+        for message in messages:
+            if not isinstance(message, Message):
+                continue
+            self._digest.update(f'{self.clock.now:.3f}|{message.event}|{message.to}'.encode())
+            if message.event == 'new_question':
+                self._on_question(message.to, message.data)
+            elif message.event == 'round_ended':
+                self._on_round_ended(message.to, message.data)
+
+    def _on_question(self, sid: str, question: Dict):
+        player = self.players.get(sid)
+        if player is None:
+            return
+        rng = self.rng
+        lobby_id = self.engine.user_lobbies.get(sid)
+        number = question['question_number']
+        game = self.games_ended.get(lobby_id, 0)
+        time_limit = question['time_limit']
+
+        if rng.random() < player.power_rate:
+            power = rng.choice(question['powers'])
+            if not power['is_used']:
+                # El tiempo extra es el que el servidor dice en el efecto (cualquier poder de tiempo)
+                for message in self.send('use_power', sid, {'power_type': power['power_type']}):
+                    if message.event == 'power_used' and message.to == sid:
+                        time_limit += message.data['effect'].get('added_time', 0)
+
+        correct = self.engine.active_questions[lobby_id]['current_question']['correct_answer']
+        if rng.random() < player.miss_rate:
+            delay, event, data = time_limit, 'time_up', None
+        else:
+            delay = rng.expovariate(1.0 / player.mean_response)
+            if delay >= time_limit:
+                delay, event, data = time_limit, 'time_up', None
+            else:
+                answer = correct if rng.random() < player.accuracy else (correct + 1) % 4
+                event, data = 'submit_answer', {'answer_index': answer, 'answer_id': f'{sid}-{number}'}
+
+        def respond(retry=False):
+            # El jugador todavía está dentro de su tiempo (con el tiempo extra del
+            # servidor): si la pregunta ya se cerró sin ganador, se cerró antes de tiempo
+            if self.games_ended.get(lobby_id, 0) != game:
+                return
+            current = self.engine.active_questions.get(lobby_id)
+            if current is None or current['question_number'] != number:
+                if not retry and not self._has_winner(lobby_id):
+                    self.late_rejections += 1
+                return
+            for message in self.send(event, sid, data):
+                if (message.event == 'error' and message.data.get('message') == 'La pregunta ya terminó'
+                        and not self._has_winner(lobby_id)):
+                    self.late_rejections += 1
+
+        self.scheduler.call_later(delay, respond)
+        if event == 'submit_answer' and rng.random() < RETRY_RATE:
+            # Reintento del cliente con la misma clave (se descarta en el servidor)
+            self.scheduler.call_later(delay + RETRY_DELAY, lambda: respond(retry=True))
+
+    def _has_winner(self, lobby_id: str) -> bool:
+        lobby = self.engine.lobbies.get(lobby_id)
+        win_score = lobby.get('win_score', WIN_SCORE) if lobby else WIN_SCORE
+        return bool(lobby) and any(p.get('score', 0) >= win_score for p in lobby['players'])
+
+    def _on_round_ended(self, lobby_id: str, data: Dict):
+        self.results.append({
+            'lobby_id': lobby_id,
+            'ended_at': self.clock.now,
+            'winner': data['winner'],
+            'results': data['results']
+        })
+        self.games_ended[lobby_id] = self.games_ended.get(lobby_id, 0) + 1
+        self.games_left[lobby_id] -= 1
+        if self.games_left[lobby_id] > 0:
+            self.scheduler.call_later(1.0, lambda: self._new_round(lobby_id))
+
+    def _new_round(self, lobby_id: str):
+        lobby = self.engine.lobbies.get(lobby_id)
+        if lobby is None:
+            return
+        self.send('request_new_round', lobby['host'])
+        for player in list(lobby['players']):
+            self.send('ready_for_new_round', player['socket_id'])
+
+    def run(self) -> Dict:
+        """Juega todas las partidas y devuelve un resumen"""
+        started = time.perf_counter()
+        for sids in self.lobby_members:
+            host = sids[0]
+            self.send('create_lobby', host, {'player_name': host, 'max_players': len(sids)})
+            lobby_id = self.engine.user_lobbies[host]
+            self.games_left[lobby_id] = self.games_per_lobby
+            for sid in sids[1:]:
+                self.send('join_lobby', sid, {'lobby_id': lobby_id, 'player_name': sid})
+                self.send('toggle_ready', sid)
+            self.send('start_game', host)
+        self.scheduler.run()
+        elapsed = time.perf_counter() - started
+
+        self.check_invariants()
+        return {
+            'games': len(self.results),
+            'events': self.events,
+            'scheduled_steps': self.scheduler.executed,
+            'virtual_seconds': round(self.clock.now, 3),
+            'wall_seconds': round(elapsed, 3),
+            'digest': self._digest.hexdigest()[:16]
+        }
+
+    def check_invariants(self):
+        """Comprobaciones del estado final (lanza AssertionError si algo falla)"""
+        expected = sum(1 for _ in self.lobby_members) * self.games_per_lobby
+        assert len(self.results) == expected, f'{len(self.results)} partidas de {expected}'
+        assert not self.engine.active_questions, 'quedaron preguntas activas'
+        assert len(self.scheduler) == 0, 'quedaron pasos programados'
+        assert self.late_rejections == 0, f'{self.late_rejections} respuestas a tiempo rechazadas'
+        for result in self.results:
+            scores = [r['score'] for r in result['results']]
+            assert all(score >= 0 for score in scores), 'puntuación negativa'
+            assert scores == sorted(scores, reverse=True), 'resultados mal ordenados'
+        for lobby in self.engine.lobbies.values():
+            assert lobby['status'] == 'round_finished'
+            assert sum(1 for p in lobby['players'] if p['is_host']) == 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Simulación determinista de partidas')
+    parser.add_argument('--games', type=int, default=1000, help='Partidas en total')
+    parser.add_argument('--lobbies', type=int, default=100, help='Lobbys jugando en paralelo')
+    parser.add_argument('--players', type=int, default=4)
+    parser.add_argument('--questions', type=int, default=30, help='Máximo de preguntas por partida')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    lobbies = min(args.lobbies, args.games)
+    games_per_lobby = max(1, args.games // lobbies)
+    simulation = GameSimulation(seed=args.seed, lobbies=lobbies, players=args.players,
+                                games_per_lobby=games_per_lobby,
+                                questions_per_game=args.questions)
+    summary = simulation.run()
+    print(f"✓ {summary['games']} partidas, {summary['events']} eventos, "
+          f"{summary['virtual_seconds']:.0f}s simulados en {summary['wall_seconds']:.2f}s reales "
+          f"(digest {summary['digest']})")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,92 @@
+"""
+Tests de la calibración de dificultad (contadores en disco, recálculo y umbral)
+
+Se ejecutan con pytest o directamente:
+    python test_calibration.py
+"""
+import os
+import tempfile
+
+import calibration
+from calibration import LOG_RECORD, QuestionCalibration, question_key
+
+
+def make_calibration(directory=None, min_samples=3):
+    return QuestionCalibration(directory=directory or tempfile.mkdtemp(), flush_seconds=3600,
+                               min_samples=min_samples)
+
+
+def columns(cal):
+    return {
+        key: (cal.attempts[row], cal.correct[row], round(cal.time_sum[row], 3))
+        for row, key in enumerate(cal.keys)
+    }
+
+
+def test_counters_survive_a_flush_and_load():
+    cal = make_calibration()
+    cal.record('¿Capital de Francia?', True, 2.5)
+    cal.record('¿Capital de Francia?', False, 40)
+    cal.record_answers('¿Año de la Revolución de Mayo?', {
+        'a': {'is_correct': True, 'response_time': 4.0},
+        'b': {'answer_index': -1, 'is_correct': False, 'response_time': 30},
+    })
+    cal.flush()
+
+    loaded = make_calibration(cal.directory)
+    assert columns(loaded) == columns(cal) == {
+        question_key('¿Capital de Francia?'): (2, 1, 32.5),
+        question_key('¿Año de la Revolución de Mayo?'): (2, 1, 34.0),
+    }
+    assert os.path.getsize(cal.log_path) == 4 * LOG_RECORD.size
+    assert not os.path.exists(cal.counters_path + '.tmp')
+
+
+def test_recompute_is_the_same_with_and_without_numpy():
+    cal = make_calibration()
+    # Tiempos exactos en ms, que es la resolución del log
+    for i in range(50):
+        cal.record(f'Pregunta {i % 7}', i % 3 == 0, i * 0.25)
+    cal.flush()
+    expected = columns(cal)
+    # Un registro a medio escribir al final del log (caída durante el flush)
+    with open(cal.log_path, 'ab') as f:
+        f.write(LOG_RECORD.pack(question_key('Pregunta 0'), 1000, 1)[:5])
+
+    results = []
+    original = calibration.np
+    try:
+        for np in (original, None):
+            calibration.np = np
+            recomputed = make_calibration(cal.directory)
+            assert recomputed.recompute() == 50
+            results.append(columns(recomputed))
+            assert columns(make_calibration(cal.directory)) == results[-1]
+    finally:
+        calibration.np = original
+    assert results[0] == results[1] == expected
+
+
+def test_difficulty_needs_min_samples():
+    cal = make_calibration(min_samples=5)
+    for _ in range(4):
+        cal.record('Fácil de verdad', True, 1.0)
+        cal.record('Imposible', False, 30.0)
+    assert cal.difficulty_for('Fácil de verdad', 'hard') == 'hard'
+    assert cal.difficulty_for('Imposible', 'easy') == 'easy'
+    assert cal.difficulty_for('Nunca vista', 'medium') == 'medium'
+    assert cal.summary()['uncalibrated'] == 2
+
+    for _ in range(20):
+        cal.record('Fácil de verdad', True, 1.0)
+        cal.record('Imposible', False, 30.0)
+    assert cal.difficulty_for('Fácil de verdad', 'hard') == 'easy'
+    assert cal.difficulty_for('Imposible', 'easy') == 'hard'
+
+
+if __name__ == '__main__':
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith('test_') and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print(f'✓ {name}')
+    print(f'{len(tests)} tests OK')
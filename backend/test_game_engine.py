@@ -0,0 +1,393 @@
+"""
+Tests del motor de juego (sin Socket.IO)
+
+Se ejecutan con pytest o directamente:
+    python test_game_engine.py
+"""
+import random
+
+import game_engine
+import matchmaking
+import powers
+from game_engine import GameEngine, Message, QuestionListFeed, RoomChange
+from latency import LatencyTracker
+from matchmaking import Matchmaker
+from simulation import GameSimulation, VirtualScheduler
+
+QUESTION = {
+    'question': '¿Capital de Francia?',
+    'options': ['Roma', 'París', 'Madrid', 'Berlín'],
+    'correct_answer': 1,
+    'difficulty': 'easy',
+    'category': 'Geografía',
+    'explanation': ''
+}
+
+
+class FakeScheduler:
+    """Guarda los pasos programados para ejecutarlos a mano"""
+
+    class Handle:
+        def __init__(self, delay, callback):
+            self.delay = delay
+            self.callback = callback
+            self.cancelled = False
+
+        def cancel(self):
+            self.cancelled = True
+
+    def __init__(self):
+        self.handles = []
+
+    def call_later(self, delay, callback):
+        handle = self.Handle(delay, callback)
+        self.handles.append(handle)
+        return handle
+
+    def fire_next(self):
+        """Ejecuta el primer paso pendiente no cancelado y devuelve su demora"""
+        while self.handles:
+            handle = self.handles.pop(0)
+            if not handle.cancelled:
+                handle.callback()
+                return handle.delay
+        return None
+
+
+def make_engine(per_game=None, now=None):
+    clock = now if now is not None else [0.0]
+    scheduler = FakeScheduler()
+    engine = GameEngine(
+        feed=QuestionListFeed([dict(QUESTION)], rng=random.Random(0), per_game=per_game),
+        clock=lambda: clock[0],
+        scheduler=scheduler,
+        rng=random.Random(0),
+        record_win=lambda winner: None,
+        answer_tick=0,
+        log=None
+    )
+    return engine, scheduler, clock
+
+
+def events(messages, to=None):
+    return [m.event for m in messages if isinstance(m, Message) and (to is None or m.to == to)]
+
+
+def start_two_player_game(engine, scheduler):
+    engine.create_lobby('a', {'player_name': 'Ana'})
+    lobby_id = engine.user_lobbies['a']
+    engine.join_lobby('b', {'lobby_id': lobby_id, 'player_name': 'Beto'})
+    engine.toggle_ready('b')
+    out = engine.start_game('a')
+    assert events(out) == ['game_started', 'lobby_updated']
+    assert scheduler.fire_next() == game_engine.START_DELAY
+    return lobby_id
+
+
+def test_create_and_join_lobby():
+    engine, _, _ = make_engine()
+    out = engine.create_lobby('a', {'player_name': 'Ana'})
+    lobby_id = engine.user_lobbies['a']
+    assert out[0] == RoomChange('a', lobby_id, True)
+    out = engine.join_lobby('b', {'lobby_id': lobby_id, 'player_name': 'Beto'})
+    assert out[-1].skip_sid == 'b'
+    assert len(engine.lobbies[lobby_id]['players']) == 2
+    assert events(engine.join_lobby('c', {'lobby_id': 'nope'})) == ['error']
+
+
+def test_start_game_requires_host_and_ready():
+    engine, _, _ = make_engine()
+    engine.create_lobby('a', {})
+    lobby_id = engine.user_lobbies['a']
+    engine.join_lobby('b', {'lobby_id': lobby_id})
+    assert engine.start_game('b')[0].data['message'] == 'Solo el host puede iniciar el juego'
+    assert engine.start_game('a')[0].data['message'] == 'No todos los jugadores están listos'
+
+
+def test_question_flow_and_scoring():
+    engine, scheduler, clock = make_engine()
+    lobby_id = start_two_player_game(engine, scheduler)
+    assert [m.event for m in engine.outbox] == ['new_question', 'new_question', 'lobby_updated']
+
+    clock[0] = 10.0
+    out = engine.submit_answer('a', {'answer_index': 1})
+    result = out[0].data
+    assert result['is_correct'] and result['points'] == 1300
+    assert events(engine.submit_answer('a', {'answer_index': 1})) == ['error']
+
+    engine.submit_answer('b', {'answer_index': 0})
+    # Todos respondieron: la siguiente pregunta llega tras la pausa
+    assert scheduler.fire_next() == game_engine.ANSWER_REVEAL_DELAY
+    assert engine.active_questions[lobby_id]['question_number'] == 2
+
+
+def test_timeout_fills_missing_answers_and_advances():
+    engine, scheduler, _ = make_engine()
+    lobby_id = start_two_player_game(engine, scheduler)
+    engine.submit_answer('a', {'answer_index': 1})
+    assert scheduler.fire_next() == 45.0
+    answers = engine.player_answers[lobby_id]['answers']
+    assert answers['b']['answer_index'] == -1
+    assert events(engine.submit_answer('b', {'answer_index': 1})) == ['error']
+    assert scheduler.fire_next() == game_engine.TIMEOUT_REVEAL_DELAY
+    assert engine.active_questions[lobby_id]['question_number'] == 2
+
+
+def test_question_timeout_covers_the_longest_configured_time_boost():
+    mega_time = {'id': 'mega_time', 'handler': 'time_boost', 'cost': 800, 'duration': 20}
+    try:
+        powers.registry.load_records([mega_time])
+        engine, scheduler, _ = make_engine()
+        start_two_player_game(engine, scheduler)
+        assert scheduler.fire_next() == game_engine.QUESTION_TIME_LIMIT + 20 + game_engine.QUESTION_TIMEOUT_MARGIN
+        try:
+            powers.registry.load_records([dict(mega_time, duration=powers.MAX_TIME_BOOST_SECONDS + 1)])
+            assert False, 'tiempo extra sin límite aceptado'
+        except ValueError:
+            pass
+
+        # La simulación usa el tiempo extra del efecto: con el límite antiguo
+        # (45 s) hay respuestas dentro del tiempo del cliente rechazadas
+        powers.registry.load_records([mega_time])
+        assert GameSimulation(seed=1, lobbies=50, games_per_lobby=2).run()['games'] == 100
+        original = game_engine.question_timeout
+        game_engine.question_timeout = lambda: 45.0
+        simulation = GameSimulation(seed=1, lobbies=50, games_per_lobby=2)
+        try:
+            simulation.run()
+        except AssertionError:
+            pass
+        finally:
+            game_engine.question_timeout = original
+        assert simulation.late_rejections > 0
+    finally:
+        powers.registry.load_records([])
+
+
+def test_double_points_and_win():
+    engine, scheduler, _ = make_engine()
+    lobby_id = start_two_player_game(engine, scheduler)
+    engine.lobbies[lobby_id]['players'][0]['score'] = 9000
+    out = engine.use_power('a', {'power_type': 'double_points'})
+    assert events(out) == ['power_used', 'player_used_power', 'lobby_updated']
+    assert out[1].skip_sid == 'a'
+    out = engine.submit_answer('a', {'answer_index': 1})
+    assert out[0].data['points'] == 3000
+    assert out[0].data['total_score'] == 11100
+    assert scheduler.fire_next() == game_engine.WIN_DELAY
+    ended = [m for m in engine.outbox if m.event == 'round_ended']
+    assert ended[0].data['winner']['name'] == 'Ana'
+    assert engine.lobbies[lobby_id]['status'] == 'round_finished'
+
+
+def test_fifty_fifty_does_not_modify_the_feed_questions():
+    engine = GameEngine(clock=lambda: 0.0, scheduler=FakeScheduler(), rng=random.Random(0),
+                        record_win=lambda winner: None, answer_tick=0, log=None)
+    scheduler = engine.scheduler
+    lobby_id = start_two_player_game(engine, scheduler)
+    engine.lobbies[lobby_id]['players'][0]['score'] = 5000
+    out = engine.use_power('a', {'power_type': 'fifty_fifty'})
+    eliminated = out[0].data['effect']['eliminated_options']
+    correct = game_engine.FALLBACK_QUESTION['correct_answer']
+    assert len(eliminated) == len(game_engine.FALLBACK_QUESTION['options']) - 2 and correct not in eliminated
+    # La pregunta por defecto (y la de cualquier fuente) queda intacta
+    assert 'fifty_fifty_eliminated' not in game_engine.FALLBACK_QUESTION
+    assert 'fifty_fifty_eliminated' in engine.active_questions[lobby_id]['current_question']
+
+
+def test_feed_exhausted_ends_game():
+    engine, scheduler, _ = make_engine(per_game=1)
+    games = []
+    engine.record_game = games.append
+    lobby_id = start_two_player_game(engine, scheduler)
+    engine.submit_answer('a', {'answer_index': 1})
+    engine.submit_answer('b', {'answer_index': 1})
+    scheduler.fire_next()
+    assert engine.lobbies[lobby_id]['status'] == 'round_finished'
+    assert lobby_id not in engine.active_questions
+    assert games[0]['questions'] == 1
+    assert [p['rank'] for p in games[0]['players']] == [1, 2]
+    rounds = games[0]['rounds']
+    assert len(rounds) == 1 and rounds[0]['correct_answer'] == 1
+    assert set(rounds[0]['answers']) == {'a', 'b'}
+    assert not engine.game_rounds
+
+
+def test_host_leaves_and_last_player_wins():
+    engine, scheduler, _ = make_engine()
+    lobby_id = start_two_player_game(engine, scheduler)
+    engine.join_lobby('c', {'lobby_id': lobby_id, 'player_name': 'Caro'})
+    out = engine.leave_lobby('a')
+    assert RoomChange('a', lobby_id, False) in out
+    assert engine.lobbies[lobby_id]['host'] == 'b'
+    out = engine.disconnect('c')
+    assert 'round_ended' in events(out)
+    assert scheduler.fire_next() is None
+
+
+def test_last_disconnect_deletes_lobby():
+    engine, scheduler, _ = make_engine()
+    lobby_id = start_two_player_game(engine, scheduler)
+    engine.disconnect('a')
+    engine.disconnect('b')
+    assert lobby_id not in engine.lobbies
+    assert not engine.user_lobbies
+    assert scheduler.fire_next() is None
+
+
+def test_answers_are_batched_per_tick():
+    scheduler = VirtualScheduler()
+    engine = GameEngine(
+        feed=QuestionListFeed([dict(QUESTION)], rng=random.Random(0)),
+        clock=scheduler.clock,
+        scheduler=scheduler,
+        rng=random.Random(0),
+        answer_tick=0.05,
+        log=None
+    )
+    engine.create_lobby('a', {})
+    lobby_id = engine.user_lobbies['a']
+    for sid in 'bc':
+        engine.join_lobby(sid, {'lobby_id': lobby_id})
+        engine.toggle_ready(sid)
+    engine.start_game('a')
+    scheduler.run_for(game_engine.START_DELAY)
+    engine.outbox.clear()
+
+    assert engine.submit_answer('a', {'answer_index': 1, 'answer_id': 'x1'}) == []
+    # Reintento del cliente con la misma clave: se descarta sin respuesta
+    assert engine.submit_answer('a', {'answer_index': 1, 'answer_id': 'x1'}) == []
+    assert events(engine.submit_answer('a', {'answer_index': 2, 'answer_id': 'x2'})) == ['error']
+    # La misma clave desde otro jugador no es un reintento: cuenta su respuesta
+    assert engine.submit_answer('b', {'answer_index': 0, 'answer_id': 'x1'}) == []
+    assert engine.outbox == []
+
+    scheduler.run_for(0.05)
+    assert events(engine.outbox) == ['answer_result', 'answer_result', 'player_answered', 'lobby_updated']
+    assert engine.outbox[2].data['total_answered'] == 2
+
+    engine.outbox.clear()
+    engine.submit_answer('c', {'answer_index': 1})
+    scheduler.run_for(0.05)
+    assert engine.player_answers[lobby_id]['closed']
+    scheduler.run_for(game_engine.ANSWER_REVEAL_DELAY)
+    assert engine.active_questions[lobby_id]['question_number'] == 2
+
+
+def test_identity_comes_from_the_connect_session():
+    engine, _, _ = make_engine()
+    tokens = {'jwt-ana': {'public_id': 'pa', 'name': 'Ana'}}
+    engine.authenticate = lambda auth: tokens.get(auth.get('token'))
+    out = engine.connect('a', {'token': 'jwt-ana'})
+    assert out[0].data['authenticated'] is True
+    assert engine.connect('x', {'token': 'falso'})[0].data['authenticated'] is False
+
+    # El cliente no puede cambiar su identidad ni hacerse pasar por otro
+    engine.create_lobby('a', {'player_name': 'Otra', 'public_id': 'pb'})
+    lobby_id = engine.user_lobbies['a']
+    assert engine.lobbies[lobby_id]['players'][0]['public_id'] == 'pa'
+    assert engine.lobbies[lobby_id]['players'][0]['name'] == 'Ana'
+    engine.join_lobby('x', {'lobby_id': lobby_id, 'player_name': 'Invitado', 'public_id': 'pa'})
+    guest = engine.lobbies[lobby_id]['players'][1]
+    assert guest['public_id'] is None and guest['name'] == 'Invitado'
+
+    # Otra conexión del mismo usuario sigue contando como él
+    engine.connect('a2', {'token': 'jwt-ana'})
+    assert events(engine.create_lobby('a2', {})) == ['error']
+    engine.disconnect('a')
+    assert 'a' not in engine.sessions and 'pa' not in engine.public_ids
+
+
+def test_quick_play_fills_lobby_and_starts():
+    engine, scheduler, _ = make_engine()
+    engine.matchmaker = Matchmaker(max_players=3, tiers=[5])
+    engine.skill_lookup = {'pro': 10}.get
+    engine.authenticate = lambda auth: {'public_id': 'pro', 'name': 'Pro'}
+    engine.quick_play('a', {'player_name': 'Ana'})
+    lobby_id = engine.user_lobbies['a']
+    # Sin lobbys de su nivel, se une al del nivel vecino
+    engine.connect('p', {'token': 'jwt'})
+    engine.quick_play('p', {})
+    assert engine.user_lobbies['p'] == lobby_id
+    assert events(engine.quick_play('a', {})) == ['error']
+
+    out = engine.quick_play('b', {'player_name': 'Beto'})
+    assert 'game_started' in events(out)
+    assert engine.lobbies[lobby_id]['status'] == 'playing'
+    assert lobby_id not in engine.matchmaker
+    # El lobby lleno ya no recibe jugadores de partida rápida
+    engine.quick_play('c', {})
+    assert engine.user_lobbies['c'] != lobby_id
+    assert scheduler.fire_next() == game_engine.START_DELAY
+
+
+def test_quick_play_starts_after_wait():
+    engine, scheduler, _ = make_engine()
+    engine.quick_play('a', {})
+    lobby_id = engine.user_lobbies['a']
+    # Solo un jugador: sigue esperando
+    assert scheduler.fire_next() == matchmaking.QUICK_PLAY_WAIT_SECONDS
+    assert engine.lobbies[lobby_id]['status'] == 'waiting'
+    engine.quick_play('b', {})
+    engine.leave_lobby('b')
+    assert engine.matchmaker.find(0) == lobby_id
+    engine.quick_play('c', {})
+    assert scheduler.fire_next() == matchmaking.QUICK_PLAY_WAIT_SECONDS
+    assert engine.lobbies[lobby_id]['status'] == 'playing'
+    assert len(engine.matchmaker) == 0
+
+
+def test_latency_compensation():
+    clock = [0.0]
+    tracker = LatencyTracker(clock=lambda: clock[0], max_compensation=1.0)
+    engine, scheduler, _ = make_engine(now=clock)
+    engine.latency = tracker
+    out = engine.connect('a')
+    ping = out[-1]
+    assert ping.event == 'latency_ping'
+    clock[0] = 0.4
+    engine.latency_pong('a', ping.data)
+    assert tracker.rtt('a') == 0.4
+    # Un pong repetido o con id desconocido se ignora
+    assert tracker.pong('a', ping.data) is None
+
+    lobby_id = start_two_player_game(engine, scheduler)
+    start = engine.player_answers[lobby_id]['start_time']
+    clock[0] = start + 10.4
+    result = engine.submit_answer('a', {'answer_index': 1})[0].data
+    assert result['points'] == 1300
+    assert abs(engine.player_answers[lobby_id]['answers']['a']['response_time'] - 10.0) < 1e-9
+    engine.disconnect('a')
+    assert tracker.rtt('a') is None
+
+
+def test_simulation_is_reproducible():
+    summaries = [
+        GameSimulation(seed=7, lobbies=5, players=3, games_per_lobby=3).run()
+        for _ in range(2)
+    ]
+    assert summaries[0]['games'] == 15
+    assert summaries[0]['digest'] == summaries[1]['digest']
+    assert summaries[0]['virtual_seconds'] == summaries[1]['virtual_seconds']
+    other = GameSimulation(seed=8, lobbies=5, players=3, games_per_lobby=3).run()
+    assert other['digest'] != summaries[0]['digest']
+
+
+def test_virtual_scheduler_order_and_cancel():
+    scheduler = VirtualScheduler()
+    fired = []
+    scheduler.call_later(5, lambda: fired.append(('b', scheduler.clock.now)))
+    scheduler.call_later(1, lambda: fired.append(('a', scheduler.clock.now)))
+    scheduler.call_later(3, lambda: fired.append(('x', scheduler.clock.now))).cancel()
+    assert scheduler.run_until(2) == 1
+    assert scheduler.clock.now == 2
+    scheduler.run()
+    assert fired == [('a', 1), ('b', 5)]
+
+
+if __name__ == '__main__':
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith('test_') and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print(f'✓ {name}')
+    print(f'{len(tests)} tests OK')
@@ -0,0 +1,72 @@
+"""
+Tests del arranque de índices y la comprobación de planes (con MongoDB falso)
+
+Se ejecutan con pytest o directamente:
+    python test_indexes.py
+"""
+from indexes import INDEXES, MissingIndexError, bootstrap_indexes, check_query_plans, unindexed_queries
+
+
+class FakeCursor:
+    def __init__(self, collection, query):
+        self.collection = collection
+        self.query = query
+        self.sorted = None
+
+    def sort(self, keys):
+        self.sorted = keys
+        return self
+
+    def limit(self, n):
+        return self
+
+    def explain(self):
+        # Usa un índice si alguno empieza por el campo filtrado (o el de orden)
+        field = next(iter(self.query), None) or (self.sorted[0][0] if self.sorted else None)
+        if any(keys[0][0] == field for keys in self.collection.indexes):
+            plan = {'stage': 'LIMIT', 'inputStage': {'stage': 'FETCH', 'inputStage': {'stage': 'IXSCAN'}}}
+        elif self.sorted:
+            plan = {'stage': 'SORT', 'inputStage': {'stage': 'COLLSCAN'}}
+        else:
+            plan = {'stage': 'COLLSCAN'}
+        return {'queryPlanner': {'winningPlan': plan}}
+
+
+class FakeCollection:
+    def __init__(self):
+        self.indexes = []
+
+    def create_index(self, keys, **options):
+        self.indexes.append(keys)
+
+    def find(self, query):
+        return FakeCursor(self, query)
+
+
+class FakeDB(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+
+def test_missing_indexes_fail_loudly_until_bootstrapped():
+    db = FakeDB()
+    assert len(unindexed_queries(db)) == 5
+    try:
+        check_query_plans(db)
+        assert False, 'consultas sin índice aceptadas'
+    except MissingIndexError as e:
+        assert 'login por email (COLLSCAN)' in str(e)
+        assert 'ranking por games_won (COLLSCAN, SORT)' in str(e)
+
+    assert bootstrap_indexes(db) == sum(len(indexes) for indexes in INDEXES.values())
+    assert unindexed_queries(db) == []
+    check_query_plans(db)
+
+
+if __name__ == '__main__':
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith('test_') and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print(f'✓ {name}')
+    print(f'{len(tests)} tests OK')
@@ -0,0 +1,67 @@
+"""
+Tests del leaderboard en memoria (comparado con ordenar una lista)
+
+Se ejecutan con pytest o directamente:
+    python test_leaderboard.py
+"""
+import random
+
+from leaderboard import Leaderboard, OrderStatisticList
+
+
+def naive_order(wins):
+    return sorted(wins, key=lambda public_id: (-wins[public_id], public_id))
+
+
+def test_order_statistic_list_matches_sorted():
+    rng = random.Random(3)
+    items = OrderStatisticList(load=4)
+    expected = []
+    for _ in range(2000):
+        value = rng.randrange(300)
+        if expected and rng.random() < 0.4:
+            value = rng.choice(expected)
+            items.remove(value)
+            expected.remove(value)
+        elif value not in expected:
+            items.add(value)
+            expected.append(value)
+            expected.sort()
+        assert len(items) == len(expected)
+    assert items.slice(0, len(items)) == expected
+    for position, value in enumerate(expected):
+        assert items.index(value) == position
+    assert items.slice(5, 12) == expected[5:12]
+
+
+def test_rank_top_and_around():
+    rng = random.Random(11)
+    board = Leaderboard(load=8)
+    wins = {f'u{i:03d}': rng.randrange(20) for i in range(150)}
+    board.load({'public_id': p, 'name': p.upper(), 'games_won': w} for p, w in wins.items())
+    for _ in range(300):
+        public_id = rng.choice(list(wins))
+        wins[public_id] += 1
+        board.increment(public_id)
+    board.set('nuevo', 0, 'Nuevo')
+    wins['nuevo'] = 0
+
+    order = naive_order(wins)
+    assert [u['name'] for u in board.top(10)] == [p.upper() for p in order[:10]]
+    for position, public_id in enumerate(order):
+        assert board.rank(public_id)['rank'] == position + 1
+    assert board.rank('nadie') is None
+
+    me = order[40]
+    around = board.around(me, radius=3)
+    assert around['me']['rank'] == 41
+    assert [u['rank'] for u in around['usuarios']] == list(range(38, 45))
+    assert [u['rank'] for u in board.around(order[0], radius=2)['usuarios']] == [1, 2, 3]
+
+
+if __name__ == '__main__':
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith('test_') and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print(f'✓ {name}')
+    print(f'{len(tests)} tests OK')
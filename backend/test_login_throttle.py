@@ -0,0 +1,112 @@
+"""
+Tests del límite de intentos de login y registro (con reloj y base de datos falsos)
+
+Se ejecutan con pytest o directamente:
+    python test_login_throttle.py
+"""
+from flask import Flask
+from werkzeug.security import check_password_hash, generate_password_hash
+
+import auth
+from login_throttle import LoginThrottle, client_ip
+from memory_db import MemoryClient
+from rate_limit import MemoryWindowStore, MongoWindowStore, SlidingWindowLimiter, parse_rate
+
+
+class FakeUsers:
+    def __init__(self, users):
+        self.users = users
+        self.lookups = 0
+
+    def find_one(self, query, projection=None):
+        self.lookups += 1
+        return self.users.get(query['email'])
+
+
+class FakeDB:
+    def __init__(self, users):
+        self.users = FakeUsers(users)
+
+
+class FakePool:
+    def __init__(self):
+        self.jobs = 0
+
+    def check(self, hashed, password):
+        self.jobs += 1
+        return check_password_hash(hashed, password)
+
+    def hash(self, password):
+        self.jobs += 1
+        return generate_password_hash(password)
+
+
+def test_sliding_window_weights_the_previous_window():
+    now = [600.0]
+    for store in (MemoryWindowStore(), MongoWindowStore(MemoryClient()['test'].rate_limits)):
+        now[0] = 600.0
+        limiter = SlidingWindowLimiter(4, 60, store=store, clock=lambda: now[0])
+        assert [limiter.hit('a') for _ in range(4)] == [0, 0, 0, 0]
+        assert limiter.hit('a') == 75.0 and limiter.hit('b') == 0
+        # A mitad de la ventana siguiente las 4 anteriores pesan 2
+        now[0] = 690.0
+        assert limiter.hit('a') == 0 and limiter.hit('a') == 0
+        assert limiter.hit('a') == 15.0
+        now[0] = 705.0
+        assert limiter.hit('a') == 0
+        limiter.reset('a')
+        assert [limiter.hit('a') for _ in range(4)] == [0, 0, 0, 0]
+
+    store = MemoryWindowStore(max_keys=2)
+    limiter = SlidingWindowLimiter(1, 60, store=store, clock=lambda: 0.0)
+    for key in 'abc':
+        limiter.hit(key)
+    assert len(store) == 2 and limiter.hit('a') == 0
+    assert parse_rate('0') == (0, 1.0) and parse_rate('10/300') == (10, 300.0)
+    assert client_ip('10.0.0.1', '1.2.3.4, 5.6.7.8', trusted_proxies=0) == '10.0.0.1'
+    assert client_ip('10.0.0.1', '1.2.3.4, 5.6.7.8', trusted_proxies=1) == '5.6.7.8'
+
+
+def test_rejected_attempts_never_reach_the_database_or_the_hash_pool():
+    app = Flask(__name__)
+    app.add_url_rule('/login', 'login', auth.login, methods=['POST'])
+    app.add_url_rule('/register', 'register', auth.register, methods=['POST'])
+
+    originals = auth.db, auth.password_pool, auth.login_throttle
+    auth.db = FakeDB({
+        'ana@x': {'public_id': 'a', 'name': 'Ana', 'email': 'ana@x', 'password': generate_password_hash('bien')},
+        'beto@x': {'public_id': 'b', 'name': 'Beto', 'email': 'beto@x', 'password': generate_password_hash('bien')},
+    })
+    auth.password_pool = FakePool()
+    auth.login_throttle = LoginThrottle(ip_rate='5/60', email_rate='2/60', clock=lambda: 600.0)
+    app.config['SECRET_KEY'] = 'secreto-de-prueba-con-32-bytes-o-mas'
+    try:
+        client = app.test_client()
+        # El email cuenta igual con mayúsculas o espacios
+        assert client.post('/login', json={'email': ' Ana@x', 'password': 'mal'}).status_code == 401
+        assert client.post('/login', json={'email': 'ana@x', 'password': 'mal'}).status_code == 401
+        response = client.post('/login', json={'email': 'ana@x', 'password': 'bien'})
+        assert response.status_code == 429 and response.headers['Retry-After'] == '90'
+        assert auth.db.users.lookups == 2 and auth.password_pool.jobs == 1
+
+        # Otro email desde la misma IP: pasa hasta agotar el límite de la IP
+        assert client.post('/login', json={'email': 'beto@x', 'password': 'x'}).status_code == 401
+        assert client.post('/register', json={'email': 'beto@x', 'password': 'x', 'name': 'Beto'}).status_code == 400
+        assert client.post('/register', json={'email': 'caro@x', 'password': 'x', 'name': 'Caro'}).status_code == 429
+        assert auth.db.users.lookups == 4 and auth.password_pool.jobs == 2
+
+        # Un login correcto devuelve sus intentos al email
+        auth.login_throttle = LoginThrottle(ip_rate='0', email_rate='2/60', clock=lambda: 600.0)
+        assert client.post('/login', json={'email': 'ana@x', 'password': 'mal'}).status_code == 401
+        assert client.post('/login', json={'email': 'ana@x', 'password': 'bien'}).status_code == 200
+        assert client.post('/login', json={'email': 'ana@x', 'password': 'mal'}).status_code == 401
+    finally:
+        auth.db, auth.password_pool, auth.login_throttle = originals
+
+
+if __name__ == '__main__':
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith('test_') and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print(f'✓ {name}')
+    print(f'{len(tests)} tests OK')
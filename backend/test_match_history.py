@@ -0,0 +1,155 @@
+"""
+Tests del historial de partidas (con una cola y una base de datos falsas)
+
+Se ejecutan con pytest o directamente:
+    python test_match_history.py
+"""
+import bson
+
+from match_history import MatchHistory, pack_answers, unpack_answers
+
+
+class FakeQueue:
+    def __init__(self):
+        self.inserts = []
+        self.increments = []
+
+    def insert(self, collection, document):
+        self.inserts.append((collection, document))
+
+    def increment(self, collection, key_field, key, fields, upsert=False):
+        self.increments.append((collection, key, fields, upsert))
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, field, direction):
+        self.docs.sort(key=lambda d: d[field], reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        return iter(self.docs[:n])
+
+
+class FakeMatches:
+    def __init__(self, docs):
+        self.docs = docs
+        self.indexes = []
+
+    def create_index(self, keys, name=None):
+        self.indexes.append(name)
+
+    def find(self, query):
+        before = query.get('_id', {}).get('$lt')
+        return FakeCursor([
+            d for d in self.docs
+            if query['i'] in d['i'] and (before is None or d['_id'] < before)
+        ])
+
+    def find_one(self, query):
+        return next((d for d in self.docs if d['_id'] == query['_id']), None)
+
+
+class FakeStats:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find_one(self, query):
+        return self.docs.get(query['_id'])
+
+
+class FakeDB:
+    def __init__(self, matches=(), stats=None):
+        self.matches = FakeMatches(list(matches))
+        self.player_stats = FakeStats(stats or {})
+
+
+def summary(questions=30):
+    rounds = [
+        {
+            'question': f'Pregunta {n}',
+            'correct_answer': 2,
+            'answers': {
+                'a': {'answer_index': 2, 'is_correct': True, 'points': 1500, 'response_time': 3.25},
+                'b': {'answer_index': 0, 'is_correct': False, 'points': 0, 'response_time': 7.5},
+                'c': {'answer_index': -1, 'is_correct': False, 'points': 0, 'response_time': 30},
+            }
+        }
+        for n in range(questions)
+    ]
+    players = [
+        {'socket_id': 'a', 'public_id': 'pa', 'name': 'Ana', 'score': 1500 * questions, 'rank': 1},
+        {'socket_id': 'b', 'public_id': 'pb', 'name': 'Beto', 'score': 0, 'rank': 2},
+        {'socket_id': 'c', 'public_id': None, 'name': 'Invitado', 'score': 0, 'rank': 3},
+        {'socket_id': 'd', 'public_id': 'pd', 'name': 'Dani', 'score': 0, 'rank': 4},
+    ]
+    return {'lobby_id': 'L1', 'quick_play': True, 'questions': questions, 'rounds': rounds, 'players': players}
+
+
+def test_answers_round_trip_compactly():
+    game = summary()
+    blob = pack_answers(game['rounds'], ['a', 'b', 'c', 'd'])
+    rounds = unpack_answers(blob, 4)
+    assert len(rounds) == 30
+    first = rounds[0]['answers']
+    assert first[0] == {'answer_index': 2, 'is_correct': True, 'response_ms': 3250, 'points': 1500}
+    assert first[1]['is_correct'] is False and first[1]['response_ms'] == 7500
+    # Sin respuesta registrada (se unió tarde) o sin contestar
+    assert first[2]['answer_index'] == first[3]['answer_index'] == -1
+
+    history = MatchHistory(queue=FakeQueue())
+    doc = history.build_document(game)
+    assert len(bson.encode(doc)) < 1024
+
+
+def test_record_enqueues_match_and_stats():
+    queue = FakeQueue()
+    history = MatchHistory(queue=queue)
+    history.record(summary(questions=2))
+    (collection, doc), = queue.inserts
+    assert collection == 'matches' and doc['i'] == ['pa', 'pb', None, 'pd'] and doc['qp'] is True
+    stats = {key: (fields, upsert) for collection, key, fields, upsert in queue.increments}
+    assert set(stats) == {'pa', 'pb', 'pd'}
+    assert stats['pa'] == ({'g': 1, 'w': 1, 'pts': 3000, 'a': 2, 'c': 2, 'ms': 6500}, True)
+    assert stats['pd'][0] == {'g': 1, 'w': 0, 'pts': 0, 'a': 0, 'c': 0, 'ms': 0}
+
+
+def test_recent_pages_by_cursor_and_stats():
+    queue = FakeQueue()
+    builder = MatchHistory(queue=queue)
+    for _ in range(3):
+        builder.record(summary(questions=2))
+    docs = [doc for _, doc in queue.inserts]
+    history = MatchHistory(FakeDB(docs, {'pa': {'g': 3, 'w': 3, 'pts': 9000, 'a': 6, 'c': 6, 'ms': 19500}}))
+
+    page = history.recent('pa', limit=2)
+    assert [m['id'] for m in page['partidas']] == [str(docs[2]['_id']), str(docs[1]['_id'])]
+    assert page['partidas'][0]['me'] == {'name': 'Ana', 'score': 3000, 'rank': 1,
+                                         'answered': 2, 'correct': 2, 'response_ms': 6500}
+    rest = history.recent('pa', limit=2, before=page['next_cursor'])
+    assert [m['id'] for m in rest['partidas']] == [str(docs[0]['_id'])] and rest['next_cursor'] is None
+    assert history.db.matches.indexes == ['matches_player_recent']
+
+    full = history.match(str(docs[0]['_id']))
+    assert len(full['rounds']) == 2 and full['rounds'][0]['answers'][1]['answer_index'] == 0
+
+    stats = history.stats('pa')
+    assert stats['games_played'] == 3 and stats['win_rate'] == 1.0
+    assert stats['accuracy'] == 1.0 and stats['average_response_ms'] == 3250
+    assert history.stats('nadie')['games_played'] == 0
+
+    try:
+        history.recent('pa', before='no-es-un-id')
+        assert False, 'cursor inválido aceptado'
+    except ValueError:
+        pass
+
+
+if __name__ == '__main__':
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith('test_') and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print(f'✓ {name}')
+    print(f'{len(tests)} tests OK')
@@ -0,0 +1,92 @@
+"""
+Tests de la base de datos en memoria (DB_BACKEND=memory)
+
+Se ejecutan con pytest o directamente:
+    python test_memory_db.py
+"""
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from indexes import MissingIndexError, bootstrap_indexes, check_query_plans
+from match_history import MatchHistory
+from memory_db import MemoryClient
+from ranking import RANKING_PROJECTION, RANKING_SORT
+from write_behind import WriteBehindQueue
+
+
+def test_queries_indexes_and_plans():
+    db = MemoryClient()['test']
+    db.users.insert_many([
+        {'public_id': f'p{i}', 'name': f'Jugador {i}', 'email': f'j{i}@example.com', 'games_won': i % 5}
+        for i in range(20)
+    ])
+    try:
+        check_query_plans(db)
+        assert False, 'consultas sin índice aceptadas'
+    except MissingIndexError as e:
+        assert 'login por email (COLLSCAN)' in str(e)
+
+    bootstrap_indexes(db)
+    check_query_plans(db)
+
+    assert db.users.find_one({'email': 'j3@example.com'}, {'_id': 0, 'name': 1}) == {'name': 'Jugador 3'}
+    top = list(db.users.find({}, RANKING_PROJECTION).sort(RANKING_SORT).limit(3))
+    assert [u['games_won'] for u in top] == [4, 4, 4] and '_id' not in top[0]
+    assert db.users.count_documents({'games_won': {'$gte': 3}}) == 8
+
+    # El orden del índice se recalcula tras escribir
+    db.users.update_one({'public_id': 'p0'}, {'$inc': {'games_won': 10}})
+    assert next(iter(db.users.find({}, RANKING_PROJECTION).sort(RANKING_SORT).limit(1)))['games_won'] == 10
+
+    try:
+        db.users.insert_one({'public_id': 'nuevo', 'email': 'j1@example.com'})
+        assert False, 'email duplicado aceptado'
+    except DuplicateKeyError:
+        pass
+
+
+def test_bulk_write_upserts_and_reports_duplicates():
+    db = MemoryClient()['test']
+    db.users.create_index('email', unique=True)
+    db.users.bulk_write([
+        UpdateOne({'_id': 'pa'}, {'$inc': {'g': 1}}, upsert=True),
+        UpdateOne({'_id': 'pa'}, {'$inc': {'g': 2}}, upsert=True),
+    ])
+    assert db.users.find_one({'_id': 'pa'}) == {'_id': 'pa', 'g': 3}
+
+    try:
+        db.users.bulk_write([
+            InsertOne({'email': 'a@example.com'}),
+            InsertOne({'email': 'a@example.com'}),
+            InsertOne({'email': 'b@example.com'}),
+        ], ordered=False)
+        assert False, 'duplicado aceptado'
+    except BulkWriteError as e:
+        assert [error['index'] for error in e.details['writeErrors']] == [1]
+    assert db.users.count_documents({'email': {'$exists': True}}) == 2
+
+
+def test_match_history_through_write_behind():
+    db = MemoryClient()['test']
+    queue = WriteBehindQueue(db, spool_path=None)
+    history = MatchHistory(db, queue)
+    rounds = [{'question': 'P', 'correct_answer': 1,
+               'answers': {'a': {'answer_index': 1, 'is_correct': True, 'points': 900, 'response_time': 2}}}]
+    for _ in range(3):
+        history.record({'lobby_id': 'L1', 'quick_play': False, 'questions': 1, 'rounds': rounds,
+                        'players': [{'socket_id': 'a', 'public_id': 'pa', 'name': 'Ana', 'score': 900, 'rank': 1}]})
+    queue.flush()
+
+    page = history.recent('pa', limit=2)
+    assert len(page['partidas']) == 2 and page['next_cursor']
+    assert len(history.recent('pa', before=page['next_cursor'])['partidas']) == 1
+    stats = history.stats('pa')
+    assert stats['games_played'] == 3 and stats['average_score'] == 900
+
+
+if __name__ == '__main__':
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith('test_') and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print(f'✓ {name}')
+    print(f'{len(tests)} tests OK')
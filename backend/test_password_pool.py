@@ -0,0 +1,99 @@
+"""
+Tests del pool de hash de contraseñas
+
+Se ejecutan con pytest o directamente:
+    python test_password_pool.py
+"""
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+
+from password_pool import PasswordPool, PasswordPoolBusy
+
+
+def test_hash_and_check_in_worker_process():
+    pool = PasswordPool(workers=1, max_queue=4).start()
+    try:
+        pwhash = pool.hash('secreta')
+        assert pwhash.startswith('pbkdf2:sha256')
+        assert pool.check(pwhash, 'secreta') is True
+        assert pool.check(pwhash, 'otra') is False
+    finally:
+        pool.close()
+
+
+def test_full_queue_is_rejected_without_waiting():
+    pool = PasswordPool(workers=1, max_queue=0).start()
+    busy = threading.Thread(target=pool._run, args=(time.sleep, 0.5))
+    try:
+        busy.start()
+        deadline = time.time() + 5
+        while pool._in_flight == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        started = time.perf_counter()
+        try:
+            pool.hash('secreta')
+            assert False, 'hash aceptado con la cola llena'
+        except PasswordPoolBusy:
+            pass
+        assert time.perf_counter() - started < 0.1
+    finally:
+        busy.join()
+        pool.close()
+    assert pool._in_flight == 0
+
+
+def test_timed_out_job_keeps_its_slot_until_the_process_finishes():
+    pool = PasswordPool(workers=1, max_queue=0, timeout=0.1).start()
+    try:
+        try:
+            pool._run(time.sleep, 0.5)
+            assert False, 'espera sin timeout'
+        except PasswordPoolBusy:
+            pass
+        # El request dejó de esperar pero el proceso sigue ocupado
+        assert pool._in_flight == 1
+        try:
+            pool.hash('secreta')
+            assert False, 'hash aceptado con el proceso ocupado'
+        except PasswordPoolBusy:
+            pass
+        deadline = time.time() + 5
+        while pool._in_flight and time.time() < deadline:
+            time.sleep(0.01)
+        assert pool._in_flight == 0
+        pool.timeout = 10
+        assert pool.hash('secreta').startswith('pbkdf2:sha256')
+    finally:
+        pool.close()
+
+
+
+def test_process_exits_after_using_the_pool():
+    # Como en wsgi.py: con eventlet (si está instalado) parcheado antes de todo
+    script = textwrap.dedent("""
+        try:
+            import eventlet
+            eventlet.monkey_patch()
+        except ImportError:
+            pass
+        from password_pool import PasswordPool
+        pool = PasswordPool(workers=1).start()
+        assert pool.check(pool.hash('secreta'), 'secreta')
+        print('ok')
+    """)
+    result = subprocess.run([sys.executable, '-c', script], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, timeout=30)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().endswith('ok')
+
+
+if __name__ == '__main__':
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith('test_') and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print(f'✓ {name}')
+    print(f'{len(tests)} tests OK')
@@ -0,0 +1,217 @@
+"""
+Tests del sistema de poderes y de la puntuación
+
+Incluye pruebas de propiedades con secuencias aleatorias (semilla fija).
+Se ejecutan con pytest o directamente:
+    python test_powers.py
+"""
+import random
+
+from game_engine import GameEngine, Message, QuestionListFeed
+from powers import GamePowersManager, PlayerPowersManager, registry
+from scoring import BASE_POINTS, MAX_TIME_BONUS, calculate_answer_points
+from simulation import SIM_QUESTIONS, VirtualClock, VirtualScheduler
+
+POWER_IDS = [d.value for d in registry.table.definitions]
+SEEDS = range(25)
+
+
+def test_generate_question_powers_offers_every_power():
+    manager = PlayerPowersManager()
+    powers = manager.generate_question_powers()
+    assert [p['power_type'] for p in powers] == POWER_IDS
+    assert not any(p['is_used'] for p in powers)
+
+
+def test_power_requires_question_powers():
+    manager = PlayerPowersManager()
+    success, result = manager.use_power('fifty_fifty', 10000)
+    assert not success
+    assert result['error'] == 'Poder no disponible'
+
+
+def test_unknown_power_is_rejected():
+    manager = PlayerPowersManager()
+    manager.generate_question_powers()
+    assert manager.use_power('no_existe', 10000) == (False, {'error': 'Poder no válido'})
+
+
+def test_not_enough_points():
+    manager = PlayerPowersManager()
+    manager.generate_question_powers()
+    success, result = manager.use_power('double_points', 100)
+    assert not success
+    assert 'No tienes suficientes puntos' in result['error']
+    assert manager.get_used_powers() == []
+
+
+def test_double_points_lasts_one_question():
+    game = GamePowersManager()
+    game.question_powers('a')
+    manager = game.get_or_create_manager('a')
+    assert manager.use_power('double_points', 5000)[0]
+    assert game.players_with_double_points() == ['a']
+    game.reset_all_for_new_question()
+    assert not manager.has_double_points_active()
+    assert manager.get_used_powers() == ['double_points']
+
+
+def test_effect_is_a_private_copy():
+    manager = PlayerPowersManager()
+    manager.generate_question_powers()
+    _, result = manager.use_power('fifty_fifty', 5000)
+    result['effect']['eliminated_options'] = [0, 1]
+    definition = registry.table.by_value['fifty_fifty']
+    assert 'eliminated_options' not in definition.effect_payload
+
+
+def test_scoring_formula():
+    assert calculate_answer_points(False, 1.0) == 0
+    assert calculate_answer_points(False, 1.0, double_points=True) == 0
+    assert calculate_answer_points(True, 0) == BASE_POINTS + MAX_TIME_BONUS
+    assert calculate_answer_points(True, 10) == 1300
+    assert calculate_answer_points(True, 30) == BASE_POINTS
+    assert calculate_answer_points(True, 10, double_points=True) == 2600
+
+
+def test_property_scoring_bounds_and_monotonic():
+    rng = random.Random(0)
+    for _ in range(2000):
+        t1 = rng.uniform(0, 60)
+        t2 = t1 + rng.uniform(0, 10)
+        p1 = calculate_answer_points(True, t1)
+        p2 = calculate_answer_points(True, t2)
+        assert BASE_POINTS <= p2 <= p1 <= BASE_POINTS + MAX_TIME_BONUS
+        assert calculate_answer_points(True, t1, True) == 2 * p1
+
+
+def _simulate_game(seed, players=4, questions=30):
+    """
+    Juega una partida aleatoria en GameEngine con reloj virtual: poderes al
+    azar (también inválidos o sin puntos), respuestas por lotes o al recibirlas
+    y preguntas que se cierran por tiempo
+
+    Returns:
+        (puntajes finales, usos de cada poder por jugador)
+    """
+    rng = random.Random(seed)
+    scheduler = VirtualScheduler(VirtualClock())
+    inbox = []
+    engine = GameEngine(
+        feed=QuestionListFeed(SIM_QUESTIONS, rng=random.Random(seed), per_game=questions),
+        clock=scheduler.clock,
+        scheduler=scheduler,
+        rng=random.Random(seed),
+        on_messages=inbox.extend,
+        answer_tick=rng.choice([0, 0.05]),
+        log=None
+    )
+    socket_ids = [f'p{i}' for i in range(players)]
+    uses = {sid: {} for sid in socket_ids}
+
+    def send(event, sid, data=None):
+        messages = engine.dispatch(event, sid, data)
+        inbox.extend(messages)
+        return messages
+
+    send('create_lobby', socket_ids[0], {'player_name': socket_ids[0]})
+    lobby_id = engine.user_lobbies[socket_ids[0]]
+    for sid in socket_ids[1:]:
+        send('join_lobby', sid, {'lobby_id': lobby_id, 'player_name': sid})
+        send('toggle_ready', sid)
+    send('start_game', socket_ids[0])
+    lobby = engine.lobbies[lobby_id]
+    players_by_sid = {p['socket_id']: p for p in lobby['players']}
+
+    def on_question(sid, question):
+        manager = engine.game_powers_managers[lobby_id].get_or_create_manager(sid)
+        # Invariante: el payload refleja los poderes ya usados en la partida
+        assert {p['power_type'] for p in question['powers'] if p['is_used']} == set(manager.get_used_powers())
+
+        for _ in range(rng.randint(0, 3)):
+            power_type = rng.choice(POWER_IDS + ['invalido'])
+            before = players_by_sid[sid]['score']
+            for message in send('use_power', sid, {'power_type': power_type}):
+                if message.event == 'power_used':
+                    # El coste se descuenta entero: nunca hace falta recortar a 0
+                    assert message.data['cost'] <= before
+                    assert message.data['new_points'] == before - message.data['cost'] >= 0
+                    uses[sid][power_type] = uses[sid].get(power_type, 0) + 1
+
+        number = question['question_number']
+        correct = engine.active_questions[lobby_id]['current_question']['correct_answer']
+        if rng.random() < 0.9:
+            answer = correct if rng.random() < 0.6 else (correct + 1) % 4
+
+            def respond():
+                current = engine.active_questions.get(lobby_id)
+                if current is not None and current['question_number'] == number:
+                    send('submit_answer', sid, {'answer_index': answer})
+            scheduler.call_later(rng.uniform(0, 45), respond)
+
+    ended = False
+    while not ended:
+        while inbox:
+            message = inbox.pop(0)
+            if not isinstance(message, Message):
+                continue
+            if message.event == 'new_question':
+                on_question(message.to, message.data)
+            elif message.event == 'answer_result':
+                assert message.data['total_score'] >= 0
+            elif message.event == 'round_ended':
+                ended = True
+        if not ended and not scheduler.run_next():
+            break
+
+    assert ended, 'la partida no terminó'
+    return {sid: p['score'] for sid, p in players_by_sid.items()}, uses
+
+
+def test_property_score_never_negative_and_powers_once_per_game():
+    for seed in SEEDS:
+        scores, uses = _simulate_game(seed)
+        assert all(score >= 0 for score in scores.values())
+        for per_player in uses.values():
+            assert all(count == 1 for count in per_player.values())
+
+
+def test_property_new_game_restores_powers():
+    for seed in SEEDS:
+        rng = random.Random(seed)
+        game = GamePowersManager()
+        manager = game.get_or_create_manager('a')
+        game.question_powers('a')
+        for power_type in rng.sample(POWER_IDS, rng.randint(1, len(POWER_IDS))):
+            manager.use_power(power_type, 100000)
+        game.reset_all_for_new_game()
+        assert manager.get_used_powers() == []
+        assert not manager.has_double_points_active()
+        game.question_powers('a')
+        assert all(manager.can_use_power(p, 100000)[0] for p in POWER_IDS)
+
+
+def test_property_removed_slots_are_recycled_clean():
+    rng = random.Random(1)
+    game = GamePowersManager()
+    for step in range(500):
+        sid = f's{rng.randint(0, 20)}'
+        if rng.random() < 0.3:
+            game.remove_player(sid)
+            continue
+        is_new = sid not in game._slots
+        game.question_powers(sid)
+        manager = game.get_or_create_manager(sid)
+        if is_new:
+            assert manager.get_used_powers() == []
+            assert not manager.has_double_points_active()
+        manager.use_power(rng.choice(POWER_IDS), 100000)
+    assert len(game.state) <= 21
+
+
+if __name__ == '__main__':
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith('test_') and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print(f'✓ {name}')
+    print(f'{len(tests)} tests OK')
@@ -0,0 +1,150 @@
+"""
+Tests de los packs de preguntas (construcción sin red, carga y selección por dificultad)
+
+Se ejecutan con pytest o directamente:
+    python test_question_pack.py
+"""
+import json
+import os
+import random
+import tempfile
+
+import ai_service
+from question_pack import PACK_MAGIC, QuestionPack, load_question_pack, main
+
+OPENTDB_DUMP = {'response_code': 0, 'results': [
+    {'type': 'multiple', 'difficulty': 'easy', 'category': 'Geography',
+     'question': 'Capital of France?', 'correct_answer': 'Paris',
+     'incorrect_answers': ['Rome', 'Madrid', 'Berlin']},
+    {'type': 'multiple', 'difficulty': 'hard', 'category': 'Science &amp; Nature',
+     'question': 'Symbol of &quot;gold&quot;?', 'correct_answer': 'Au',
+     'incorrect_answers': ['Ag', 'Gd', 'Go']},
+    {'type': 'boolean', 'difficulty': 'medium', 'category': 'History',
+     'question': 'Rome was founded in 753 BC.', 'correct_answer': 'True',
+     'incorrect_answers': ['False']},
+    # Repetida: se omite
+    {'type': 'multiple', 'difficulty': 'easy', 'category': 'Geography',
+     'question': 'Capital of France?', 'correct_answer': 'Paris',
+     'incorrect_answers': ['Rome', 'Madrid', 'Berlin']},
+]}
+
+API_DUMP = [
+    {'pregunta': '¿Cuántos lados tiene un hexágono?', 'opciones': ['5', '6', '7', '8'],
+     'respuesta': '6', 'dificultad': 'Fácil', 'categoria': 'Matemáticas'},
+    {'pregunta': '¿Año de la Revolución de Mayo?', 'opciones': ['1810', '1816', '1806'],
+     'respuesta': '1810', 'dificultad': 'Legendario', 'categoria': 'Historia'},
+    # Sin opciones suficientes: se omite
+    {'pregunta': '¿Incompleta?', 'opciones': ['Sí'], 'respuesta': 'Sí', 'dificultad': 'Medio'},
+]
+
+# (pregunta, respuesta correcta, categoría, etiqueta) de las preguntas que entran al pack
+EXPECTED = {
+    'Capital of France?': ('Paris', 'Geography', 'Fácil', 4),
+    'Symbol of "gold"?': ('Au', 'Science & Nature', 'Difícil', 4),
+    'Rome was founded in 753 BC.': ('True', 'History', 'Medio', 2),
+    '¿Cuántos lados tiene un hexágono?': ('6', 'Matemáticas', 'Fácil', 4),
+    '¿Año de la Revolución de Mayo?': ('1810', 'Historia', 'Legendario', 3),
+}
+
+
+def build_test_pack(directory):
+    paths = []
+    for name, dump in (('opentdb.json', OPENTDB_DUMP), ('api.json', API_DUMP)):
+        path = os.path.join(directory, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(dump, f, ensure_ascii=False)
+        paths.append(path)
+    output = os.path.join(directory, 'questions.pack')
+    assert main(['build', '-o', output, '--no-translate', *paths]) == 0
+    return output
+
+
+def test_build_and_load_round_trip():
+    directory = tempfile.mkdtemp()
+    output = build_test_pack(directory)
+    assert not os.path.exists(output + '.tmp')
+
+    pack = load_question_pack(output)
+    try:
+        assert len(pack) == len(EXPECTED)
+        loaded, by_text = {}, {}
+        for index in range(len(pack)):
+            question = pack.question(index)
+            by_text[question['question']] = question
+            loaded[question['question']] = (
+                question['options'][question['correct_answer']],
+                question['category'],
+                question['difficulty'],
+                len(question['options'])
+            )
+            assert question['explanation'] == f"La respuesta correcta es: {question['options'][question['correct_answer']]}"
+        assert loaded == EXPECTED
+
+        # Las opciones de la API conservan su orden; las de Open Trivia DB se barajan
+        hexagon = by_text['¿Cuántos lados tiene un hexágono?']
+        assert hexagon['options'] == ['5', '6', '7', '8'] and hexagon['correct_answer'] == 1
+        try:
+            pack.question(len(pack))
+            assert False, 'índice fuera de rango aceptado'
+        except IndexError:
+            pass
+    finally:
+        pack.close()
+
+
+def test_random_question_respects_the_difficulty_index():
+    directory = tempfile.mkdtemp()
+    pack = QuestionPack(build_test_pack(directory))
+    try:
+        assert {key: pack.count(key) for key in ('easy', 'medium', 'hard')} == {'easy': 2, 'medium': 1, 'hard': 2}
+        rng = random.Random(3)
+        labels = {
+            'easy': {'Fácil'},
+            'medium': {'Medio'},
+            'hard': {'Difícil', 'Legendario'},
+        }
+        for difficulty, expected in labels.items():
+            seen = {pack.random_question(difficulty, rng=rng)['question'] for _ in range(50)}
+            assert len(seen) == pack.count(difficulty)
+            assert {EXPECTED[q][2] for q in seen} <= expected
+
+        # Sin dificultad conocida se elige entre todas
+        seen = {pack.random_question(None, rng=rng)['question'] for _ in range(200)}
+        assert seen == set(EXPECTED)
+    finally:
+        pack.close()
+
+
+def test_unusable_files_are_ignored():
+    directory = tempfile.mkdtemp()
+    assert load_question_pack(os.path.join(directory, 'no-existe.pack')) is None
+    for name, content in (('vacio.pack', b''), ('otro.pack', b'XXXX' + bytes(60)),
+                          ('truncado.pack', PACK_MAGIC)):
+        path = os.path.join(directory, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        assert load_question_pack(path) is None
+
+
+def test_pick_from_pack_falls_back_to_the_requested_difficulty():
+    directory = tempfile.mkdtemp()
+    pack = QuestionPack(build_test_pack(directory))
+    originals = ai_service.question_pack, ai_service.matches_difficulty
+    # Ninguna pregunta coincide con la dificultad calibrada
+    ai_service.question_pack = pack
+    ai_service.matches_difficulty = lambda question_text, dificultad, difficulty: False
+    try:
+        random.seed(5)
+        labels = {pick['difficulty'] for pick in (ai_service.pick_from_pack('easy') for _ in range(100))}
+        assert labels == {'Fácil'}
+    finally:
+        ai_service.question_pack, ai_service.matches_difficulty = originals
+        pack.close()
+
+
+if __name__ == '__main__':
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith('test_') and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print(f'✓ {name}')
+    print(f'{len(tests)} tests OK')
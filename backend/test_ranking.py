@@ -0,0 +1,130 @@
+"""
+Tests del ranking paginado (con una colección falsa en memoria)
+
+Se ejecutan con pytest o directamente:
+    python test_ranking.py
+"""
+import json
+
+from flask import Flask
+
+import auth
+from ranking import RankingCache, decode_cursor
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, keys):
+        for field, direction in reversed(keys):
+            self.docs.sort(key=lambda d: d.get(field), reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    def __iter__(self):
+        return iter(self.docs)
+
+
+class FakeUsers:
+    """Lo justo de una colección de pymongo para el ranking"""
+
+    def __init__(self, users):
+        self.users = users
+        self.finds = 0
+        self.indexes = []
+
+    def create_index(self, keys, name=None):
+        self.indexes.append(keys)
+
+    @staticmethod
+    def _after(doc, games_won, public_id):
+        return doc['games_won'] < games_won or (doc['games_won'] == games_won and doc['public_id'] > public_id)
+
+    def find(self, query, projection):
+        self.finds += 1
+        docs = self.users
+        if '$or' in query:
+            games_won = query['$or'][0]['games_won']['$lt']
+            public_id = query['$or'][1]['public_id']['$gt']
+            docs = [d for d in docs if self._after(d, games_won, public_id)]
+        return FakeCursor([{k: d[k] for k in projection if projection[k]} for d in docs])
+
+
+def make_users(n):
+    return [{'public_id': f'u{i:04d}', 'name': f'J{i}', 'games_won': (i * 7) % 13} for i in range(n)]
+
+
+def walk(cache, limit):
+    """Recorre todas las páginas y devuelve (usuarios, páginas)"""
+    usuarios, pages, cursor = [], 0, None
+    while True:
+        body = json.loads(cache.page(limit, cursor)[0])
+        usuarios.extend(body['usuarios'])
+        pages += 1
+        cursor = body['next_cursor']
+        if cursor is None:
+            return usuarios, pages
+
+
+def test_pages_follow_ranking_order():
+    users = make_users(25)
+    expected = sorted(users, key=lambda u: (-u['games_won'], u['public_id']))
+    # Foto más chica que la colección: las últimas páginas salen por cursor
+    for size in (100, 8):
+        cache = RankingCache(FakeUsers(users), size=size, ttl=60)
+        usuarios, pages = walk(cache, 4)
+        assert [u['name'] for u in usuarios] == [u['name'] for u in expected]
+        assert [u['rank'] for u in usuarios] == list(range(1, 26))
+        assert pages == 7
+
+
+def test_snapshot_is_cached_until_invalidated():
+    users = make_users(10)
+    collection = FakeUsers(users)
+    cache = RankingCache(collection, size=100, ttl=60)
+    body, etag = cache.page(5)
+    assert cache.page(5) == (body, etag)
+    assert collection.finds == 1 and collection.indexes
+
+    users[9]['games_won'] = 99
+    assert cache.page(5)[1] == etag
+    cache.invalidate()
+    assert cache.page(5)[1] != etag
+    assert collection.finds == 2
+
+
+def test_invalid_cursor():
+    cache = RankingCache(FakeUsers(make_users(3)), size=10, ttl=60)
+    try:
+        cache.page(5, 'no-es-un-cursor')
+        assert False, 'debería fallar'
+    except ValueError:
+        pass
+    body = json.loads(cache.page(1)[0])
+    assert decode_cursor(body['next_cursor'])[0] == 1
+
+
+def test_route_etag_not_modified():
+    app = Flask(__name__)
+    app.add_url_rule('/ranking', 'obtener_ranking', auth.obtener_ranking)
+    auth.ranking_cache = RankingCache(FakeUsers(make_users(12)), size=100, ttl=60)
+    client = app.test_client()
+
+    first = client.get('/ranking?limit=3')
+    assert first.status_code == 200 and len(first.get_json()['usuarios']) == 3
+    etag = first.headers['ETag']
+    again = client.get('/ranking?limit=3', headers={'If-None-Match': etag})
+    assert again.status_code == 304 and again.data == b''
+    assert client.get('/ranking?limit=abc').status_code == 400
+
+
+if __name__ == '__main__':
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith('test_') and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print(f'✓ {name}')
+    print(f'{len(tests)} tests OK')
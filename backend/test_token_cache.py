@@ -0,0 +1,93 @@
+"""
+Tests de la caché de tokens JWT (con una colección de usuarios falsa)
+
+Se ejecutan con pytest o directamente:
+    python test_token_cache.py
+"""
+import time
+
+import jwt
+from flask import Flask, jsonify
+
+import auth
+from token_cache import TokenCache
+
+SECRET = 'secreto-de-prueba-con-32-bytes-o-mas'
+
+
+class FakeUsers:
+    def __init__(self, users):
+        self.users = users
+        self.lookups = 0
+
+    def find_one(self, query, projection=None):
+        self.lookups += 1
+        user = self.users.get(query['public_id'])
+        if user is None:
+            return None
+        return {k: v for k, v in user.items() if k != 'password'}
+
+
+class FakeDB:
+    def __init__(self, users):
+        self.users = FakeUsers(users)
+
+
+def make_token(public_id, exp):
+    return jwt.encode({'public_id': public_id, 'exp': exp}, SECRET)
+
+
+def test_entries_expire_and_are_evicted():
+    now = [1000.0]
+    cache = TokenCache(size=2, ttl=60, clock=lambda: now[0])
+    cache.put('t1', {'public_id': 'a'}, expires_at=1030)
+    cache.put('t2', {'public_id': 'b'})
+    assert cache.get('t1') == {'public_id': 'a'}
+    # t2 es el menos usado: sale al entrar t3
+    cache.put('t3', {'public_id': 'a'})
+    assert cache.get('t2') is None and len(cache) == 2
+    # t1 caduca con el exp del JWT, antes que el ttl
+    now[0] = 1030
+    assert cache.get('t1') is None and cache.get('t3') is not None
+    cache.invalidate_user('a')
+    assert len(cache) == 0
+
+
+def test_token_required_skips_lookups_until_logout():
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = SECRET
+    app.add_url_rule('/logout', 'logout', auth.logout, methods=['POST'])
+
+    @app.route('/me')
+    @auth.token_required
+    def me(current_user):
+        return jsonify(current_user)
+
+    original_db, original_cache = auth.db, auth.token_cache
+    auth.db = FakeDB({'a': {'public_id': 'a', 'name': 'Ana', 'email': 'ana@x', 'password': 'hash'}})
+    auth.token_cache = TokenCache(size=10, ttl=60)
+    try:
+        client = app.test_client()
+        headers = {'x-access-token': make_token('a', int(time.time()) + 3600)}
+        for _ in range(3):
+            response = client.get('/me', headers=headers)
+            assert response.status_code == 200 and response.get_json()['name'] == 'Ana'
+        assert auth.db.users.lookups == 1
+        assert 'password' not in response.get_json()
+
+        assert client.post('/logout', headers=headers).status_code == 200
+        response = client.get('/me', headers=headers)
+        assert response.status_code == 401 and 'revoked' in response.get_json()['message']
+
+        expired = {'x-access-token': make_token('a', int(time.time()) - 10)}
+        assert client.get('/me', headers=expired).status_code == 401
+    finally:
+        auth.db, auth.token_cache = original_db, original_cache
+
+
+if __name__ == '__main__':
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith('test_') and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print(f'✓ {name}')
+    print(f'{len(tests)} tests OK')
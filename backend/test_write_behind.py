@@ -0,0 +1,193 @@
+"""
+Tests de la escritura diferida (con una base de datos falsa)
+
+Se ejecutan con pytest o directamente:
+    python test_write_behind.py
+"""
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from write_behind import WriteBehindQueue
+
+
+class FakeCollection:
+    def __init__(self):
+        self.batches = []
+        self.fail = False
+        self.duplicates = set()
+
+    def bulk_write(self, ops, ordered=True):
+        if self.fail:
+            raise AutoReconnect('sin conexión')
+        errors = [
+            {'index': i, 'code': 11000} for i, op in enumerate(ops)
+            if getattr(op, '_doc', {}).get('_id') in self.duplicates
+        ]
+        self.batches.append(ops)
+        if errors:
+            raise BulkWriteError({'writeErrors': errors})
+
+
+class FakeDB:
+    def __init__(self):
+        self.users = FakeCollection()
+        self.matches = FakeCollection()
+        self.player_stats = FakeCollection()
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+
+def make_queue(db, spool_path='', clock=None):
+    clock = clock or [0.0]
+    queue = WriteBehindQueue(db, batch_size=10, flush_seconds=1.0, spool_path=spool_path,
+                             clock=lambda: clock[0])
+    return queue, clock
+
+
+def test_wins_are_coalesced_into_one_bulk_write():
+    db = FakeDB()
+    queue, _ = make_queue(db)
+    written = []
+    queue.on_wins_written.append(lambda: written.append(True))
+    for public_id in ('a', 'b', 'a', 'a'):
+        queue.increment_wins(public_id)
+    queue.insert('matches', {'_id': 'm1', 'ended_at': datetime(2024, 1, 1)})
+    assert queue.flush() == 3
+    ops = db.users.batches[0]
+    assert len(db.users.batches) == 1 and len(ops) == 2
+    assert ops[0]._doc == {'$inc': {'games_won': 3}}
+    assert written == [True]
+    assert queue.flush() == 0
+
+
+def test_failed_batch_is_spooled_and_retried():
+    spool = os.path.join(tempfile.mkdtemp(), 'spool.jsonl')
+    db = FakeDB()
+    queue, clock = make_queue(db, spool)
+    db.users.fail = db.matches.fail = db.player_stats.fail = True
+    queue.increment_wins('a')
+    queue.insert('matches', {'_id': 'm1', 'ended_at': datetime(2024, 1, 1, 12), 'a': b'\x00\xff'})
+    queue.increment('player_stats', '_id', 'a', {'g': 1, 'c': 3}, upsert=True)
+    assert queue.flush() == 0
+    assert os.path.exists(spool)
+
+    # Antes del reintento lo nuevo se suma al spool sin tocar MongoDB
+    db.users.fail = db.matches.fail = db.player_stats.fail = False
+    queue.increment_wins('a')
+    assert queue.flush() == 0 and not db.users.batches
+
+    clock[0] = 5.0
+    # Un proceso nuevo recupera el spool (el insert ya aplicado no se duplica)
+    db.matches.duplicates.add('m1')
+    fresh, _ = make_queue(db, spool, clock)
+    assert fresh.flush() == 3
+    assert not os.path.exists(spool)
+    assert db.users.batches[0][0]._doc == {'$inc': {'games_won': 2}}
+    assert db.matches.batches[0][0]._doc['ended_at'] == datetime(2024, 1, 1, 12)
+    assert db.matches.batches[0][0]._doc['a'] == b'\x00\xff'
+    stats_op = db.player_stats.batches[0][0]
+    assert stats_op._doc == {'$inc': {'g': 1, 'c': 3}} and stats_op._upsert is True
+
+
+
+class Crash(BaseException):
+    """El proceso muere a mitad del lote"""
+
+
+def test_spool_survives_a_crash_during_the_retry():
+    spool = os.path.join(tempfile.mkdtemp(), 'spool.jsonl')
+    db = FakeDB()
+    queue, clock = make_queue(db, spool)
+    db.users.fail = db.matches.fail = True
+    queue.increment_wins('a')
+    queue.insert('matches', {'_id': 'm1'})
+    queue.flush()
+
+    def crash(ops, ordered=True):
+        raise Crash()
+    db.users.bulk_write = crash
+    clock[0] = 5.0
+    try:
+        make_queue(db, spool, clock)[0].flush()
+        assert False, 'sin caída'
+    except Crash:
+        pass
+    assert os.path.exists(spool)
+
+    # Reintento parcial: en el spool queda solo lo que volvió a fallar
+    del db.users.bulk_write
+    db.matches.fail = False
+    fresh, _ = make_queue(db, spool, clock)
+    assert fresh.flush() == 1 and len(db.matches.batches) == 1
+    with open(spool, encoding='utf-8') as f:
+        assert [json.loads(line)['op'] for line in f] == ['inc']
+    assert not os.path.exists(spool + '.tmp')
+
+
+def test_batch_filled_during_a_flush_is_sent_without_waiting():
+    db = FakeDB()
+    queue = WriteBehindQueue(db, batch_size=2, flush_seconds=30.0, spool_path='')
+    bulk_write = db.users.bulk_write
+
+    def refill(ops, ordered=True):
+        # Mientras el hilo escribe el primer lote se completa otro
+        bulk_write(ops, ordered)
+        if len(db.users.batches) == 1:
+            queue.increment_wins('c')
+            queue.increment_wins('d')
+
+    db.users.bulk_write = refill
+    queue.start()
+    try:
+        queue.increment_wins('a')
+        queue.increment_wins('b')
+        deadline = time.monotonic() + 5
+        while len(db.users.batches) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(db.users.batches) == 2, 'el segundo lote esperó al intervalo'
+    finally:
+        queue.close()
+
+
+def test_thread_does_not_spin_while_the_database_is_down():
+    db = FakeDB()
+    db.users.fail = True
+    queue = WriteBehindQueue(db, batch_size=2, flush_seconds=0.05, spool_path='')
+    flushes = []
+    flush = queue.flush
+
+    def counted_flush():
+        flushes.append(True)
+        return flush()
+
+    queue.flush = counted_flush
+    queue.start()
+    try:
+        for public_id in 'abcd':
+            queue.increment_wins(public_id)
+        time.sleep(0.5)
+        # Con reintentos cada 0.05, 0.1, 0.2... s son pocos envíos, no miles
+        assert 0 < len(flushes) < 20, f'{len(flushes)} envíos con la base caída'
+        assert len(queue) == 4
+
+        db.users.fail = False
+        deadline = time.monotonic() + 5
+        while len(queue) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(queue) == 0 and db.users.batches
+    finally:
+        queue.close()
+
+
+if __name__ == '__main__':
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith('test_') and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print(f'✓ {name}')
+    print(f'{len(tests)} tests OK')
@@ -0,0 +1,135 @@
+"""
+Caché de tokens JWT verificados
+token_required decodificaba el JWT y buscaba al usuario en MongoDB en cada
+request protegido. Esta caché guarda token -> identidad del usuario (sin la
+contraseña) hasta AUTH_CACHE_SECONDS o hasta que el token expira, lo que
+ocurra antes; un token en caché no vuelve a verificar la firma ni a tocar la
+base de datos. Es LRU con AUTH_CACHE_SIZE entradas como máximo.
+
+El logout revoca el token (deja de aceptarse aunque la firma siga siendo
+válida, hasta su `exp`) y invalidate_user descarta todos los tokens de un
+usuario cuando cambian sus datos. Con varios workers cada uno tiene su caché
+y su lista de revocados.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+import metrics
+
+# Tokens verificados que se guardan en memoria
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+# Segundos máximos que un token se acepta sin volver a leer al usuario
+AUTH_CACHE_SECONDS = float(os.getenv("AUTH_CACHE_SECONDS", "300"))
+
+# Campos del usuario que reciben las rutas protegidas
+USER_IDENTITY_PROJECTION = {'_id': 0, 'public_id': 1, 'name': 1, 'email': 1}
+
+token_cache_hits_total = metrics.counter('auth_token_cache_hits_total', 'Tokens aceptados desde la caché')
+token_cache_misses_total = metrics.counter(
+    'auth_token_cache_misses_total', 'Tokens verificados con la firma y MongoDB'
+)
+token_cache_hit_ratio = metrics.gauge('auth_token_cache_hit_ratio', 'Fracción de tokens aceptados desde la caché')
+token_cache_size_gauge = metrics.gauge('auth_token_cache_size', 'Tokens verificados en la caché')
+revoked_tokens_gauge = metrics.gauge('auth_revoked_tokens', 'Tokens revocados (logout) aún sin expirar')
+
+
+class TokenCache:
+    """
+    Tokens verificados -> identidad del usuario
+
+    Args:
+        size: tokens máximos en caché (se descarta el menos usado)
+        ttl: segundos máximos de cada entrada
+        clock: reloj en segundos epoch (el `exp` del JWT también lo es)
+    """
+
+    def __init__(self, size: int = AUTH_CACHE_SIZE, ttl: float = AUTH_CACHE_SECONDS, clock=time.time):
+        self.size = size
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        # token -> (caduca, usuario)
+        self._entries: 'OrderedDict[str, Tuple[float, Dict]]' = OrderedDict()
+        # public_id -> tokens en caché
+        self._by_user: Dict[str, Set[str]] = {}
+        # token revocado -> exp
+        self._revoked: Dict[str, float] = {}
+        self._hits = 0
+        self._lookups = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, token: str) -> Optional[Dict]:
+        """Usuario del token si está en caché y vigente"""
+        with self._lock:
+            self._lookups += 1
+            entry = self._entries.get(token)
+            if entry is not None and entry[0] <= self._clock():
+                self._drop(token)
+                entry = None
+            if entry is None:
+                token_cache_misses_total.inc()
+            else:
+                self._entries.move_to_end(token)
+                self._hits += 1
+                token_cache_hits_total.inc()
+            token_cache_hit_ratio.set(round(self._hits / self._lookups, 4))
+        return entry[1] if entry is not None else None
+
+    def put(self, token: str, user: Dict, expires_at: Optional[float] = None):
+        """Guarda un token recién verificado (`expires_at` es el `exp` del JWT)"""
+        now = self._clock()
+        until = now + self.ttl if expires_at is None else min(now + self.ttl, expires_at)
+        if until <= now or self.size <= 0:
+            return
+        with self._lock:
+            if token in self._revoked:
+                return
+            self._drop(token)
+            self._entries[token] = (until, user)
+            self._by_user.setdefault(user.get('public_id'), set()).add(token)
+            while len(self._entries) > self.size:
+                self._drop(next(iter(self._entries)))
+            token_cache_size_gauge.set(len(self._entries))
+
+    def _drop(self, token: str):
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        public_id = entry[1].get('public_id')
+        tokens = self._by_user.get(public_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._by_user[public_id]
+        token_cache_size_gauge.set(len(self._entries))
+
+    def is_revoked(self, token: str) -> bool:
+        with self._lock:
+            return token in self._revoked
+
+    def revoke(self, token: str, expires_at: float):
+        """Rechaza el token hasta que expire (logout)"""
+        now = self._clock()
+        with self._lock:
+            self._drop(token)
+            if expires_at > now:
+                self._revoked[token] = expires_at
+            if len(self._revoked) > self.size:
+                # Los expirados ya los rechaza la verificación del JWT
+                self._revoked = {t: exp for t, exp in self._revoked.items() if exp > now}
+            revoked_tokens_gauge.set(len(self._revoked))
+
+    def invalidate_user(self, public_id: str):
+        """Descarta los tokens en caché de un usuario (cambiaron sus datos)"""
+        with self._lock:
+            for token in list(self._by_user.get(public_id, ())):
+                self._drop(token)
+
+
+# Caché del proceso (la usa token_required)
+token_cache = TokenCache()
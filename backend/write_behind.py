@@ -0,0 +1,362 @@
+"""
+Escritura diferida (write-behind) a MongoDB
+Las victorias, los contadores de estadísticas y los resultados de partida no
+se escriben en el momento: se acumulan en memoria (los $inc al mismo
+documento se suman en uno solo) y un hilo los envía con bulk_write cada
+WRITE_BEHIND_SECONDS o al juntar WRITE_BEHIND_BATCH operaciones. Así el fin
+de partida no espera a la base de datos.
+
+Si MongoDB falla, el lote se guarda en un archivo local (WRITE_BEHIND_SPOOL,
+una operación JSON por línea) y se reintenta con espera creciente; el archivo
+se borra al escribirse todo. Los documentos insertados llevan `_id` propio,
+así que reintentar un insert ya aplicado no lo duplica. Un $inc cuyo
+resultado se perdió por un corte de red puede aplicarse dos veces.
+"""
+import atexit
+import base64
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+from bson import ObjectId
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+import metrics
+
+# Operaciones pendientes que disparan un envío inmediato
+WRITE_BEHIND_BATCH = int(os.getenv("WRITE_BEHIND_BATCH", "200"))
+# Segundos máximos que una operación espera en memoria
+WRITE_BEHIND_SECONDS = float(os.getenv("WRITE_BEHIND_SECONDS", "1.0"))
+# Archivo donde se guardan los lotes que no se pudieron escribir; relativo al
+# backend (no al directorio desde el que se arranca) para que un reinicio lo lea
+WRITE_BEHIND_SPOOL = os.getenv(
+    "WRITE_BEHIND_SPOOL", os.path.join(os.path.dirname(os.path.abspath(__file__)), "write_behind_spool.jsonl")
+)
+# Espera máxima entre reintentos con MongoDB caído
+MAX_RETRY_SECONDS = 30.0
+DUPLICATE_KEY = 11000
+
+pending_gauge = metrics.gauge('write_behind_pending', 'Operaciones esperando a escribirse en MongoDB')
+spooled_gauge = metrics.gauge('write_behind_spooled', 'Operaciones guardadas en el spool local')
+flushes_total = metrics.counter('write_behind_flushes_total', 'Lotes enviados con bulk_write')
+ops_total = metrics.counter('write_behind_ops_total', 'Operaciones escritas en MongoDB')
+failures_total = metrics.counter('write_behind_failures_total', 'Lotes que fallaron y quedaron en el spool')
+flush_histogram = metrics.histogram(
+    'write_behind_flush_seconds', [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5],
+    'Duración de cada envío de lotes'
+)
+
+# (colección, campo clave, valor, upsert) de un $inc pendiente
+IncKey = Tuple[str, str, str, bool]
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {'$date': value.isoformat()}
+    if isinstance(value, ObjectId):
+        return {'$oid': str(value)}
+    if isinstance(value, bytes):
+        return {'$binary': base64.b64encode(value).decode()}
+    if isinstance(value, dict):
+        return {k: _encode(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+    return value
+
+
+def _decode(value):
+    if isinstance(value, dict):
+        if len(value) == 1 and '$date' in value:
+            return datetime.fromisoformat(value['$date'])
+        if len(value) == 1 and '$oid' in value:
+            return ObjectId(value['$oid'])
+        if len(value) == 1 and '$binary' in value:
+            return base64.b64decode(value['$binary'])
+        return {k: _decode(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    return value
+
+
+def _merge_incs(target: Dict[IncKey, Dict[str, int]], source: Dict[IncKey, Dict[str, int]]):
+    for key, fields in source.items():
+        pending = target.setdefault(key, {})
+        for field, amount in fields.items():
+            pending[field] = pending.get(field, 0) + amount
+
+
+class WriteBehindQueue:
+    """
+    Cola de escrituras diferidas
+
+    Args:
+        db: base de datos de pymongo (se puede indicar después con start)
+        batch_size: operaciones pendientes que disparan un envío
+        flush_seconds: intervalo entre envíos
+        spool_path: archivo de reintentos ('' para no usar spool)
+    """
+
+    def __init__(self, db=None, batch_size: int = WRITE_BEHIND_BATCH,
+                 flush_seconds: float = WRITE_BEHIND_SECONDS, spool_path: str = WRITE_BEHIND_SPOOL,
+                 clock=time.monotonic):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.spool_path = spool_path
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = None
+        # IncKey -> {campo: cantidad a sumar}
+        self._incs: Dict[IncKey, Dict[str, int]] = {}
+        # (colección, documento) a insertar
+        self._inserts: List[Tuple[str, Dict]] = []
+        self._retry_at = 0.0
+        self._backoff = flush_seconds
+        # Callbacks tras escribir victorias (p. ej. invalidar el ranking)
+        self.on_wins_written: List[Callable[[], None]] = []
+
+    def __len__(self):
+        return len(self._incs) + len(self._inserts)
+
+    def increment(self, collection: str, key_field: str, key: str, fields: Dict[str, int],
+                  upsert: bool = False):
+        """Suma `fields` al documento de `collection` con `key_field` == `key`"""
+        with self._lock:
+            pending_fields = self._incs.setdefault((collection, key_field, key, upsert), {})
+            for field, amount in fields.items():
+                pending_fields[field] = pending_fields.get(field, 0) + amount
+            pending = len(self._incs) + len(self._inserts)
+        self._enqueued(pending)
+
+    def increment_wins(self, public_id: str, amount: int = 1):
+        """Suma partidas ganadas a un usuario"""
+        self.increment('users', 'public_id', public_id, {'games_won': amount})
+
+    def insert(self, collection: str, document: Dict):
+        """Inserta un documento (debe traer `_id` para que reintentar sea seguro)"""
+        with self._lock:
+            self._inserts.append((collection, document))
+            pending = len(self._incs) + len(self._inserts)
+        self._enqueued(pending)
+
+    def _enqueued(self, pending: int):
+        pending_gauge.set(pending)
+        if pending >= self.batch_size:
+            self._wake.set()
+
+    # ------------------------------------------------------------------
+    # Envío
+    # ------------------------------------------------------------------
+
+    def flush(self) -> int:
+        """
+        Envía lo pendiente (y el spool, si toca reintentar)
+
+        Returns:
+            operaciones escritas en MongoDB
+        """
+        with self._flush_lock:
+            with self._lock:
+                incs, self._incs = self._incs, {}
+                inserts, self._inserts = self._inserts, []
+            pending_gauge.set(0)
+
+            retry_due = self._clock() >= self._retry_at
+            # El spool se borra recién cuando se sabe qué se escribió: si el
+            # proceso cae a mitad del lote se vuelve a enviar entero (los inserts
+            # repetidos se ignoran por _id)
+            from_spool = (retry_due and self.db is not None
+                          and bool(self.spool_path) and os.path.exists(self.spool_path))
+            if from_spool:
+                spooled_incs, spooled_inserts = self._read_spool()
+                _merge_incs(incs, spooled_incs)
+                inserts = spooled_inserts + inserts
+
+            if not incs and not inserts:
+                if from_spool:
+                    self._replace_spool({}, [])
+                return 0
+            if self.db is None or not retry_due:
+                self._spool(incs, inserts)
+                return 0
+
+            started = time.perf_counter()
+            failed_incs, failed_inserts = self._write(incs, inserts)
+            if from_spool:
+                # Lo que falló reemplaza al spool de una vez (lo nuevo incluido)
+                self._replace_spool(failed_incs, failed_inserts)
+            flush_histogram.observe(time.perf_counter() - started)
+            flushes_total.inc()
+            written = len(incs) - len(failed_incs) + len(inserts) - len(failed_inserts)
+            ops_total.inc(written)
+
+            if failed_incs or failed_inserts:
+                failures_total.inc()
+                if not from_spool:
+                    self._spool(failed_incs, failed_inserts)
+                self._retry_at = self._clock() + self._backoff
+                self._backoff = min(self._backoff * 2, MAX_RETRY_SECONDS)
+            else:
+                self._backoff = self.flush_seconds
+            wins = [key for key in incs if key[0] == 'users']
+            if any(key not in failed_incs for key in wins):
+                for callback in self.on_wins_written:
+                    try:
+                        callback()
+                    except Exception as e:
+                        print(f"⚠️ Error tras escribir victorias: {e}")
+            return written
+
+    def _write(self, incs: Dict[IncKey, Dict[str, int]], inserts: List[Tuple[str, Dict]]):
+        """Escribe los lotes y devuelve lo que falló (incrementos, inserts)"""
+        failed_incs: Dict[IncKey, Dict[str, int]] = {}
+        failed_inserts: List[Tuple[str, Dict]] = []
+
+        by_collection_incs: Dict[str, List] = {}
+        for key, fields in incs.items():
+            by_collection_incs.setdefault(key[0], []).append((key, fields))
+        for collection, items in by_collection_incs.items():
+            ops = [UpdateOne({key_field: value}, {'$inc': fields}, upsert=upsert)
+                   for (_, key_field, value, upsert), fields in items]
+            for index in self._bulk(self.db[collection], ops):
+                key, fields = items[index]
+                failed_incs[key] = fields
+
+        by_collection: Dict[str, List[Dict]] = {}
+        for collection, document in inserts:
+            by_collection.setdefault(collection, []).append(document)
+        for collection, documents in by_collection.items():
+            ops = [InsertOne(document) for document in documents]
+            for index in self._bulk(self.db[collection], ops, ignore_duplicates=True):
+                failed_inserts.append((collection, documents[index]))
+        return failed_incs, failed_inserts
+
+    @staticmethod
+    def _bulk(collection, ops, ignore_duplicates=False) -> List[int]:
+        """bulk_write sin orden; devuelve los índices de las operaciones que fallaron"""
+        try:
+            collection.bulk_write(ops, ordered=False)
+            return []
+        except BulkWriteError as e:
+            return [
+                error['index'] for error in e.details.get('writeErrors', [])
+                if not (ignore_duplicates and error.get('code') == DUPLICATE_KEY)
+            ]
+        except Exception as e:
+            print(f"⚠️ Escritura diferida fallida ({len(ops)} operaciones): {e}")
+            return list(range(len(ops)))
+
+    # ------------------------------------------------------------------
+    # Spool local
+    # ------------------------------------------------------------------
+
+    def _spool(self, incs: Dict[IncKey, Dict[str, int]], inserts: List[Tuple[str, Dict]]):
+        if not self.spool_path:
+            # Sin spool: se reintentan en el próximo envío
+            with self._lock:
+                _merge_incs(self._incs, incs)
+                self._inserts[:0] = inserts
+            return
+        lines = self._spool_lines(incs, inserts)
+        try:
+            with open(self.spool_path, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            spooled_gauge.inc(len(lines))
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar el spool de escrituras ({len(lines)} operaciones perdidas): {e}")
+
+    @staticmethod
+    def _spool_lines(incs: Dict[IncKey, Dict[str, int]], inserts: List[Tuple[str, Dict]]) -> List[str]:
+        lines = [
+            json.dumps({'op': 'inc', 'collection': c, 'key_field': f, 'key': k, 'upsert': u, 'fields': fields})
+            for (c, f, k, u), fields in incs.items()
+        ]
+        lines += [json.dumps({'op': 'insert', 'collection': c, 'doc': _encode(d)}) for c, d in inserts]
+        return lines
+
+    def _replace_spool(self, incs: Dict[IncKey, Dict[str, int]], inserts: List[Tuple[str, Dict]]):
+        """Deja en el spool solo estas operaciones (o lo borra) de forma atómica"""
+        lines = self._spool_lines(incs, inserts)
+        try:
+            if not lines:
+                os.remove(self.spool_path)
+            else:
+                tmp_path = self.spool_path + '.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write('\n'.join(lines) + '\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.spool_path)
+            spooled_gauge.set(len(lines))
+        except OSError as e:
+            print(f"⚠️ No se pudo actualizar el spool de escrituras: {e}")
+
+    def _read_spool(self):
+        incs: Dict[IncKey, Dict[str, int]] = {}
+        inserts: List[Tuple[str, Dict]] = []
+        with open(self.spool_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Línea cortada por una caída a mitad de escritura
+                    continue
+                if entry.get('op') == 'inc':
+                    key = (entry['collection'], entry['key_field'], entry['key'], entry['upsert'])
+                    _merge_incs(incs, {key: entry['fields']})
+                elif entry.get('op') == 'insert':
+                    inserts.append((entry['collection'], _decode(entry['doc'])))
+        return incs, inserts
+
+    # ------------------------------------------------------------------
+    # Hilo de envío
+    # ------------------------------------------------------------------
+
+    def start(self, db=None):
+        """Indica la base de datos y arranca el hilo de envío"""
+        if db is not None:
+            self.db = db
+        if self._thread is None:
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def _run(self):
+        written = 0
+        while not self._stopped:
+            # Limpiar antes de mirar lo pendiente: un set() posterior (lote
+            # completo o close) hace que la espera vuelva enseguida
+            self._wake.clear()
+            # Solo se encadena otro lote sin esperar si el anterior se escribió:
+            # con MongoDB caído se espera al próximo reintento (sin girar en vacío)
+            if not (written and len(self) >= self.batch_size) and not self._stopped:
+                self._wake.wait(max(self._retry_at - self._clock(), self.flush_seconds))
+            try:
+                written = self.flush()
+            except Exception as e:
+                written = 0
+                print(f"⚠️ Error en la escritura diferida: {e}")
+
+    def close(self):
+        """Detiene el hilo y envía (o guarda en el spool) lo pendiente"""
+        self._stopped = True
+        self._wake.set()
+        self._retry_at = 0.0
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"⚠️ Error al cerrar la escritura diferida: {e}")
+
+
+# Cola del proceso (la arranca main.py con la base de datos)
+write_behind = WriteBehindQueue()
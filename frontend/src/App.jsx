@@ -115,6 +115,7 @@ const AppContent = ({ socketConnected }) => {
 
   const handleCreateLobby = (data) => socket?.emit("create_lobby", data);
   const handleJoinLobby = (data) => socket?.emit("join_lobby", data);
+  const handleQuickPlay = (data) => socket?.emit("quick_play", data);
   const handleLeaveGame = () => {
     socket?.emit("leave_lobby");
     setGameActive(false);
@@ -158,6 +159,7 @@ const AppContent = ({ socketConnected }) => {
                 lobbies={lobbies}
                 onCreateLobby={handleCreateLobby}
                 onJoinLobby={handleJoinLobby}
+                onQuickPlay={handleQuickPlay}
               />
             )
           }
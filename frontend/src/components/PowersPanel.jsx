@@ -59,7 +59,13 @@ function PowersPanel({ powers, playerPoints, onPowerUsed, disabled = false }) {
 
       <div className="powers-grid">
         {localPowers.map((power) => {
-          const config = POWERS_CONFIG[power.power_type] || {};
+          // Poderes definidos solo en la configuración del servidor
+          const config = POWERS_CONFIG[power.power_type] || {
+            name: power.name,
+            emoji: power.emoji,
+            description: power.description,
+            effect: power.effect,
+          };
           const canUse = canUsePower(power);
           const isSelected = selectedPower?.power_type === power.power_type;
 
@@ -1,4 +1,5 @@
 import { createContext, useContext, useState, useEffect, useCallback } from 'react';
+import { reconnectSocket } from '../socket';
 
 const AuthContext = createContext(null);
 
@@ -44,6 +45,7 @@ export const AuthProvider = ({ children }) => {
       
       setToken(data.token);
       setUser(data.user);
+      reconnectSocket();
       
       return { success: true };
     } catch (error) {
@@ -74,6 +76,7 @@ export const AuthProvider = ({ children }) => {
         localStorage.setItem('user', JSON.stringify(data.user));
         setToken(data.token);
         setUser(data.user);
+        reconnectSocket();
       }
 
       return { success: true };
@@ -83,10 +86,19 @@ export const AuthProvider = ({ children }) => {
   }, []);
 
   const logout = useCallback(() => {
+    // Revocar el token en el backend (sin esperar la respuesta)
+    const storedToken = localStorage.getItem('token');
+    if (storedToken) {
+      fetch(`${import.meta.env.VITE_URL_BACKEND}/logout`, {
+        method: 'POST',
+        headers: { 'x-access-token': storedToken },
+      }).catch(() => {});
+    }
     localStorage.removeItem('token');
     localStorage.removeItem('user');
     setToken(null);
     setUser(null);
+    reconnectSocket();
     return { success: true };
   }, []);
 
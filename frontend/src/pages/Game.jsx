@@ -31,12 +31,15 @@ function Game({ socket, currentLobby }) {
 
   // ⭐ NUEVO: Tracking de poderes usados durante toda la partida
   const usedPowersInGame = useRef(new Set());
+  // Clave de idempotencia de la respuesta a la pregunta actual (los reintentos la reutilizan)
+  const answerIdRef = useRef(null);
 
   useEffect(() => {
     if (!socket) return;
 
     const onNewQuestion = (payload) => {
       setQuestion(payload || null);
+      answerIdRef.current = null;
       setHiddenOptions([]);
       setSelectedAnswer(null);
       setHasAnswered(false);
@@ -96,20 +99,9 @@ function Game({ socket, currentLobby }) {
         setMyScore(payload.new_points);
       }
 
-      if (eff.type === "fifty_fifty" && typeof eff.correct_index === "number") {
-        const correct = eff.correct_index;
-        const incorrect = [];
-        if (question?.options) {
-          question.options.forEach((_, i) => {
-            if (i !== correct) incorrect.push(i);
-          });
-        }
-        let hide = [...incorrect];
-        if (hide.length > 1) {
-          const keep = Math.floor(Math.random() * hide.length);
-          hide.splice(keep, 1);
-        }
-        setHiddenOptions(hide);
+      if (eff.type === "fifty_fifty" && Array.isArray(eff.eliminated_options)) {
+        // El servidor decide qué opciones incorrectas ocultar
+        setHiddenOptions(eff.eliminated_options);
       } else if (eff.type === "time_boost") {
         setTimeLeft((t) => Math.max(0, t + (eff.added_time || 10)));
       }
@@ -277,7 +269,10 @@ function Game({ socket, currentLobby }) {
   const handleAnswerClick = (index) => {
     if (!socket || hasAnswered) return;
     setSelectedAnswer(index);
-    socket.emit("submit_answer", { answer_index: index });
+    if (!answerIdRef.current) {
+      answerIdRef.current = `${question?.question_number}-${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 8)}`;
+    }
+    socket.emit("submit_answer", { answer_index: index, answer_id: answerIdRef.current });
 
   };
 
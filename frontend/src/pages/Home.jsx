@@ -17,7 +17,7 @@ import { FaUserPlus, FaUserCircle } from "react-icons/fa";
 
 import "./Home.css";
 
-function Home({ socket, lobbies, onCreateLobby, onJoinLobby }) {
+function Home({ socket, lobbies, onCreateLobby, onJoinLobby, onQuickPlay }) {
   const navigate = useNavigate();
   const [showCreateForm, setShowCreateForm] = useState(false);
   const [playerName, setPlayerName] = useState("");
@@ -113,7 +113,6 @@ function Home({ socket, lobbies, onCreateLobby, onJoinLobby }) {
     onCreateLobby({
       player_name: name,
       max_players: maxPlayers,
-      public_id: user?.public_id || null,
     });
 
     toast.success("Lobby creado exitosamente");
@@ -140,7 +139,6 @@ function Home({ socket, lobbies, onCreateLobby, onJoinLobby }) {
     onJoinLobby({
       lobby_id: normalizedLobbyId,
       player_name: name,
-      public_id: user?.public_id || null,
     });
 
     toast.success(`Uniéndose al lobby ${joinLobbyId}...`);
@@ -150,6 +148,21 @@ function Home({ socket, lobbies, onCreateLobby, onJoinLobby }) {
     setJoinLobbyId("");
   };
 
+  // Partida rápida: el servidor busca (o crea) un lobby y empieza solo al llenarse
+  const handleQuickPlay = () => {
+    const name = user ? user.name || user.email : playerName.trim();
+    if (!name) {
+      toast.error("Ingresa tu nombre para jugar");
+      return;
+    }
+
+    onQuickPlay?.({
+      player_name: name,
+    });
+
+    toast.info("Buscando partida...");
+  };
+
   const handleQuickJoin = (lobbyId) => {
     // Si el usuario está autenticado, usar su nombre directamente
     if (user && (user.name || user.email)) {
@@ -157,7 +170,6 @@ function Home({ socket, lobbies, onCreateLobby, onJoinLobby }) {
       onJoinLobby({
         lobby_id: lobbyId,
         player_name: name,
-        public_id: user?.public_id || null,
       });
 
       toast.success(`¡Uniéndose al Lobby #${lobbyId}!`);
@@ -173,7 +185,6 @@ function Home({ socket, lobbies, onCreateLobby, onJoinLobby }) {
     onJoinLobby({
       lobby_id: quickJoinLobbyId,
       player_name: name,
-      public_id: user?.public_id || null,
     });
 
     toast.success(`¡Bienvenido ${name}! Uniéndose al lobby...`);
@@ -269,6 +280,10 @@ function Home({ socket, lobbies, onCreateLobby, onJoinLobby }) {
                   <LuPaperclip className="btn-icon" />
                   <span>Unirse con Código</span>
                 </button>
+                <button className="btn-secondary" onClick={handleQuickPlay}>
+                  <SiApplearcade className="btn-icon" />
+                  <span>Partida Rápida</span>
+                </button>
               </div>
 
               {showCreateForm && (
@@ -395,6 +410,10 @@ function Home({ socket, lobbies, onCreateLobby, onJoinLobby }) {
                     <LuPaperclip className="btn-icon" />
                     <span>Unirse con Código</span>
                   </button>
+                  <button className="btn-secondary" onClick={handleQuickPlay}>
+                    <SiApplearcade className="btn-icon" />
+                    <span>Partida Rápida</span>
+                  </button>
                 </div>
 
                 {showCreateForm && (
@@ -1,7 +1,7 @@
 import { useAuth } from '../contexts/AuthContext';
 import styled from 'styled-components';
 import { useState, useEffect } from 'react';
-import { FaTrophy, FaGamepad } from 'react-icons/fa';
+import { FaTrophy, FaGamepad, FaMedal } from 'react-icons/fa';
 
 // Usar la misma env que en AuthContext (VITE_URL_BACKEND), con fallback
 const backendUrl =
@@ -10,6 +10,7 @@ const backendUrl =
 const Profile = () => {
   const { user } = useAuth();
   const [gamesWon, setGamesWon] = useState(0);
+  const [rank, setRank] = useState(null);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
@@ -20,29 +21,12 @@ const Profile = () => {
 
   const fetchUserStats = async () => {
     try {
-      const response = await fetch(`${backendUrl}/obtenerUsuarios`);
-      const data = await response.json();
-      
-      if (data.usuarios) {
-        // Intentar matchear por public_id si viene en la respuesta;
-        // si no, caer de vuelta a name.
-        let currentUser = null;
-
-        // Algunas versiones del backend solo devuelven name y games_won.
-        // Si en el futuro se agrega public_id, este bloque ya lo soporta.
-        if (user.public_id) {
-          currentUser = data.usuarios.find(
-            (u) => u.public_id && u.public_id === user.public_id
-          );
-        }
-
-        if (!currentUser) {
-          currentUser = data.usuarios.find((u) => u.name === user.name);
-        }
-
-        if (currentUser) {
-          setGamesWon(currentUser.games_won);
-        }
+      // Posición del usuario en el leaderboard del backend (sin bajar todo el ranking)
+      const response = await fetch(`${backendUrl}/leaderboard/rank/${user.public_id}`);
+      if (response.ok) {
+        const data = await response.json();
+        setGamesWon(data.games_won);
+        setRank(data.rank);
       }
     } catch (err) {
       console.error('Error al obtener estadísticas:', err);
@@ -77,6 +61,16 @@ const Profile = () => {
             </StatContent>
           </StatCard>
           
+          <StatCard>
+            <StatIcon>
+              <FaMedal />
+            </StatIcon>
+            <StatContent>
+              <StatLabel>Posición en el Ranking</StatLabel>
+              <StatValue>{loading ? '...' : rank ? `#${rank}` : '-'}</StatValue>
+            </StatContent>
+          </StatCard>
+
           <StatCard>
             <StatIcon>
               <FaGamepad />
@@ -17,12 +17,12 @@ const RankingGlobal = () => {
   const fetchUsuarios = async () => {
     try {
       setLoading(true);
-      const response = await fetch(`${import.meta.env.VITE_URL_BACKEND}/obtenerUsuarios`);
+      // Solo la primera página (top 10); el backend la sirve desde caché con ETag
+      const response = await fetch(`${import.meta.env.VITE_URL_BACKEND}/ranking?limit=10`);
       const data = await response.json();
       
       if (data.usuarios) {
-        const topTen = data.usuarios.slice(0, 10);
-        setUsuarios(topTen);
+        setUsuarios(data.usuarios);
         // Animar filas cuando se cargan
         setTimeout(() => animateRows(), 100);
       }
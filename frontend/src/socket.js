@@ -12,5 +12,18 @@ export const socket = io(BACKEND_URL, {
   timeout: 10000,
   autoConnect: true,
   // forceNew: true, // Removido para evitar crear nuevas conexiones innecesarias
-  withCredentials: true
-});
\ No newline at end of file
+  withCredentials: true,
+  // El servidor verifica el token una vez al conectar y asocia la identidad a la conexión
+  auth: (cb) => cb({ token: localStorage.getItem('token') })
+});
+
+// Reconectar para que el servidor vuelva a leer el token (login / logout)
+export const reconnectSocket = () => {
+  socket.disconnect();
+  socket.connect();
+};
+
+// Medición de latencia: devolver cada ping tal cual para que el servidor mida el RTT
+socket.on('latency_ping', (data) => {
+  socket.emit('latency_pong', data);
+});